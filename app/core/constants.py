@@ -1,6 +1,14 @@
+import os
+
 WIDE_FILE_PATH = "app/static/2016.xlsx"
 LONG_EXCEL_PATH = "app/static/data_long.xlsx"
 LONG_CSV_PATH = "app/static/data_long.csv"
+LONG_CSV_GZ_PATH = "app/static/data_long.csv.gz"
+LONG_PARQUET_PATH = "app/static/data_long.parquet"
+LONG_ARROW_PATH = "app/static/data_long.arrow"
+# Artifacts a full refresh writes unless the run asks for others: any of xlsx, csv,
+# csv.gz, parquet and arrow
+ETL_ARTIFACTS = [f.strip() for f in os.getenv("ETL_ARTIFACTS", "xlsx,csv").split(",") if f.strip()]
 
 RENAME_MAP = {
     "مدیریت برق شهرستان": "city_name",
@@ -11,3 +19,99 @@ RENAME_MAP = {
     "تست": "project_type",
     "وضعیت": "status"
 }
+
+# Rows sent per COPY / executemany batch when loading facts
+FACT_INSERT_CHUNK_SIZE = 50_000
+# Smaller batches in low-memory mode, where a batch of Python rows would otherwise
+# outweigh the compact fact columns it is built from
+FACT_INSERT_CHUNK_SIZE_LOW_MEMORY = 10_000
+
+# Long-format rows per batch yielded by the streaming Excel reader
+STREAM_BATCH_SIZE = 50_000
+
+# Long-format batches the pipelined ETL buffers between the workbook reader and the
+# loader; with STREAM_BATCH_SIZE this bounds the rows held in memory
+ETL_QUEUE_SIZE = int(os.getenv("ETL_QUEUE_SIZE", 4))
+
+# Low-memory ETL: the long table gets categorical strings and int16/int32 numbers
+# instead of object and float64 columns, and intermediate frames are released early
+ETL_LOW_MEMORY = os.getenv("ETL_LOW_MEMORY", "false").lower() in ("1", "true", "yes")
+
+# Worker processes used to transform several wide workbooks in parallel
+ETL_MAX_WORKERS = int(os.getenv("ETL_MAX_WORKERS", os.cpu_count() or 1))
+
+# Group-by combinations pre-aggregated into rollup tables after each ETL run.
+# Fields: location, project_type, status, year, month
+ROLLUP_GROUPINGS = [
+    ("status",),
+    ("project_type",),
+    ("location",),
+    ("year", "month"),
+    ("project_type", "status"),
+    ("status", "year", "month"),
+    ("location", "year", "month"),
+]
+
+# Byte budget of the in-process /aggregations/sum result cache
+AGGREGATION_CACHE_MAX_BYTES = int(os.getenv("AGGREGATION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Declaratively partition fact_work_order by year (PostgreSQL only). Takes effect on the
+# next zero-downtime refresh, which swaps in a partitioned table.
+FACT_PARTITION_BY_YEAR = os.getenv("FACT_PARTITION_BY_YEAR", "false").lower() in ("1", "true", "yes")
+
+# Backend answering /aggregations/sum: "sql", or "numpy" for the in-memory columnar engine
+AGGREGATION_BACKEND = os.getenv("AGGREGATION_BACKEND", "sql").lower()
+# Largest group-by cross product the columnar engine bins; bigger shapes fall back to SQL
+COLUMNAR_MAX_GROUPS = int(os.getenv("COLUMNAR_MAX_GROUPS", 10_000_000))
+
+# Largest page /aggregations/sum returns with limit, and largest top_n
+AGGREGATION_MAX_PAGE_SIZE = int(os.getenv("AGGREGATION_MAX_PAGE_SIZE", 1000))
+# Largest matrix /aggregations/pivot returns densely; bigger ones need layout=sparse
+PIVOT_MAX_DENSE_CELLS = int(os.getenv("PIVOT_MAX_DENSE_CELLS", 1_000_000))
+# Aggregation statements kept built, one per query shape (filters set, group_by, order)
+AGGREGATION_STATEMENT_CACHE_SIZE = int(os.getenv("AGGREGATION_STATEMENT_CACHE_SIZE", 1024))
+
+# Content codings cached responses are compressed with, in order of preference, and
+# the smallest body worth compressing; an empty list turns compression off
+RESPONSE_COMPRESSION = [c for c in os.getenv("RESPONSE_COMPRESSION", "br,gzip").split(",") if c]
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", 1024))
+# Compression runs once per cached response, so favour speed over the last few percent
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 5))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+
+# /events: seconds between keep-alive comments on idle streams (proxies drop silent
+# connections), and data-generation events kept for clients resuming with Last-Event-ID
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+EVENTS_HISTORY = int(os.getenv("EVENTS_HISTORY", 100))
+
+# SQL statement logging (logger "app.sql"): "off", "slow" for statements slower than
+# SQL_SLOW_MS, "sample" for those plus a SQL_SAMPLE_RATE share of all statements, or
+# "all" for SQLAlchemy's echo of every statement
+SQL_LOG = os.getenv("SQL_LOG", "slow").lower()
+SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", 500))
+SQL_SAMPLE_RATE = float(os.getenv("SQL_SAMPLE_RATE", 0.01))
+
+# Connection pools. ETL writes and API reads go through separate engines, so a long
+# refresh cannot take the connections dashboards query through; DATABASE_REPLICA_URL
+# points the read engine at a streaming replica (default: DATABASE_URL).
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", 5))
+DB_WRITE_MAX_OVERFLOW = int(os.getenv("DB_WRITE_MAX_OVERFLOW", 5))
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", 10))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", 20))
+# Seconds to wait for a pooled connection and for a new one to open; pooled
+# connections older than DB_POOL_RECYCLE seconds are replaced
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# Test pooled connections with a round trip on checkout and replace dead ones
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Server-side limit on read statements in milliseconds (PostgreSQL); 0 disables it
+DB_READ_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_READ_STATEMENT_TIMEOUT_MS", 30_000))
+# Prepared statements kept per asyncpg connection, enough for every hot aggregation
+# shape; 0 disables them (required behind pgbouncer in transaction mode)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))
+# Statements whose compiled SQL each engine keeps (SQLAlchemy's default is 500); at
+# least AGGREGATION_STATEMENT_CACHE_SIZE so cached shapes are not compiled again
+DB_COMPILED_CACHE_SIZE = int(os.getenv("DB_COMPILED_CACHE_SIZE", 2000))
+# Seconds a refresh waits for the replica to replay it before publishing the new data
+DB_REPLICA_WAIT_SECONDS = float(os.getenv("DB_REPLICA_WAIT_SECONDS", 30))
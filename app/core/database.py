@@ -1,32 +1,213 @@
 # database.py
+import asyncio
+import logging
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import random
+import time
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from app.core.constants import (
+    DB_COMPILED_CACHE_SIZE,
+    DB_CONNECT_TIMEOUT,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_TIMEOUT,
+    DB_READ_MAX_OVERFLOW,
+    DB_READ_POOL_SIZE,
+    DB_READ_STATEMENT_TIMEOUT_MS,
+    DB_REPLICA_WAIT_SECONDS,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_WRITE_MAX_OVERFLOW,
+    DB_WRITE_POOL_SIZE,
+    SQL_LOG,
+    SQL_SAMPLE_RATE,
+    SQL_SLOW_MS,
+)
+from app.core.metrics import DB_POOL_CHECKOUT_SECONDS, DB_STATEMENT_SECONDS
 
 # Load .env file
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Optional read replica for the API's queries; the ETL always writes to DATABASE_URL
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") or None
 
-# Async engine
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=True,  # set False in production
-    future=True,
-)
+sql_logger = logging.getLogger("app.sql")
+
+
+def timed_pool_class(url: str, name: str) -> type:
+    """The dialect's default pool class, timing every connection checkout."""
+    base = make_url(url).get_dialect(_is_async=True).get_pool_class(make_url(url))
+    metric = DB_POOL_CHECKOUT_SECONDS.labels(engine=name)
+
+    class TimedPool(base):
+        def connect(self):
+            with metric.time():
+                return super().connect()
+
+    # SQLAlchemy names pool loggers after the class; keep them under "sqlalchemy.pool"
+    TimedPool.__module__ = base.__module__
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def _instrument(engine: AsyncEngine, name: str):
+    """Time every statement of ``engine`` and log the slow and sampled ones."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _start_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _end_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["statement_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "EMPTY"
+        DB_STATEMENT_SECONDS.labels(engine=name, operation=operation).observe(elapsed)
+        if SQL_LOG in ("slow", "sample") and elapsed * 1000 >= SQL_SLOW_MS:
+            sql_logger.warning("slow %s statement (%.1f ms): %s", name, elapsed * 1000, statement)
+        elif SQL_LOG == "sample" and random.random() < SQL_SAMPLE_RATE:
+            sql_logger.info("sampled %s statement (%.1f ms): %s", name, elapsed * 1000, statement)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _failed_statement(context):
+        starts = context.connection.info.get("statement_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def make_engine(url: str, name: str, pool_size: int, max_overflow: int, read_only: bool = False) -> AsyncEngine:
+    """
+    Async engine with its own sized pool. Read-only engines refuse writes at the
+    database (a read-only default transaction on PostgreSQL, ``query_only`` on
+    SQLite) and cap statement time on PostgreSQL.
+    """
+    pool_class = timed_pool_class(url, name)
+    options = {}
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=DB_POOL_PRE_PING,
+        )
+
+    backend = make_url(url).get_backend_name()
+    connect_args = {}
+    if backend == "postgresql":
+        # Every statement goes through an asyncpg prepared statement; keeping them
+        # per connection saves the parse and plan round trip of repeated shapes
+        server_settings = {"application_name": f"open-work-orders-{name}"}
+        if read_only:
+            server_settings["default_transaction_read_only"] = "on"
+            if DB_READ_STATEMENT_TIMEOUT_MS:
+                server_settings["statement_timeout"] = str(DB_READ_STATEMENT_TIMEOUT_MS)
+        connect_args.update(
+            timeout=DB_CONNECT_TIMEOUT,
+            prepared_statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+            server_settings=server_settings,
+        )
+
+    engine = create_async_engine(
+        url,
+        echo=SQL_LOG == "all",
+        future=True,
+        poolclass=pool_class,
+        query_cache_size=DB_COMPILED_CACHE_SIZE,
+        connect_args=connect_args,
+        **options,
+    )
+
+    if backend == "sqlite":
+        @event.listens_for(engine.sync_engine, "connect")
+        def _sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            if read_only:
+                cursor.execute("PRAGMA query_only = ON")
+            else:
+                # Readers keep their snapshot instead of waiting for the ETL's transaction
+                cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.close()
+
+    _instrument(engine, name)
+    return engine
 
-# Async session maker
+
+def _in_memory(url: str) -> bool:
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+# Write engine: the ETL, job history and schema upgrades
+engine = make_engine(DATABASE_URL, "write", DB_WRITE_POOL_SIZE, DB_WRITE_MAX_OVERFLOW)
+
+# Read engine: the aggregation and dimension endpoints. An in-memory SQLite database
+# exists once per connection pool, so there it shares the write engine.
+if DATABASE_REPLICA_URL is None and _in_memory(DATABASE_URL):
+    read_engine = engine
+else:
+    read_engine = make_engine(
+        DATABASE_REPLICA_URL or DATABASE_URL, "read", DB_READ_POOL_SIZE, DB_READ_MAX_OVERFLOW, read_only=True,
+    )
+
+
+async def wait_for_replica(timeout: float = DB_REPLICA_WAIT_SECONDS) -> bool:
+    """
+    Wait until the read replica has replayed everything committed on the primary,
+    so that results cached for a new data generation are not read from older data.
+    Returns False if it is still behind after ``timeout`` seconds. Without a
+    PostgreSQL replica there is nothing to wait for.
+    """
+    if DATABASE_REPLICA_URL is None or read_engine.dialect.name != "postgresql":
+        return True
+    async with engine.connect() as conn:
+        lsn = await conn.scalar(text("SELECT pg_current_wal_lsn()::text"))
+    deadline = time.monotonic() + timeout
+    async with read_engine.connect() as conn:
+        while True:
+            # NULL when the "replica" is not in recovery, i.e. it is the primary itself
+            caught_up = await conn.scalar(
+                text("SELECT pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn)"), {"lsn": lsn}
+            )
+            if caught_up is not False:
+                return True
+            if time.monotonic() >= deadline:
+                sql_logger.warning("replica has not replayed %s after %.0f s", lsn, timeout)
+                return False
+            await asyncio.sleep(0.05)
+
+
+# Async session makers
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
 
 # Base class for ORM models
 Base = declarative_base()
 
-# Dependency for FastAPI routes
-async def get_async_session():
+# Dependencies for FastAPI routes
+async def get_read_session():
+    """Session on the read engine, for endpoints that only query."""
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+async def get_write_session():
+    """Session on the write engine, for endpoints that change data."""
     async with AsyncSessionLocal() as session:
         yield session
+
+
+# Kept for existing imports: the read-write session
+get_async_session = get_write_session
@@ -0,0 +1,25 @@
+from typing import Callable, List
+
+
+class DataGeneration:
+    """
+    Monotonic number identifying the data currently served, bumped by the ETL runner
+    after every committed refresh. In-process caches register a listener to drop
+    whatever they derived from the previous generation.
+    """
+
+    def __init__(self):
+        self.current = 0
+        self._listeners: List[Callable[[int], None]] = []
+
+    def subscribe(self, listener: Callable[[int], None]):
+        self._listeners.append(listener)
+
+    def bump(self) -> int:
+        self.current += 1
+        for listener in self._listeners:
+            listener(self.current)
+        return self.current
+
+
+data_generation = DataGeneration()
@@ -0,0 +1,105 @@
+import functools
+import inspect
+import threading
+import psutil
+from prometheus_client import Gauge, Histogram
+
+# Buckets from 1 ms to 10 min cover single queries as well as whole ETL stages
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+ETL_STAGE_SECONDS = Histogram(
+    "etl_stage_seconds", "Duration of ETL run stages", ["stage"], buckets=SECONDS_BUCKETS,
+)
+ETL_STAGE_ROWS_PER_SECOND = Gauge(
+    "etl_stage_rows_per_second", "Long rows per second of the last run of each ETL stage", ["stage"],
+)
+ETL_STAGE_PEAK_RSS_BYTES = Gauge(
+    "etl_stage_peak_rss_bytes", "Peak resident set size of the process during the last run of each ETL stage", ["stage"],
+)
+ETL_TRANSFORM_STEP_SECONDS = Histogram(
+    "etl_transform_step_seconds", "Duration of ExcelTransformer steps", ["step"], buckets=SECONDS_BUCKETS,
+)
+ETL_LOADER_SECONDS = Histogram(
+    "etl_loader_seconds", "Duration of dimension and fact loader phases", ["loader", "phase"], buckets=SECONDS_BUCKETS,
+)
+ETL_ARTIFACT_WRITE_SECONDS = Histogram(
+    "etl_artifact_write_seconds", "Duration of artifact writes", ["format"], buckets=SECONDS_BUCKETS,
+)
+AGGREGATION_SECONDS = Histogram(
+    "aggregation_query_seconds", "Latency of WorkOrderMetrics.aggregate by query shape",
+    ["shape", "mode", "backend"], buckets=SECONDS_BUCKETS,
+)
+DIMENSION_SECONDS = Histogram(
+    "dimension_request_seconds", "Latency of the dimension endpoints", ["endpoint"], buckets=SECONDS_BUCKETS,
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds", "Time to check a connection out of the pool, including connecting",
+    ["engine"], buckets=SECONDS_BUCKETS,
+)
+DB_STATEMENT_SECONDS = Histogram(
+    "db_statement_seconds", "Execution time of SQL statements by engine and leading keyword", ["engine", "operation"],
+    buckets=SECONDS_BUCKETS,
+)
+EVENT_STREAM_CLIENTS = Gauge("event_stream_clients", "Open /events data-generation streams")
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator observing the duration of a sync or async function."""
+    metric = histogram.labels(**labels) if labels else histogram
+
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with metric.time():
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metric.time():
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+class PeakRss:
+    """
+    Context manager sampling the process' resident set size in a background thread;
+    ``peak`` is the largest value seen. The sampling interval bounds how short a
+    spike can be and still be caught.
+    """
+
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self) -> "PeakRss":
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="peak-rss", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def observe_stage(entry: dict):
+    """Export a finished ETL stage entry (see ``WorkOrderETLManager.stage``)."""
+    ETL_STAGE_SECONDS.labels(stage=entry["name"]).observe(entry["seconds"])
+    ETL_STAGE_PEAK_RSS_BYTES.labels(stage=entry["name"]).set(entry["peak_rss_bytes"])
+    if entry.get("rows_per_sec") is not None:
+        ETL_STAGE_ROWS_PER_SECOND.labels(stage=entry["name"]).set(entry["rows_per_sec"])
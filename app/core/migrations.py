@@ -0,0 +1,68 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+from app.models import DimLocation, DimDate, DimProjectType, DimStatus, FactWorkOrder, ROLLUP_TABLES
+from app.services.rollup_service import RollupManager
+
+# Dimension natural keys and the fact column pointing at each dimension
+NATURAL_KEYS = [
+    (DimLocation.__table__, ["city_name", "department_code"], "location_id"),
+    (DimDate.__table__, ["year", "month"], "date_id"),
+    (DimProjectType.__table__, ["name"], "project_type_id"),
+    (DimStatus.__table__, ["name"], "status_id"),
+]
+
+
+def upgrade_schema(conn: Connection):
+    """
+    Bring a database created by an older release up to the current physical schema.
+
+    ``create_all`` only creates missing tables, so existing ones get the denormalized
+    fact period columns, the natural-key unique indexes (after merging duplicate
+    dimension rows) and the fact indexes here. Rollups whose layout changed are
+    recreated empty and repopulated by the next refresh. Every step is idempotent.
+    Switching to year partitioning happens on the next zero-downtime refresh.
+    """
+    inspector = inspect(conn)
+    fact = FactWorkOrder.__table__
+
+    fact_columns = {c["name"] for c in inspector.get_columns(fact.name)}
+    if "year" not in fact_columns or "month" not in fact_columns:
+        for column in ("year", "month"):
+            if column not in fact_columns:
+                conn.execute(text(f"ALTER TABLE {fact.name} ADD COLUMN {column} INTEGER"))
+        conn.execute(text(
+            f"UPDATE {fact.name} SET "
+            f"year = (SELECT year FROM dim_date WHERE dim_date.id = {fact.name}.date_id), "
+            f"month = (SELECT month FROM dim_date WHERE dim_date.id = {fact.name}.date_id)"
+        ))
+
+    for dim, key, fk in NATURAL_KEYS:
+        unique = {tuple(u["column_names"]) for u in inspector.get_unique_constraints(dim.name)}
+        unique |= {tuple(i["column_names"]) for i in inspector.get_indexes(dim.name) if i["unique"]}
+        if tuple(key) in unique:
+            continue
+        cols = ", ".join(key)
+        survivor = f"SELECT MIN(id) FROM {dim.name} d WHERE " + " AND ".join(
+            f"d.{c} IS NOT DISTINCT FROM {dim.name}.{c}" for c in key
+        )
+        conn.execute(text(
+            f"UPDATE {fact.name} SET {fk} = "
+            f"(SELECT ({survivor}) FROM {dim.name} WHERE {dim.name}.id = {fact.name}.{fk}) "
+            f"WHERE {fk} IS NOT NULL"
+        ))
+        conn.execute(text(
+            f"DELETE FROM {dim.name} WHERE id NOT IN (SELECT MIN(id) FROM {dim.name} GROUP BY {cols})"
+        ))
+        conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {dim.name}_{'_'.join(key)}_key ON {dim.name} ({cols})"))
+
+    for index in fact.indexes:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+    for fields, table in ROLLUP_TABLES.items():
+        if not inspector.has_table(table.name):
+            continue
+        if [c["name"] for c in inspector.get_columns(table.name)] != [c.name for c in table.columns]:
+            table.drop(conn)
+            table.create(conn)
+            conn.execute(RollupManager.build_statement(fields, table))
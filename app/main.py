@@ -1,18 +1,41 @@
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from app.core.database import Base, engine
+from app.core.database import Base, engine, read_engine, AsyncSessionLocal
+from app.core.constants import AGGREGATION_BACKEND
+from app.core.migrations import upgrade_schema
 from app.routers.aggregations_router import router as aggregations_router
 from app.routers.etl_router import router as etl_router
 from app.routers.dimensions_router import router as dimensions_router
+from app.routers.events_router import router as events_router
+from app.routers.metrics_router import router as metrics_router
+from app.services.columnar_engine import columnar_facts
+from app.services.dimension_snapshot import dimension_snapshot
+from app.services.etl_service.jobs import etl_jobs
+
+# Application logs, e.g. slow and sampled SQL statements of "app.sql", next to uvicorn's
+app_logger = logging.getLogger("app")
+if not app_logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(levelname)s:     %(name)s - %(message)s"))
+    app_logger.addHandler(handler)
+    app_logger.setLevel(logging.INFO)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+    async with AsyncSessionLocal() as db:
+        await etl_jobs.recover(db)
+        await dimension_snapshot.load(db)
+        if AGGREGATION_BACKEND == "numpy":
+            await columnar_facts.load(db)
     yield
     await engine.dispose()
+    await read_engine.dispose()
 
 
 app = FastAPI(title="Open Work Orders App", lifespan=lifespan)
@@ -36,3 +59,5 @@ async def root():
 app.include_router(etl_router, prefix="/open-work-orders")
 app.include_router(dimensions_router, prefix="/open-work-orders")
 app.include_router(aggregations_router, prefix="/open-work-orders")
+app.include_router(events_router, prefix="/open-work-orders")
+app.include_router(metrics_router)
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Text, ForeignKey, DateTime, Index, JSON, Table, UniqueConstraint, func
 from sqlalchemy.orm import relationship
+from app.core.constants import FACT_PARTITION_BY_YEAR, ROLLUP_GROUPINGS
 from app.core.database import Base
 
 class DimLocation(Base):
     __tablename__ = "dim_location"
+    __table_args__ = (
+        UniqueConstraint("city_name", "department_code", name="dim_location_city_name_department_code_key"),
+    )
     id = Column(Integer, primary_key=True)
     city_name = Column(String)
     department_code = Column(String)
@@ -11,6 +15,7 @@ class DimLocation(Base):
 
 class DimDate(Base):
     __tablename__ = "dim_date"
+    __table_args__ = (UniqueConstraint("year", "month", name="dim_date_year_month_key"),)
     id = Column(Integer, primary_key=True)
     year = Column(Integer)
     month = Column(Integer)
@@ -19,7 +24,7 @@ class DimDate(Base):
 class DimProjectType(Base):
     __tablename__ = "dim_project_type"
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String, unique=True)
     work_orders = relationship("FactWorkOrder", back_populates="project_type")
 
 class DimStatus(Base):
@@ -30,14 +35,80 @@ class DimStatus(Base):
 
 class FactWorkOrder(Base):
     __tablename__ = "fact_work_order"
-    id = Column(Integer, primary_key=True)
+    __table_args__ = (
+        # Covering indexes for the filter and group-by shapes built by WorkOrderMetrics
+        Index("ix_fact_work_order_period", "year", "month",
+              postgresql_include=["location_id", "project_type_id", "status_id", "count"]),
+        Index("ix_fact_work_order_location", "location_id", "year", "month",
+              postgresql_include=["project_type_id", "status_id", "count"]),
+        Index("ix_fact_work_order_project_type", "project_type_id", "status_id",
+              postgresql_include=["location_id", "year", "month", "count"]),
+        Index("ix_fact_work_order_status", "status_id", "year", "month",
+              postgresql_include=["location_id", "project_type_id", "count"]),
+        Index("ix_fact_work_order_date", "date_id"),
+        {"postgresql_partition_by": "LIST (year)"} if FACT_PARTITION_BY_YEAR else {},
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
     location_id = Column(Integer, ForeignKey("dim_location.id"))
     date_id = Column(Integer, ForeignKey("dim_date.id"))
     project_type_id = Column(Integer, ForeignKey("dim_project_type.id"))
     status_id = Column(Integer, ForeignKey("dim_status.id")) 
+    # Denormalized from dim_date so period filters and groupings need no join;
+    # year joins the primary key when the table is partitioned by it
+    year = Column(Integer, primary_key=FACT_PARTITION_BY_YEAR)
+    month = Column(Integer)
     count = Column(Integer)
 
     location = relationship("DimLocation", back_populates="work_orders")
     date = relationship("DimDate", back_populates="work_orders")
     project_type = relationship("DimProjectType", back_populates="work_orders")
-    status_obj = relationship("DimStatus", back_populates="work_orders") 
+    status_obj = relationship("DimStatus", back_populates="work_orders")
+
+class EtlSourceFile(Base):
+    """Content hash and (year, month) periods of each wide workbook loaded incrementally."""
+    __tablename__ = "etl_source_file"
+    id = Column(Integer, primary_key=True)
+    path = Column(String, unique=True, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    periods = Column(JSON, nullable=False, default=list)  # [[year, month], ...]
+    loaded_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class EtlJob(Base):
+    """An ETL refresh run as a background job; the table is the job history."""
+    __tablename__ = "etl_job"
+    id = Column(String(32), primary_key=True)
+    status = Column(String(16), nullable=False)  # queued, running, succeeded, failed
+    params = Column(JSON, nullable=False, default=dict)
+    stages = Column(JSON, nullable=False, default=list)  # [{name, status, started_at, seconds}, ...]
+    result = Column(JSON)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+# ------------------ Rollups ------------------
+# Fact column a rollup keeps for each group-by field; rollups are re-aggregated
+# through the same dimension joins as the fact table
+ROLLUP_COLUMNS = {
+    "location": "location_id",
+    "project_type": "project_type_id",
+    "status": "status_id",
+    "year": "year",
+    "month": "month",
+}
+
+def rollup_columns(fields: tuple) -> list:
+    """Distinct fact columns kept by a rollup over ``fields``, in fact-table order."""
+    needed = {ROLLUP_COLUMNS[f] for f in fields}
+    return [c for c in ("location_id", "year", "month", "project_type_id", "status_id") if c in needed]
+
+def rollup_table(fields: tuple) -> Table:
+    """Summary table holding SUM(count) of the facts grouped by ``fields``."""
+    return Table(
+        "rollup_" + "_".join(fields),
+        Base.metadata,
+        *[Column(c, Integer) for c in rollup_columns(fields)],
+        Column("count", BigInteger),
+    )
+
+ROLLUP_TABLES = {tuple(fields): rollup_table(tuple(fields)) for fields in ROLLUP_GROUPINGS}
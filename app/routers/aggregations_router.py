@@ -1,17 +1,63 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.core.database import get_async_session
-from app.services.aggregation_service import WorkOrderMetrics
+from app.core.constants import AGGREGATION_MAX_PAGE_SIZE
+from app.core.database import get_read_session
+from app.services.aggregation_service import BatchMetrics, PivotMetrics, WorkOrderMetrics
+from app.services.cache_service import aggregation_cache, cached_response
+from app.services.response_formats import ResponseFormat, accepts, document_format, table_format
 
 router = APIRouter(prefix="/aggregations", tags=["Aggregations"])
 
 ALLOWED_GROUP_BY = {"location", "project_type", "status", "year", "month"}
 ALLOWED_ORDER_DIR = {"asc", "desc"}
+# A pivot is a matrix already; there is no per-row layout to make columnar
+pivot_format = accepts(("json", "msgpack"))
+
+
+class AggregationSpec(BaseModel):
+    """One /sum query inside a batch, plus optional subtotal and grand-total rows."""
+    location_id: Optional[int] = None
+    project_type_id: Optional[int] = None
+    status_id: Optional[int] = None
+    year: Optional[int] = None
+    month: Optional[int] = None
+    group_by: List[str] = []
+    order_by: Optional[str] = None
+    order_dir: str = "desc"
+    subtotals: bool = False
+    grand_total: bool = False
+
+
+class BatchAggregationRequest(BaseModel):
+    specs: List[AggregationSpec] = Field(..., min_length=1)
+
+
+def validate_spec(group_by: List[str], order_by: Optional[str], order_dir: str):
+    """Raise 422 for unsupported group_by fields or invalid order fields."""
+    # --- Validate group_by fields ---
+    invalid_fields = [f for f in group_by if f not in ALLOWED_GROUP_BY]
+    if invalid_fields:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unsupported group_by fields: {invalid_fields}. Allowed values: {list(ALLOWED_GROUP_BY)}",
+        )
+
+    # --- Validate order_by ---
+    if order_by:
+        allowed_order_fields = group_by + ["count"]
+        if order_by not in allowed_order_fields:
+            raise HTTPException(
+                status_code=422, detail=f"Invalid order_by field: {order_by}. Must be one of: {allowed_order_fields}"
+            )
+    if order_dir not in ALLOWED_ORDER_DIR:
+        raise HTTPException(status_code=422, detail=f"Invalid order_dir: {order_dir}. Must be 'asc' or 'desc'")
 
 
 @router.get("/sum")
 async def sum_aggregate(
+    request: Request,
     location_id: Optional[int] = None,
     project_type_id: Optional[int] = None,
     status_id: Optional[int] = None,
@@ -20,7 +66,11 @@ async def sum_aggregate(
     group_by: List[str] = Query(default=[]),
     order_by: Optional[str] = Query(None, description="Field to order by: count or one of group_by fields"),
     order_dir: str = Query("desc", description="Order direction: asc or desc"),
-    db: AsyncSession = Depends(get_async_session),
+    limit: Optional[int] = Query(None, ge=1, le=AGGREGATION_MAX_PAGE_SIZE, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    top_n: Optional[int] = Query(None, ge=1, le=AGGREGATION_MAX_PAGE_SIZE, description="Largest groups to return"),
+    fmt: ResponseFormat = Depends(table_format),
+    db: AsyncSession = Depends(get_read_session),
 ):
     """
     Return the **sum aggregation** of work order metrics based on optional filters
@@ -41,25 +91,37 @@ async def sum_aggregate(
     - `order_by` → "count" or any of the selected `group_by` fields
     - `order_dir` → "asc" or "desc"
 
-    Returns 422 if unsupported `group_by` fields or invalid order fields are provided.
-    """
-    # --- Validate group_by fields ---
-    invalid_fields = [f for f in group_by if f not in ALLOWED_GROUP_BY]
-    if invalid_fields:
-        raise HTTPException(
-            status_code=422,
-            detail=f"Unsupported group_by fields: {invalid_fields}. Allowed values: {list(ALLOWED_GROUP_BY)}",
-        )
+    **Bounded results (optional, mutually exclusive):**
+    - `limit` → page of at most `limit` groups in keyset order (`order_by`, count by
+      default, then the group fields). Pass the returned `next_cursor` as `cursor` to
+      get the next page; it is null on the last page.
+    - `top_n` → the `top_n` groups with the largest count (ordered by `order_by` if
+      given) plus an `others` bucket with the number and total count of the rest.
 
-    # --- Validate order_by ---
-    if order_by:
-        allowed_order_fields = group_by + ["count"]
-        if order_by not in allowed_order_fields:
-            raise HTTPException(
-                status_code=422, detail=f"Invalid order_by field: {order_by}. Must be one of: {allowed_order_fields}"
-            )
-    if order_dir not in ALLOWED_ORDER_DIR:
-        raise HTTPException(status_code=422, detail=f"Invalid order_dir: {order_dir}. Must be 'asc' or 'desc'")
+    Either way `total_count` is the grand total over all groups and `groups` their
+    number, both computed in the same query.
+
+    Returns 422 if unsupported `group_by` fields or invalid order fields are provided,
+    or for a malformed `cursor`.
+
+    **Response formats (`Accept` header):**
+    - `application/json` (default) → `chart_data` as a list of objects
+    - `application/vnd.openworkorders.columnar+json` → `chart_data` as one array per field
+    - `application/msgpack` → the columnar document in MessagePack
+    - `application/vnd.apache.arrow.stream` → `chart_data` as an Arrow IPC stream, the
+      other fields as JSON values in the schema metadata
+
+    Other media types get a 406. Large responses are sent with Brotli or gzip when
+    `Accept-Encoding` allows it.
+
+    Results are cached until the next ETL run and carry an `ETag`; a matching
+    `If-None-Match` header gets a 304.
+    """
+    validate_spec(group_by, order_by, order_dir)
+    if limit is not None and top_n is not None:
+        raise HTTPException(status_code=422, detail="limit and top_n cannot be combined")
+    if cursor is not None and limit is None:
+        raise HTTPException(status_code=422, detail="cursor requires limit")
 
     metrics = WorkOrderMetrics(
         location_id=location_id,
@@ -70,5 +132,150 @@ async def sum_aggregate(
         group_by=group_by,
         order_by=order_by,
         order_dir=order_dir,
+        limit=limit,
+        cursor=cursor,
+        top_n=top_n,
+    )
+    try:
+        metrics.cursor_values()
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=f"Invalid cursor: {exc}")
+
+    # group_by order and duplicates never change the output, and order_dir only matters with order_by
+    key = (
+        "sum", location_id, project_type_id, status_id, year, month,
+        tuple(sorted(set(group_by))), order_by, order_dir if order_by else None,
+        limit, cursor, top_n, fmt.name,
     )
-    return await metrics.aggregate(db)
+
+    async def compute() -> bytes:
+        return fmt.encode(await metrics.aggregate(db, records=False))
+
+    cached = await aggregation_cache.get_or_compute(key, compute, fmt.media_type)
+    return cached_response(request, cached)
+
+
+@router.get("/pivot")
+async def pivot_aggregate(
+    request: Request,
+    rows: List[str] = Query(..., description="Dimensions along the rows"),
+    cols: List[str] = Query(..., description="Dimensions along the columns"),
+    layout: str = Query("dense", description="dense or sparse"),
+    margins: bool = Query(True, description="Include row and column totals"),
+    location_id: Optional[int] = None,
+    project_type_id: Optional[int] = None,
+    status_id: Optional[int] = None,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    fmt: ResponseFormat = Depends(pivot_format),
+    db: AsyncSession = Depends(get_read_session),
+):
+    """
+    Return the **sum of work orders as a matrix** of `rows` × `cols` dimensions, e.g.
+    `rows=location&cols=month` for a city by month heatmap. Takes the `/sum` filters.
+
+    - `row_labels` / `col_labels` → sorted labels; a value for a single dimension, a
+      list of values when several are given
+    - `layout=dense` → `values[i][j]` for row `i` and column `j`, null where no work
+      orders exist
+    - `layout=sparse` → `cells` as `[i, j, value]` triplets of the existing cells only
+    - `margins` → `row_totals` and `col_totals`; `total_count` is always returned
+
+    The matrix comes from one grouped query over both sets of dimensions.
+
+    Returns 422 for unsupported dimensions, a dimension on both axes, an unknown
+    `layout`, or a dense matrix larger than the configured limit.
+    Sent as JSON or, with `Accept: application/msgpack`, MessagePack.
+    Results are cached until the next ETL run and carry an `ETag`.
+    """
+    validate_spec(rows + cols, None, "desc")
+    if set(rows) & set(cols):
+        raise HTTPException(status_code=422, detail=f"Dimensions on both rows and cols: {sorted(set(rows) & set(cols))}")
+    if layout not in PivotMetrics.LAYOUTS:
+        raise HTTPException(status_code=422, detail=f"Invalid layout: {layout}. Must be 'dense' or 'sparse'")
+
+    pivot = PivotMetrics(
+        rows,
+        cols,
+        layout=layout,
+        margins=margins,
+        location_id=location_id,
+        project_type_id=project_type_id,
+        status_id=status_id,
+        year=year,
+        month=month,
+    )
+    key = (
+        "pivot", location_id, project_type_id, status_id, year, month,
+        tuple(pivot.rows), tuple(pivot.cols), layout, margins, fmt.name,
+    )
+
+    async def compute() -> bytes:
+        try:
+            result = await pivot.aggregate(db)
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+        return fmt.encode(result)
+
+    cached = await aggregation_cache.get_or_compute(key, compute, fmt.media_type)
+    return cached_response(request, cached)
+
+
+@router.post("/batch")
+async def batch_aggregate(
+    request: Request,
+    body: BatchAggregationRequest,
+    fmt: ResponseFormat = Depends(document_format),
+    db: AsyncSession = Depends(get_read_session),
+):
+    """
+    Answer several `/sum` queries in one call.
+
+    Each spec takes the `/sum` filters, `group_by`, `order_by` and `order_dir`, plus:
+    - `subtotals` → also return the totals of each leading prefix of `group_by`
+      (what `ROLLUP` over `group_by` produces), longest first
+    - `grand_total` → also return the total over the spec's filters
+
+    Specs sharing the same filters are computed in a single SQL statement with
+    `GROUPING SETS`. `results` follows the order of `specs`; `statements` is the
+    number of SQL statements executed. Takes the `/sum` response formats except Arrow.
+
+    Returns 422 if any spec has unsupported `group_by` fields or invalid order fields.
+    """
+    for spec in body.specs:
+        validate_spec(spec.group_by, spec.order_by, spec.order_dir)
+
+    key = ("batch", tuple(
+        (
+            spec.location_id, spec.project_type_id, spec.status_id, spec.year, spec.month,
+            tuple(spec.group_by), spec.order_by, spec.order_dir if spec.order_by else None,
+            spec.subtotals, spec.grand_total,
+        )
+        for spec in body.specs
+    ), fmt.name)
+
+    async def compute() -> bytes:
+        batch = BatchMetrics()
+        for spec in body.specs:
+            metrics = WorkOrderMetrics(
+                location_id=spec.location_id,
+                project_type_id=spec.project_type_id,
+                status_id=spec.status_id,
+                year=spec.year,
+                month=spec.month,
+                group_by=spec.group_by,
+                order_by=spec.order_by,
+                order_dir=spec.order_dir,
+            )
+            batch.add(metrics, subtotals=spec.subtotals, grand_total=spec.grand_total)
+        results = await batch.aggregate(db, records=False)
+        return fmt.encode({"results": results, "statements": batch.statements})
+
+    cached = await aggregation_cache.get_or_compute(key, compute, fmt.media_type)
+    return cached_response(request, cached)
+
+
+@router.get("/cache-stats")
+async def cache_stats():
+    """Hit, miss, coalesced and eviction counters of the aggregation result cache."""
+    return aggregation_cache.stats()
@@ -1,60 +1,102 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from typing import List, Dict
-from app.core.database import get_async_session
-from app.models import DimLocation, DimDate, DimProjectType, DimStatus
+from app.core.database import get_read_session
+from app.core.metrics import DIMENSION_SECONDS, timed
+from app.services.cache_service import cached_response
+from app.services.dimension_snapshot import dimension_snapshot
+from app.services.response_formats import ResponseFormat, document_format, table_format
 
 router = APIRouter( tags=["Dimensions"])
 
+# Lists are served from an in-memory snapshot rebuilt after every ETL run;
+# the session is only used when the snapshot has to be (re)loaded. Each list is
+# pre-serialized in every format its endpoint accepts (SNAPSHOT_FORMATS).
+
+
+# ------------------ All dimensions ------------------
+@router.get("/dimensions", response_model=Dict[str, List])
+@timed(DIMENSION_SECONDS, endpoint="dimensions")
+async def get_dimensions(
+    request: Request,
+    fmt: ResponseFormat = Depends(document_format),
+    db: AsyncSession = Depends(get_read_session),
+):
+    """
+    Returns locations, project types, statuses, years and months in one response.
+    """
+    snapshot = await dimension_snapshot.get(db)
+    return cached_response(request, snapshot.response("dimensions", fmt))
+
+
 # ------------------ DimLocation ------------------
 @router.get("/locations", response_model=List[Dict])
-async def get_locations(db: AsyncSession = Depends(get_async_session)):
+@timed(DIMENSION_SECONDS, endpoint="locations")
+async def get_locations(
+    request: Request,
+    fmt: ResponseFormat = Depends(table_format),
+    db: AsyncSession = Depends(get_read_session),
+):
     """
     Returns all locations for filter dropdown.
     """
-    result = await db.execute(select(DimLocation.id, DimLocation.city_name))
-    rows = result.all()
-    return [{"id": r.id, "name": r.city_name} for r in rows]
+    snapshot = await dimension_snapshot.get(db)
+    return cached_response(request, snapshot.response("locations", fmt))
 
 
 # ------------------ DimProjectType ------------------
 @router.get("/project-types", response_model=List[Dict])
-async def get_project_types(db: AsyncSession = Depends(get_async_session)):
+@timed(DIMENSION_SECONDS, endpoint="project-types")
+async def get_project_types(
+    request: Request,
+    fmt: ResponseFormat = Depends(table_format),
+    db: AsyncSession = Depends(get_read_session),
+):
     """
     Returns all project types for filter dropdown.
     """
-    result = await db.execute(select(DimProjectType.id, DimProjectType.name))
-    rows = result.all()
-    return [{"id": r.id, "name": r.name} for r in rows]
+    snapshot = await dimension_snapshot.get(db)
+    return cached_response(request, snapshot.response("project_types", fmt))
 
 
 # ------------------ DimStatus ------------------
 @router.get("/statuses", response_model=List[Dict])
-async def get_statuses(db: AsyncSession = Depends(get_async_session)):
+@timed(DIMENSION_SECONDS, endpoint="statuses")
+async def get_statuses(
+    request: Request,
+    fmt: ResponseFormat = Depends(table_format),
+    db: AsyncSession = Depends(get_read_session),
+):
     """
     Returns all statuses for filter dropdown.
     """
-    result = await db.execute(select(DimStatus.id, DimStatus.name))
-    rows = result.all()
-    return [{"id": r.id, "name": r.name} for r in rows]
+    snapshot = await dimension_snapshot.get(db)
+    return cached_response(request, snapshot.response("statuses", fmt))
 
 
 # ------------------ DimDate ------------------
 @router.get("/years", response_model=List[int])
-async def get_years(db: AsyncSession = Depends(get_async_session)):
+@timed(DIMENSION_SECONDS, endpoint="years")
+async def get_years(
+    request: Request,
+    fmt: ResponseFormat = Depends(document_format),
+    db: AsyncSession = Depends(get_read_session),
+):
     """
     Returns distinct years for filter dropdown.
     """
-    result = await db.execute(select(DimDate.year).distinct().order_by(DimDate.year))
-    rows = result.scalars().all()
-    return rows
+    snapshot = await dimension_snapshot.get(db)
+    return cached_response(request, snapshot.response("years", fmt))
 
 @router.get("/months", response_model=List[int])
-async def get_months(db: AsyncSession = Depends(get_async_session)):
+@timed(DIMENSION_SECONDS, endpoint="months")
+async def get_months(
+    request: Request,
+    fmt: ResponseFormat = Depends(document_format),
+    db: AsyncSession = Depends(get_read_session),
+):
     """
     Returns distinct months for filter dropdown.
     """
-    result = await db.execute(select(DimDate.month).distinct().order_by(DimDate.month))
-    rows = result.scalars().all()
-    return rows
+    snapshot = await dimension_snapshot.get(db)
+    return cached_response(request, snapshot.response("months", fmt))
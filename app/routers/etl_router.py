@@ -1,14 +1,104 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_async_session
-from app.services.etl_service.runner import WorkOrderETLManager
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import Dict, List, Optional
+from app.services.etl_service.artifacts import WRITERS, check_formats
+from app.services.etl_service.jobs import EtlJobConflict, etl_jobs
 
 router = APIRouter(prefix="/etl", tags=["ETL"])
 
+
+def refresh_params(
+    bulk_load: bool = Query(True, description="Load facts with PostgreSQL COPY when available"),
+    streaming: bool = Query(False, description="Parse the workbook with the streaming read-only reader"),
+    max_workers: Optional[int] = Query(None, ge=1, description="Worker processes for multi-workbook transforms"),
+    incremental: bool = Query(False, description="Skip unchanged workbooks and replace only touched periods"),
+    zero_downtime: bool = Query(True, description="Load staging tables and swap them in atomically (PostgreSQL)"),
+    artifacts: Optional[List[str]] = Query(
+        None,
+        description=f"File artifacts to write during the load, any of {sorted(WRITERS)} or `none`; "
+        "defaults to ETL_ARTIFACTS",
+    ),
+    pipelined: bool = Query(False, description="Stream workbooks in batches loaded while the next ones are read"),
+    batch_size: Optional[int] = Query(None, ge=1, description="Long rows per pipelined batch"),
+    queue_size: Optional[int] = Query(None, ge=1, description="Batches buffered between reader and loader"),
+    low_memory: Optional[bool] = Query(
+        None, description="Categorical and int16/int32 columns through the ETL; defaults to ETL_LOW_MEMORY",
+    ),
+) -> Dict:
+    if artifacts is not None:
+        try:
+            artifacts = check_formats([f for f in artifacts if f != "none"])
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    if pipelined and (incremental or artifacts):
+        raise HTTPException(
+            status_code=422,
+            detail="pipelined runs are full reloads and write no artifacts; drop incremental/artifacts",
+        )
+    return {
+        "bulk_load": bulk_load,
+        "streaming": streaming,
+        "max_workers": max_workers,
+        "incremental": incremental,
+        "zero_downtime": zero_downtime,
+        "artifacts": artifacts,
+        "pipelined": pipelined,
+        "batch_size": batch_size,
+        "queue_size": queue_size,
+        "low_memory": low_memory,
+    }
+
+
+async def submit(params: Dict):
+    try:
+        return await etl_jobs.submit(params)
+    except EtlJobConflict as e:
+        raise HTTPException(status_code=409, detail={"message": str(e), "job_id": e.job_id})
+
+
 @router.post("/refresh")
-async def refresh(db: AsyncSession = Depends(get_async_session)):
+async def refresh(params: Dict = Depends(refresh_params)):
+    """
+    Run a refresh and wait for its report. Runs as a background job like
+    `POST /etl/jobs`, so a concurrent identical refresh is joined and a different
+    one gets a 409.
+    """
+    job_id, _ = await submit(params)
     try:
-        etl_manager = WorkOrderETLManager(db)
-        return await etl_manager.run()
+        return await etl_jobs.wait(job_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/jobs", status_code=202)
+async def create_job(request: Request, params: Dict = Depends(refresh_params)):
+    """
+    Start a refresh in the background and return its job id right away.
+
+    Only one refresh runs at a time: submitting the same parameters while a job is
+    running returns that job (`coalesced: true`), different parameters get a 409.
+    Poll `GET /etl/jobs/{job_id}` for progress.
+    """
+    job_id, coalesced = await submit(params)
+    return {"job_id": job_id, "coalesced": coalesced, "status_url": str(request.url_for("get_job", job_id=job_id))}
+
+
+@router.get("/jobs")
+async def list_jobs(limit: int = Query(20, ge=1, le=200)):
+    """Most recent refresh jobs first, including those of previous runs of the app."""
+    return JSONResponse(jsonable_encoder(await etl_jobs.history(limit)))
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Status of a refresh job with its stages (`transform`, then `artifacts` alongside
+    `load`, `rollups` and `swap`, then `publish`; `pipeline` replaces `transform`
+    and `load` in pipelined runs, and incremental runs start with `hash`), each with
+    its status, start time and duration, plus the final report or error.
+    """
+    job = await etl_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"ETL job {job_id} not found")
+    return JSONResponse(jsonable_encoder(job))
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+from typing import Optional
+import orjson
+from app.core.constants import EVENTS_HEARTBEAT_SECONDS
+from app.core.metrics import EVENT_STREAM_CLIENTS
+from app.services.invalidation_service import invalidations
+
+router = APIRouter(tags=["Events"])
+
+
+def sse(event: str, event_id: int, data: bytes) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode(), data)
+
+
+@router.get("/events")
+async def events(last_event_id: Optional[str] = Header(None)):
+    """
+    **Server-Sent Events** stream of data refreshes, so dashboards re-fetch when the
+    data changes instead of polling.
+
+    - `hello` → sent on connect: `{"generation": n}`, the data generation being served
+    - `generation` → sent when an ETL run commits: `generation`, `reload` ("full" or
+      "incremental"), `periods` as `[year, month]` pairs whose facts were replaced,
+      `dimensions` whose lists changed (of locations, project_types, statuses, years,
+      months) and `published_at`. Widgets whose filters and group-by touch none of
+      them can keep their data.
+    - `reset` → the events missed since `Last-Event-ID` are no longer known (or the
+      server restarted): re-fetch everything
+
+    Event ids are generation numbers; browsers' `EventSource` resumes from the last one
+    by itself. Idle streams get a comment line every few seconds as a keep-alive.
+    """
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = None
+
+    async def stream():
+        nonlocal last_id
+        EVENT_STREAM_CLIENTS.inc()
+        try:
+            missed = [] if last_id is None else invalidations.since(last_id)
+            last_id = invalidations.last_id
+            if missed is None:
+                yield sse("reset", last_id, orjson.dumps({"generation": last_id}))
+            elif not missed:
+                yield sse("hello", last_id, orjson.dumps({"generation": last_id}))
+            for event_id, data in missed or ():
+                yield sse("generation", event_id, data)
+
+            while True:
+                await invalidations.wait(last_id, EVENTS_HEARTBEAT_SECONDS)
+                missed = invalidations.since(last_id)
+                if missed is None:
+                    last_id = invalidations.last_id
+                    yield sse("reset", last_id, orjson.dumps({"generation": last_id}))
+                elif not missed:
+                    yield b": keep-alive\n\n"
+                for event_id, data in missed or ():
+                    last_id = event_id
+                    yield sse("generation", event_id, data)
+        finally:
+            EVENT_STREAM_CLIENTS.dec()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # Proxies must pass events on as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics: ETL stage/step/loader/artifact timings, rows/sec and peak RSS
+    per ETL stage, aggregation latency by query shape, dimension endpoint latency,
+    pool checkout wait, SQL statement timings and open /events streams.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,10 +1,35 @@
-from typing import List, Dict, Optional
-from sqlalchemy import select, func, and_
+import base64
+import functools
+import hashlib
+import json
+import operator
+from collections import defaultdict
+from typing import List, Dict, Optional, Set, Tuple
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Select, Table, bindparam, case, select, func, and_, true, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models import FactWorkOrder, DimLocation, DimDate, DimProjectType, DimStatus
+from app.core.constants import AGGREGATION_BACKEND, AGGREGATION_STATEMENT_CACHE_SIZE, PIVOT_MAX_DENSE_CELLS
+from app.core.metrics import AGGREGATION_SECONDS
+from app.models import FactWorkOrder, DimLocation, DimProjectType, DimStatus
+from app.services.columnar_engine import columnar_facts
+from app.services.response_formats import ChartData
+from app.services.rollup_service import RollupManager
+
+# Fact and rollup columns the filters compare with, in ``filter_key`` order; also the
+# names of their bind parameters
+FILTER_COLUMNS = ("location_id", "project_type_id", "status_id", "year", "month")
 
 
 class WorkOrderMetrics:
+    # Result key of each group-by field
+    OUTPUT_KEYS = {
+        "location": "city_name",
+        "project_type": "project_type_name",
+        "status": "status_name",
+        "year": "year",
+        "month": "month",
+    }
+
     def __init__(
         self,
         location_id: Optional[int] = None,
@@ -15,6 +40,11 @@ class WorkOrderMetrics:
         group_by: List[str] = None,
         order_by: Optional[str] = None,
         order_dir: str = "desc",
+        use_rollups: bool = True,
+        backend: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        top_n: Optional[int] = None,
     ):
         self.location_id = location_id
         self.project_type_id = project_type_id
@@ -24,106 +54,579 @@ class WorkOrderMetrics:
         self.group_by = group_by or []
         self.order_by = order_by
         self.order_dir = order_dir
+        self.use_rollups = use_rollups
+        self.backend = backend or AGGREGATION_BACKEND
+        self.limit = limit
+        self.cursor = cursor
+        self.top_n = top_n
 
-    async def aggregate(self, db: AsyncSession) -> Dict:
-        filters = []
-        joins = set()
-        group_cols = []
+    def fields(self) -> Set[str]:
+        """Dimensions referenced by the filters and the group-by."""
+        filters = {
+            "location": self.location_id,
+            "project_type": self.project_type_id,
+            "status": self.status_id,
+            "year": self.year,
+            "month": self.month,
+        }
+        return {f for f, value in filters.items() if value is not None} | set(self.group_by)
 
-        query = select(FactWorkOrder.count)
+    def source(self) -> Table:
+        """Smallest rollup covering the query, or the fact table when none does."""
+        rollup = RollupManager.pick(self.fields()) if self.use_rollups else None
+        return rollup if rollup is not None else FactWorkOrder.__table__
 
-        # --- Filters ---
+    def filter_key(self) -> tuple:
+        return self.location_id, self.project_type_id, self.status_id, self.year, self.month
+
+    def filter_clauses(self, fact: Table) -> List:
+        filters = []
         if self.location_id is not None:
-            filters.append(FactWorkOrder.location_id == self.location_id)
+            filters.append(fact.c.location_id == self.location_id)
         if self.project_type_id is not None:
-            filters.append(FactWorkOrder.project_type_id == self.project_type_id)
+            filters.append(fact.c.project_type_id == self.project_type_id)
         if self.status_id is not None:
-            filters.append(FactWorkOrder.status_id == self.status_id)
-        if self.year is not None or self.month is not None:
-            joins.add("date")
-            if self.year is not None:
-                filters.append(DimDate.year == self.year)
-            if self.month is not None:
-                filters.append(DimDate.month == self.month)
+            filters.append(fact.c.status_id == self.status_id)
+        if self.year is not None:
+            filters.append(fact.c.year == self.year)
+        if self.month is not None:
+            filters.append(fact.c.month == self.month)
+        return filters
+
+    def output_keys(self) -> List[str]:
+        """Result keys of the group-by columns, in the order they are selected."""
+        return [key for field, key in self.OUTPUT_KEYS.items() if field in self.group_by]
+
+    def shape(self, ordered: bool = True) -> tuple:
+        """
+        Everything the statement's SQL depends on: which filters are set (not their
+        values), the group-by fields, the order and whether rollups may be used.
+        """
+        order_by = self.order_by if ordered else None
+        return (
+            tuple(value is not None for value in self.filter_key()),
+            tuple(field for field in self.OUTPUT_KEYS if field in self.group_by),
+            order_by,
+            self.order_dir == "asc" if order_by else None,
+            self.use_rollups,
+        )
+
+    def params(self) -> Dict[str, int]:
+        """Values of the filter bind parameters of ``build_query``'s statement."""
+        return {name: value for name, value in zip(FILTER_COLUMNS, self.filter_key()) if value is not None}
+
+    def build_query(self, ordered: bool = True) -> Tuple[Select, tuple]:
+        """
+        The aggregation statement of this query's shape and its result labels (the
+        group-by output keys, then "count"). Execute it with ``params()``.
+        """
+        return self.compile_shape(self.shape(ordered))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=AGGREGATION_STATEMENT_CACHE_SIZE)
+    def compile_shape(shape: tuple) -> Tuple[Select, tuple]:
+        """
+        Build the statement of a ``shape`` once. Filters compare with bind parameters
+        named after FILTER_COLUMNS, so every query of the shape reuses the statement,
+        its memoized cache key and the engine's compiled SQL.
+        """
+        filtered, group_by, order_by, ascending, use_rollups = shape
+        fields = {field for field, on in zip(WorkOrderMetrics.OUTPUT_KEYS, filtered) if on} | set(group_by)
+        rollup = RollupManager.pick(fields) if use_rollups else None
+        fact = rollup if rollup is not None else FactWorkOrder.__table__
+        keys = tuple(WorkOrderMetrics.OUTPUT_KEYS[field] for field in group_by)
+
+        query = select(fact.c.count)
+
+        # --- Filters ---
+        filters = [fact.c[name] == bindparam(name) for name, on in zip(FILTER_COLUMNS, filtered) if on]
 
         # --- Grouping ---
-        if "location" in self.group_by:
-            joins.add("location")
+        group_cols = []
+        if "location" in group_by:
+            query = query.join(DimLocation, fact.c.location_id == DimLocation.id)
             group_cols.append(DimLocation.city_name)
-        if "project_type" in self.group_by:
-            joins.add("project_type")
+        if "project_type" in group_by:
+            query = query.join(DimProjectType, fact.c.project_type_id == DimProjectType.id)
             group_cols.append(DimProjectType.name)
-        if "status" in self.group_by:
-            joins.add("status")
+        if "status" in group_by:
+            query = query.join(DimStatus, fact.c.status_id == DimStatus.id)
             group_cols.append(DimStatus.name)
-        if "year" in self.group_by or "month" in self.group_by:
-            joins.add("date")
-            if "year" in self.group_by:
-                group_cols.append(DimDate.year)
-            if "month" in self.group_by:
-                group_cols.append(DimDate.month)
-
-        # --- Joins ---
-        if "location" in joins:
-            query = query.join(DimLocation, FactWorkOrder.location_id == DimLocation.id)
-        if "project_type" in joins:
-            query = query.join(DimProjectType, FactWorkOrder.project_type_id == DimProjectType.id)
-        if "status" in joins:
-            query = query.join(DimStatus, FactWorkOrder.status_id == DimStatus.id)
-        if "date" in joins:
-            query = query.join(DimDate, FactWorkOrder.date_id == DimDate.id)
+        if "year" in group_by or "month" in group_by:
+            # year/month are denormalized on the facts; facts without a resolved date
+            # have no period and stay out of period groups
+            filters.append(fact.c.year.isnot(None))
+            if "year" in group_by:
+                group_cols.append(fact.c.year)
+            if "month" in group_by:
+                group_cols.append(fact.c.month)
 
-        # --- Filters ---
         if filters:
             query = query.where(and_(*filters))
 
         # --- Aggregation ---
+        total = func.sum(fact.c.count)
         if group_cols:
-            query = query.with_only_columns(*group_cols, func.sum(FactWorkOrder.count).label("count"))
+            labelled = [col.label(key) for col, key in zip(group_cols, keys)]
+            query = query.with_only_columns(*labelled, total.label("count"))
             query = query.group_by(*group_cols)
         else:
-            query = query.with_only_columns(func.sum(FactWorkOrder.count).label("count"))
+            query = query.with_only_columns(total.label("count"))
 
         # --- Ordering ---
-        if self.order_by:
-            field_map = {
-                "location": DimLocation.city_name,
-                "project_type": DimProjectType.name,
-                "status": DimStatus.name,
-                "year": DimDate.year,
-                "month": DimDate.month,
-                "count": func.sum(FactWorkOrder.count),
-            }
-            col = field_map[self.order_by]
-            if self.order_dir == "asc":
-                query = query.order_by(col.asc())
+        if order_by:
+            if order_by in ("year", "month"):
+                # Only present on sources that keep the period
+                col = fact.c[order_by]
             else:
-                query = query.order_by(col.desc())
+                col = {
+                    "location": DimLocation.city_name,
+                    "project_type": DimProjectType.name,
+                    "status": DimStatus.name,
+                    "count": total,
+                }[order_by]
+            query = query.order_by(col.asc() if ascending else col.desc())
+
+        return query, (*keys, "count")
+
+    # ------------------ Top-N and keyset pagination ------------------
+    def keyset_columns(self, grouped) -> List[Tuple]:
+        """
+        Total order used by pagination: the order_by column (count by default) then
+        the remaining group columns, each as a (NULL flag, non-NULL value) pair so that
+        row-value comparisons work and NULLs sort last ascending, first descending.
+        """
+        columns = []
+        for name, default in self.keyset_keys():
+            col = grouped.c[name]
+            columns.append((name, col.is_(None), func.coalesce(col, default), default))
+        return columns
 
-        # --- Execute ---
-        result = await db.execute(query)
-        rows = result.all()
+    def keyset_keys(self) -> List[Tuple[str, object]]:
+        """Output keys of ``keyset_columns`` in order, with the value standing in for NULL."""
+        key = self.OUTPUT_KEYS.get(self.order_by, "count")
+        names = [key, *(k for k in self.output_keys() if k != key)]
+        return [(name, "" if name in ("city_name", "project_type_name", "status_name") else 0) for name in names]
+
+    def shape_token(self) -> str:
+        """Identifies the query a cursor was issued for."""
+        shape = (self.filter_key(), sorted(set(self.group_by)), self.order_by, self.order_dir if self.order_by else None)
+        return hashlib.sha1(repr(shape).encode("utf-8")).hexdigest()[:12]
+
+    def encode_cursor(self, item: Dict, columns: List[Tuple]) -> str:
+        """Opaque cursor resuming after ``item`` in the keyset order of ``columns``."""
+        values = []
+        for name, _, _, default in columns:
+            value = item[name]
+            values += [value is None, default if value is None else value]
+        payload = json.dumps({"s": self.shape_token(), "v": jsonable_encoder(values)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    def cursor_values(self) -> Optional[list]:
+        """Keyset values of ``cursor``; raises ValueError for a malformed or foreign cursor."""
+        if self.cursor is None:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(self.cursor.encode("ascii")))
+            values = payload["v"]
+            shape = payload["s"]
+        except (ValueError, TypeError, KeyError, UnicodeError) as exc:
+            raise ValueError("Malformed cursor") from exc
+        keys = self.keyset_keys()
+        if shape != self.shape_token() or not isinstance(values, list) or len(values) != 2 * len(keys):
+            raise ValueError("Cursor does not belong to this query")
+        # Each key is a (NULL flag, value) pair; a value of the wrong type would fail in the database
+        for (_, default), flag, value in zip(keys, values[::2], values[1::2]):
+            expected = str if isinstance(default, str) else (int, float)
+            if not isinstance(flag, bool) or isinstance(value, bool) or not isinstance(value, expected):
+                raise ValueError("Malformed cursor")
+        return values
+
+    async def execute(self, db: AsyncSession, query: Select):
+        """
+        Run ``query`` with this query's filter values on the session's connection.
+        The statements select columns, not entities, so Core execution skips the ORM
+        loading step that would copy every row once more.
+        """
+        connection = await db.connection()
+        return await connection.execute(query, self.params())
+
+    def _grouped(self):
+        """Grouped subquery (unordered) that pagination and top-N are computed over; binds ``params()``."""
+        query, _ = self.build_query(ordered=False)
+        return query.subquery("grouped")
+
+    async def _page(self, db: AsyncSession) -> Dict:
+        """One page of groups after ``cursor`` plus the grand total, in one statement."""
+        grouped = self._grouped()
+        columns = self.keyset_columns(grouped)
+        sort_exprs = [expr for _, flag, value, _ in columns for expr in (flag, value)]
+        descending = self.order_by is None or self.order_dir != "asc"
+
+        values = self.cursor_values()
+        if values is None:
+            after = true()
+        elif descending:
+            after = tuple_(*sort_exprs) < tuple_(*values)
+        else:
+            after = tuple_(*sort_exprs) > tuple_(*values)
+        after = case((after, 1), else_=0).label("after")
+
+        # Rows before the cursor sort last; they only matter for carrying the window
+        # totals when the page itself is empty
+        query = (
+            select(
+                *grouped.c,
+                after,
+                func.sum(grouped.c["count"]).over().label("grand_total"),
+                func.count().over().label("groups"),
+            )
+            .order_by(after.desc(), *(e.desc() if descending else e.asc() for e in sort_exprs))
+            .limit(self.limit + 1)
+        )
+        rows = (await self.execute(db, query)).mappings().all()
+
+        labels = (*self.output_keys(), "count")
+        page = [tuple(row[k] for k in labels) for row in rows if row["after"]]
+        next_cursor = (
+            self.encode_cursor(dict(zip(labels, page[self.limit - 1])), columns) if len(page) > self.limit else None
+        )
+        return {
+            "total_count": (rows[0]["grand_total"] if rows else None) or 0,
+            "groups": rows[0]["groups"] if rows else 0,
+            "chart_data": ChartData(labels, page[: self.limit]),
+            "next_cursor": next_cursor,
+        }
+
+    async def _top(self, db: AsyncSession) -> Dict:
+        """The ``top_n`` largest groups, the collapsed rest and the grand total, in one statement."""
+        grouped = self._grouped()
+        keys = self.output_keys()
+        ranked = select(
+            *grouped.c,
+            func.row_number().over(order_by=[grouped.c["count"].desc(), *(grouped.c[k] for k in keys)]).label("rank"),
+            func.sum(grouped.c["count"]).over().label("grand_total"),
+            func.count().over().label("groups"),
+        ).subquery("ranked")
+
+        in_top = ranked.c.rank <= self.top_n
+        bucket = case((in_top, ranked.c.rank), else_=self.top_n + 1)
+        query = (
+            select(
+                bucket.label("bucket"),
+                *(func.max(case((in_top, ranked.c[k]))).label(k) for k in keys),
+                func.sum(ranked.c["count"]).label("count"),
+                func.count().label("members"),
+                func.max(ranked.c.grand_total).label("grand_total"),
+                func.max(ranked.c.groups).label("groups"),
+            )
+            .group_by(bucket)
+            .order_by(bucket)
+        )
+        rows = (await self.execute(db, query)).mappings().all()
+
+        top = [{**{k: row[k] for k in keys}, "count": row["count"]} for row in rows if row["bucket"] <= self.top_n]
+        rest = [row for row in rows if row["bucket"] > self.top_n]
+        return {
+            "total_count": (rows[0]["grand_total"] if rows else None) or 0,
+            "groups": rows[0]["groups"] if rows else 0,
+            "chart_data": ChartData.from_records((*keys, "count"), self.sort(top) if self.order_by else top),
+            "others": {
+                "groups": rest[0]["members"] if rest else 0,
+                "count": rest[0]["count"] if rest else 0,
+            },
+        }
+
+    def shape_label(self) -> str:
+        """Low-cardinality description of the query for metrics: group-by and filtered fields."""
+        filters = [name for name, value in zip(self.OUTPUT_KEYS, self.filter_key()) if value is not None]
+        return f"group_by={','.join(sorted(set(self.group_by))) or '-'};filters={','.join(filters) or '-'}"
+
+    async def aggregate(self, db: AsyncSession, records: bool = True) -> Dict:
+        """
+        ``total_count`` and ``chart_data`` (plus the page or top-N fields). With
+        ``records=False`` chart_data is left as a ChartData for the response formats
+        to encode, instead of a list of dicts.
+        """
+        mode = "top_n" if self.top_n is not None else "page" if self.limit is not None else "full"
+        with AGGREGATION_SECONDS.labels(shape=self.shape_label(), mode=mode, backend=self.backend).time():
+            result = await self._aggregate(db)
+        if records:
+            result["chart_data"] = result["chart_data"].records()
+        return result
+
+    async def rows(self, db: AsyncSession) -> List[tuple]:
+        """Result rows, from the columnar engine or SQL: the group-by labels in OUTPUT_KEYS order, then the sum."""
+        if self.backend == "numpy":
+            facts = await columnar_facts.get(db)
+            if facts.supports(self.group_by):
+                filters = dict(zip(self.OUTPUT_KEYS, self.filter_key()))
+                return facts.aggregate(filters, self.group_by, self.order_by, self.order_dir)
+        query, _ = self.build_query()
+        return (await self.execute(db, query)).all()
+
+    async def _aggregate(self, db: AsyncSession) -> Dict:
+        if self.top_n is not None:
+            return await self._top(db)
+        if self.limit is not None:
+            return await self._page(db)
+
+        rows = await self.rows(db)
 
         # --- Format Result ---
-        chart_data = []
-        for row in rows:
-            if group_cols:
-                item = {}
-                for idx, col in enumerate(group_cols):
-                    if col == DimLocation.city_name:
-                        item["city_name"] = row[idx]
-                    elif col == DimProjectType.name:
-                        item["project_type_name"] = row[idx]
-                    elif col == DimStatus.name:
-                        item["status_name"] = row[idx]
-                    elif col == DimDate.year:
-                        item["year"] = row[idx]
-                    elif col == DimDate.month:
-                        item["month"] = row[idx]
-                item["count"] = row[-1]
-                chart_data.append(item)
-            else:
-                chart_data.append({"count": row[0]})
+        # Group columns come in OUTPUT_KEYS order, followed by the sum
+        chart_data = ChartData((*self.output_keys(), "count"), rows)
 
-        total_count = sum(item["count"] for item in chart_data)
+        # A filter matching no facts sums to NULL
+        total_count = sum(row[-1] or 0 for row in rows)
         return {"total_count": total_count, "chart_data": chart_data}
+
+    def sort(self, chart_data: List[Dict]) -> List[Dict]:
+        """Apply order_by/order_dir in Python, with NULLs placed as PostgreSQL does."""
+        key = "count" if self.order_by == "count" else self.OUTPUT_KEYS.get(self.order_by)
+        if key is None or any(key not in item for item in chart_data):
+            return chart_data
+        return sorted(
+            chart_data,
+            key=lambda item: (item[key] is None, item[key] if item[key] is not None else 0),
+            reverse=self.order_dir != "asc",
+        )
+
+
+def _label_key(label) -> tuple:
+    """Sort key of a pivot label (a value, or a tuple of them), NULLs last."""
+    values = label if isinstance(label, tuple) else (label,)
+    return tuple((value is None, value if value is not None else 0) for value in values)
+
+
+class PivotMetrics:
+    """
+    Crosstab of the facts matching WorkOrderMetrics filters: one cell per combination
+    of the ``rows`` and ``cols`` fields, all from one grouped query over both. Labels
+    are sorted ascending; row and column totals are added up from the cells.
+
+    A label is the field's value when ``rows`` (or ``cols``) has one field and a tuple
+    of values otherwise. The dense layout returns a ``values`` matrix with null for
+    combinations without facts; the sparse one lists ``[row, col, value]`` index
+    triplets of the cells that exist.
+    """
+
+    LAYOUTS = ("dense", "sparse")
+
+    def __init__(
+        self,
+        rows: List[str],
+        cols: List[str],
+        layout: str = "dense",
+        margins: bool = True,
+        **filters,
+    ):
+        self.rows = list(dict.fromkeys(rows))
+        self.cols = list(dict.fromkeys(cols))
+        self.layout = layout
+        self.margins = margins
+        self.metrics = WorkOrderMetrics(**filters, group_by=[*self.rows, *self.cols])
+
+    async def aggregate(self, db: AsyncSession) -> Dict:
+        metrics = self.metrics
+        with AGGREGATION_SECONDS.labels(shape=metrics.shape_label(), mode="pivot", backend=metrics.backend).time():
+            return self.pivot(await metrics.rows(db))
+
+    def pivot(self, result_rows: List[tuple]) -> Dict:
+        """Matrix of ``result_rows`` (shaped like ``WorkOrderMetrics.rows``)."""
+        fields = [f for f in WorkOrderMetrics.OUTPUT_KEYS if f in self.metrics.group_by]
+        row_of = operator.itemgetter(*(fields.index(f) for f in self.rows))
+        col_of = operator.itemgetter(*(fields.index(f) for f in self.cols))
+
+        # PostgreSQL sums rollup counts as NUMERIC; counts are whole numbers
+        cells = {
+            (row_of(row), col_of(row)): int(row[-1]) if row[-1] is not None else None
+            for row in result_rows
+        }
+        row_labels = sorted({r for r, _ in cells}, key=_label_key)
+        col_labels = sorted({c for _, c in cells}, key=_label_key)
+        if self.layout == "dense" and len(row_labels) * len(col_labels) > PIVOT_MAX_DENSE_CELLS:
+            raise ValueError(
+                f"{len(row_labels)} x {len(col_labels)} matrix exceeds {PIVOT_MAX_DENSE_CELLS} cells; use layout=sparse"
+            )
+        row_index = {label: i for i, label in enumerate(row_labels)}
+        col_index = {label: j for j, label in enumerate(col_labels)}
+
+        row_totals = [0] * len(row_labels)
+        col_totals = [0] * len(col_labels)
+        for (r, c), value in cells.items():
+            row_totals[row_index[r]] += value or 0
+            col_totals[col_index[c]] += value or 0
+
+        result = {
+            "rows": self.rows,
+            "cols": self.cols,
+            "layout": self.layout,
+            "row_labels": row_labels,
+            "col_labels": col_labels,
+            "total_count": sum(row_totals),
+        }
+        if self.layout == "dense":
+            values = [[None] * len(col_labels) for _ in row_labels]
+            for (r, c), value in cells.items():
+                values[row_index[r]][col_index[c]] = value
+            result["values"] = values
+        else:
+            result["cells"] = sorted([row_index[r], col_index[c], value] for (r, c), value in cells.items())
+        if self.margins:
+            result["row_totals"] = row_totals
+            result["col_totals"] = col_totals
+        return result
+
+
+class BatchMetrics:
+    """
+    Answers several WorkOrderMetrics specs with one statement per distinct filter
+    combination instead of one per spec.
+
+    The group-bys of specs sharing filters become the GROUPING SETS of a single scan
+    of the smallest rollup (or the fact table) covering all of them. Subtotals (the
+    leading prefixes of a spec's group_by, as ROLLUP would produce) and the grand
+    total are extra sets of the same statement. Dimensions are LEFT joined once; a
+    presence flag per grouped dimension keeps the inner-join semantics of
+    WorkOrderMetrics.aggregate. Backends without GROUPING SETS run one statement per set.
+    """
+
+    # Presence flag each group-by field is checked against; year and month share one
+    FLAGS = {"location": "location", "project_type": "project_type", "status": "status",
+             "year": "period", "month": "period"}
+
+    def __init__(self):
+        self.items: List[Tuple[WorkOrderMetrics, bool, bool]] = []
+        self.statements = 0
+
+    def add(self, metrics: WorkOrderMetrics, subtotals: bool = False, grand_total: bool = False):
+        self.items.append((metrics, subtotals, grand_total))
+
+    @staticmethod
+    def canonical(fields) -> tuple:
+        return tuple(f for f in WorkOrderMetrics.OUTPUT_KEYS if f in fields)
+
+    @staticmethod
+    def levels(metrics: WorkOrderMetrics) -> List[list]:
+        """Subtotal levels of a spec: each leading prefix of its group_by, longest first."""
+        group_by = list(dict.fromkeys(metrics.group_by))
+        return [group_by[:n] for n in range(len(group_by) - 1, 0, -1)]
+
+    def grouping_sets(self, metrics: WorkOrderMetrics, subtotals: bool, grand_total: bool) -> List[tuple]:
+        sets = [self.canonical(metrics.group_by)]
+        if subtotals:
+            sets += [self.canonical(level) for level in self.levels(metrics)]
+        if grand_total:
+            sets.append(())
+        return sets
+
+    @staticmethod
+    def columns(fact: Table) -> Dict[str, tuple]:
+        """Output column and presence flag of each group-by field on ``fact``."""
+        period = fact.c.year.isnot(None) if "year" in fact.c else None
+        return {
+            "location": (DimLocation.city_name, DimLocation.id.isnot(None)),
+            "project_type": (DimProjectType.name, DimProjectType.id.isnot(None)),
+            "status": (DimStatus.name, DimStatus.id.isnot(None)),
+            "year": (fact.c.year if "year" in fact.c else None, period),
+            "month": (fact.c.month if "month" in fact.c else None, period),
+        }
+
+    async def _grouped(self, db: AsyncSession, template: WorkOrderMetrics, sets: List[tuple]) -> Dict[tuple, List]:
+        """Rows of every grouping set in ``sets`` from one GROUPING SETS statement."""
+        fact = template.source()
+        fields = self.canonical(set().union(*sets))
+        columns = self.columns(fact)
+        flags = {self.FLAGS[f]: columns[f][1] for f in fields}
+
+        query = select(
+            *(columns[f][0].label(f) for f in fields),
+            *(flag.label(f"has_{name}") for name, flag in flags.items()),
+            *(func.grouping(columns[f][0]).label(f"g_{f}") for f in fields),
+            func.sum(fact.c.count).label("count"),
+        ).select_from(fact)
+        if "location" in fields:
+            query = query.outerjoin(DimLocation, fact.c.location_id == DimLocation.id)
+        if "project_type" in fields:
+            query = query.outerjoin(DimProjectType, fact.c.project_type_id == DimProjectType.id)
+        if "status" in fields:
+            query = query.outerjoin(DimStatus, fact.c.status_id == DimStatus.id)
+        filters = template.filter_clauses(fact)
+        if filters:
+            query = query.where(and_(*filters))
+
+        def set_columns(grouping: tuple) -> list:
+            set_flags = dict.fromkeys(self.FLAGS[f] for f in grouping)
+            return [*(columns[f][0] for f in grouping), *(flags[name] for name in set_flags)]
+
+        query = query.group_by(func.grouping_sets(*(tuple_(*set_columns(g)) for g in sets)))
+
+        grouped = {g: [] for g in sets}
+        self.statements += 1
+        connection = await db.connection()
+        for row in (await connection.execute(query)).mappings():
+            grouping = tuple(f for f in fields if row[f"g_{f}"] == 0)
+            # A NULL presence flag never occurs for grouped fields; False means the
+            # inner join of the single-spec query would have dropped the row
+            if not all(row[f"has_{self.FLAGS[f]}"] for f in grouping):
+                continue
+            item = {WorkOrderMetrics.OUTPUT_KEYS[f]: row[f] for f in grouping}
+            item["count"] = row["count"]
+            grouped.setdefault(grouping, []).append(item)
+        return grouped
+
+    async def _separately(self, db: AsyncSession, template: WorkOrderMetrics, sets: List[tuple]) -> Dict[tuple, List]:
+        grouped = {}
+        for grouping in sets:
+            metrics = WorkOrderMetrics(*template.filter_key(), group_by=list(grouping), use_rollups=template.use_rollups)
+            self.statements += 1
+            grouped[grouping] = (await metrics.aggregate(db))["chart_data"]
+        return grouped
+
+    async def aggregate(self, db: AsyncSession, records: bool = True) -> List[Dict]:
+        """
+        Results in the order the specs were added, shaped like WorkOrderMetrics.aggregate;
+        ``records=False`` likewise leaves every chart_data as a ChartData.
+        """
+        by_filters = defaultdict(list)
+        for metrics, subtotals, grand_total in self.items:
+            by_filters[(metrics.filter_key(), metrics.use_rollups)].append((metrics, subtotals, grand_total))
+
+        run = self._grouped if db.get_bind().dialect.name == "postgresql" else self._separately
+        grouped = {}
+        for (filter_key, use_rollups), items in by_filters.items():
+            sets = list(dict.fromkeys(g for item in items for g in self.grouping_sets(*item)))
+            template = WorkOrderMetrics(
+                *filter_key, group_by=list(set().union(*sets)), use_rollups=use_rollups
+            )
+            for grouping, rows in (await run(db, template, sets)).items():
+                grouped[(filter_key, use_rollups, grouping)] = rows
+
+        results = []
+        for metrics, subtotals, grand_total in self.items:
+            def rows_of(fields) -> List[Dict]:
+                return grouped[(metrics.filter_key(), metrics.use_rollups, self.canonical(fields))]
+
+            def chart_data_of(fields):
+                chart_data = metrics.sort(rows_of(fields))
+                if records:
+                    return chart_data
+                keys = [key for field, key in WorkOrderMetrics.OUTPUT_KEYS.items() if field in fields]
+                return ChartData.from_records((*keys, "count"), chart_data)
+
+            chart_data = chart_data_of(metrics.group_by)
+            result = {
+                "total_count": sum(item["count"] or 0 for item in rows_of(metrics.group_by)),
+                "chart_data": chart_data,
+            }
+            if subtotals:
+                result["subtotals"] = [
+                    {"group_by": level, "chart_data": chart_data_of(level)}
+                    for level in self.levels(metrics)
+                ]
+            if grand_total:
+                total = rows_of(())
+                result["grand_total"] = (total[0]["count"] if total else None) or 0
+            results.append(result)
+        return results
@@ -0,0 +1,198 @@
+import asyncio
+import gzip
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Hashable, Optional
+import brotli
+from fastapi import Request, Response
+from app.core.constants import (
+    AGGREGATION_CACHE_MAX_BYTES,
+    BROTLI_QUALITY,
+    GZIP_LEVEL,
+    RESPONSE_COMPRESS_MIN_BYTES,
+    RESPONSE_COMPRESSION,
+)
+from app.core.generation import data_generation
+
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    "br": lambda body: brotli.compress(body, quality=BROTLI_QUALITY),
+    "gzip": lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+}
+
+
+def compress(body: bytes) -> Dict[str, bytes]:
+    """``body`` in each RESPONSE_COMPRESSION coding that makes it smaller; none for small bodies."""
+    if len(body) < RESPONSE_COMPRESS_MIN_BYTES:
+        return {}
+    encoded = {}
+    for coding in RESPONSE_COMPRESSION:
+        compressed = COMPRESSORS[coding](body)
+        if len(compressed) < len(body):
+            encoded[coding] = compressed
+    return encoded
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """
+    A serialized response, its ETag and its compressed variants. Compressing once
+    when the response is cached keeps it off the path of every later request.
+    """
+    body: bytes
+    etag: str
+    media_type: str = "application/json"
+    encoded: Dict[str, bytes] = field(default_factory=dict, compare=False)
+
+    @classmethod
+    def from_body(cls, body: bytes, media_type: str = "application/json") -> "CachedResponse":
+        return cls(
+            body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"', media_type=media_type, encoded=compress(body),
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.etag) + sum(len(body) for body in self.encoded.values())
+
+    def etag_for(self, coding: Optional[str]) -> str:
+        """Strong ETags differ between content codings of the same representation."""
+        return self.etag if coding is None else f'{self.etag[:-1]}-{coding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header lists ``etag`` (weak comparison) or is ``*``."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def accepted_coding(accept_encoding: Optional[str], available) -> Optional[str]:
+    """The first RESPONSE_COMPRESSION coding in ``available`` that Accept-Encoding allows."""
+    if not accept_encoding:
+        return None
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    for coding in RESPONSE_COMPRESSION:
+        if coding in available and qualities.get(coding, qualities.get("*", 0)) > 0:
+            return coding
+    return None
+
+
+def cached_response(request: Request, cached: CachedResponse) -> Response:
+    """
+    Serve a pre-serialized response with its ETag, compressed when the client accepts
+    one of its cached codings, or a 304 when the client already has it.
+    """
+    coding = accepted_coding(request.headers.get("accept-encoding"), cached.encoded)
+    etag = cached.etag_for(coding)
+    headers = {"ETag": etag, "Vary": "Accept, Accept-Encoding"}
+    if_none_match = request.headers.get("if-none-match")
+    if etag_matches(if_none_match, etag) or etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    if coding is None:
+        return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+    headers["Content-Encoding"] = coding
+    return Response(content=cached.encoded[coding], media_type=cached.media_type, headers=headers)
+
+
+class ResultCache:
+    """
+    Byte-bounded LRU of serialized responses.
+
+    Keys are tagged with the data generation, and the whole cache is dropped when the
+    generation is bumped. Concurrent misses on the same key share one computation.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        data_generation.subscribe(lambda _: self.clear())
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def _get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: Hashable, entry: CachedResponse):
+        if entry.size > self.max_bytes or key[0] != data_generation.current:
+            return
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    async def get_or_compute(
+        self, key: Hashable, compute: Callable[[], Awaitable[bytes]], media_type: str = "application/json",
+    ) -> CachedResponse:
+        """
+        Cached response for ``key``, computing its body with ``compute`` on a miss.
+        ``key`` must tell apart every representation, i.e. include the response format.
+        """
+        key = (data_generation.current, key)
+        entry = self._get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = CachedResponse.from_body(await compute(), media_type)
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark the exception retrieved when no other request was waiting on it
+            future.exception()
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        else:
+            future.set_result(entry)
+            self._put(key, entry)
+            return entry
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict:
+        return {
+            "generation": data_generation.current,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+
+aggregation_cache = ResultCache(AGGREGATION_CACHE_MAX_BYTES)
@@ -0,0 +1,214 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.constants import COLUMNAR_MAX_GROUPS
+from app.core.generation import data_generation
+from app.models import DimLocation, DimProjectType, DimStatus, FactWorkOrder
+
+# Group-by fields in the column order WorkOrderMetrics returns them
+FIELDS = ("location", "project_type", "status", "year", "month")
+# Fact column each filter compares against
+FILTER_COLUMNS = {
+    "location": "location_id",
+    "project_type": "project_type_id",
+    "status": "status_id",
+    "year": "year",
+    "month": "month",
+}
+# Stand-in for NULL periods while factorizing
+NULL_PERIOD = np.iinfo(np.int32).min
+
+
+def _dimension_codes(ids: np.ndarray, present: np.ndarray, labels_by_id: Dict[int, object]) -> Tuple[np.ndarray, list]:
+    """
+    Group code of every fact for a dimension label, or -1 where the inner join to the
+    dimension drops the fact. Ids sharing a label (e.g. a city in two departments)
+    share a code, as grouping by the label in SQL does.
+    """
+    labels = list(dict.fromkeys(labels_by_id.values()))
+    code_of = {label: code for code, label in enumerate(labels)}
+    lookup = np.full(max(labels_by_id, default=0) + 1, -1, dtype=np.int32)
+    for dim_id, label in labels_by_id.items():
+        if dim_id >= 0:
+            lookup[dim_id] = code_of[label]
+    joined = present & (ids >= 0) & (ids < len(lookup))
+    codes = np.full(len(ids), -1, dtype=np.int32)
+    codes[joined] = lookup[ids[joined]]
+    return codes, labels
+
+
+def _period_codes(values: np.ndarray, present: np.ndarray, keep: np.ndarray) -> Tuple[np.ndarray, list]:
+    """Group code of every kept fact's year or month value; NULL values get a None label."""
+    uniques, inverse = np.unique(np.where(present, values, NULL_PERIOD)[keep], return_inverse=True)
+    codes = np.full(len(values), -1, dtype=np.int32)
+    codes[keep] = inverse
+    return codes, [None if u == NULL_PERIOD else int(u) for u in uniques]
+
+
+def _ranks(labels: list, presorted: bool = False) -> np.ndarray:
+    """
+    Sort position of each label code; None sorts last like NULL in ascending SQL order.
+    Text labels must come ``presorted`` by the database: Python compares strings by
+    codepoint, which agrees with ORDER BY only under the C collation.
+    """
+    if presorted:
+        order = sorted(range(len(labels)), key=lambda c: (labels[c] is None, c))
+    else:
+        order = sorted(range(len(labels)), key=lambda c: (labels[c] is None, labels[c] if labels[c] is not None else 0))
+    ranks = np.empty(len(labels), dtype=np.int64)
+    ranks[order] = np.arange(len(labels))
+    return ranks
+
+
+@dataclass(frozen=True)
+class ColumnarFacts:
+    """
+    ``fact_work_order`` for one data generation as int32 columns, plus per-field group
+    codes resolved through the dimensions at load time.
+    """
+    generation: int
+    ids: Dict[str, np.ndarray]
+    present: Dict[str, np.ndarray]
+    codes: Dict[str, np.ndarray]
+    labels: Dict[str, list]
+    ranks: Dict[str, np.ndarray]
+    counts: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def supports(self, group_by: Sequence[str]) -> bool:
+        """Whether the group-by cross product is small enough to bin with bincount."""
+        space = 1
+        for field in set(group_by):
+            space *= max(len(self.labels[field]), 1)
+        return space <= COLUMNAR_MAX_GROUPS
+
+    def aggregate(
+        self,
+        filters: Dict[str, Optional[int]],
+        group_by: Sequence[str],
+        order_by: Optional[str] = None,
+        order_dir: str = "desc",
+    ) -> List[tuple]:
+        """
+        Rows shaped like the SQL result: the group-by labels in ``FIELDS`` order, then
+        SUM(count). Without a group-by, a single row whose sum is None when nothing matches.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for field, value in filters.items():
+            if value is not None:
+                column = FILTER_COLUMNS[field]
+                mask &= self.present[column] & (self.ids[column] == value)
+
+        fields = [f for f in FIELDS if f in group_by]
+        if not fields:
+            return [(int(self.counts[mask].sum()) if mask.any() else None,)]
+
+        # Facts the SQL joins (or the year IS NOT NULL filter) would drop
+        for field in fields:
+            mask &= self.codes[field] >= 0
+        shape = tuple(len(self.labels[f]) for f in fields)
+        flat = np.ravel_multi_index(tuple(self.codes[f][mask] for f in fields), shape)
+        size = int(np.prod(shape))
+        rows = np.bincount(flat, minlength=size)
+        sums = np.bincount(flat, weights=self.counts[mask], minlength=size)
+
+        groups = np.flatnonzero(rows)
+        group_codes = np.unravel_index(groups, shape)
+        group_sums = np.rint(sums[groups]).astype(np.int64)
+
+        if order_by:
+            if order_by == "count":
+                key = group_sums
+            else:
+                key = self.ranks[order_by][group_codes[fields.index(order_by)]]
+            order = np.argsort(key, kind="stable")
+            if order_dir != "asc":
+                order = order[::-1]
+            group_codes = tuple(codes[order] for codes in group_codes)
+            group_sums = group_sums[order]
+
+        labels = [self.labels[f] for f in fields]
+        return [
+            (*(labels[i][codes[n]] for i, codes in enumerate(group_codes)), int(group_sums[n]))
+            for n in range(len(group_sums))
+        ]
+
+
+class ColumnarFactStore:
+    """
+    Holds the current ``ColumnarFacts``. Like the dimension snapshot, a new generation
+    is built off to the side and published with a single reference swap.
+    """
+
+    def __init__(self):
+        self.facts: Optional[ColumnarFacts] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    async def _labels(db: AsyncSession, label_column) -> Dict[int, object]:
+        """Label of every dimension id, in the order ORDER BY the label gives them."""
+        model = label_column.class_
+        result = await db.execute(select(model.id, label_column).order_by(label_column, model.id))
+        return dict(result.tuples().all())
+
+    async def load(self, db: AsyncSession) -> ColumnarFacts:
+        """Read the fact table and dimension labels into arrays and publish them."""
+        facts = await self.build(db, data_generation.current)
+        self.facts = facts
+        return facts
+
+    async def build(self, db: AsyncSession, generation: int) -> ColumnarFacts:
+        """Arrays of the database tagged with ``generation``, without publishing them."""
+        columns = list(FILTER_COLUMNS.values())
+        result = await db.execute(select(*(FactWorkOrder.__table__.c[c] for c in columns), FactWorkOrder.count))
+        df = pd.DataFrame(result.tuples().all(), columns=[*columns, "count"])
+
+        ids, present = {}, {}
+        for column in columns:
+            present[column] = df[column].notna().to_numpy()
+            ids[column] = df[column].fillna(0).to_numpy(dtype=np.int64).astype(np.int32)
+
+        codes, labels = {}, {}
+        for field, label_column in (
+            ("location", DimLocation.city_name),
+            ("project_type", DimProjectType.name),
+            ("status", DimStatus.name),
+        ):
+            column = FILTER_COLUMNS[field]
+            codes[field], labels[field] = _dimension_codes(
+                ids[column], present[column], await self._labels(db, label_column)
+            )
+        has_period = present["year"]
+        for field in ("year", "month"):
+            codes[field], labels[field] = _period_codes(ids[field], present[field], has_period)
+
+        facts = ColumnarFacts(
+            generation=generation,
+            ids=ids,
+            present=present,
+            codes=codes,
+            labels=labels,
+            ranks={field: _ranks(labels[field], presorted=field not in ("year", "month")) for field in FIELDS},
+            counts=df["count"].fillna(0).to_numpy(dtype=np.int64),
+        )
+        return facts
+
+    async def get(self, db: AsyncSession) -> ColumnarFacts:
+        """Current arrays, reloaded first if they predate the current data generation."""
+        facts = self.facts
+        if facts is not None and facts.generation == data_generation.current:
+            return facts
+        async with self._lock:
+            facts = self.facts
+            if facts is None or facts.generation != data_generation.current:
+                facts = await self.load(db)
+            return facts
+
+
+columnar_facts = ColumnarFactStore()
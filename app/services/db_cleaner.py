@@ -1,5 +1,6 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import delete
+from sqlalchemy import delete, text, tuple_
+from typing import Iterable, Tuple
 from app.models import DimLocation, DimDate, DimProjectType, DimStatus, FactWorkOrder
 
 
@@ -14,19 +15,32 @@ class WorkOrderCleaner:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def clear_facts(self):
-        """Delete all records from fact tables."""
-        for table in self.FACT_TABLES:
-            await self.db.execute(delete(table))
-        await self.db.commit()
+    async def clear_all(self, commit: bool = True):
+        """
+        Clear both fact and dimension tables in one transaction.
+        On PostgreSQL a single TRUNCATE replaces the row-by-row deletes.
+        With ``commit=False`` the clear is left to the caller's transaction.
+        """
+        tables = self.FACT_TABLES + self.DIM_TABLES
+        if self.db.get_bind().dialect.name == "postgresql":
+            await self.db.execute(text(f"TRUNCATE {', '.join(t.__tablename__ for t in tables)}"))
+        else:
+            for table in tables:
+                await self.db.execute(delete(table))
+        if commit:
+            await self.db.commit()
 
-    async def clear_dimensions(self):
-        """Delete all records from dimension tables."""
-        for table in self.DIM_TABLES:
-            await self.db.execute(delete(table))
-        await self.db.commit()
-
-    async def clear_all(self):
-        """Clear both fact and dimension tables in correct order."""
-        await self.clear_facts()
-        await self.clear_dimensions()
+    async def clear_periods(self, periods: Iterable[Tuple[int, int]], commit: bool = True) -> int:
+        """
+        Delete the facts of the given (year, month) periods; returns the deleted row
+        count. With ``commit=False`` the delete is left to the caller's transaction.
+        """
+        periods = [tuple(p) for p in periods]
+        if not periods:
+            return 0
+        result = await self.db.execute(
+            delete(FactWorkOrder).where(tuple_(FactWorkOrder.year, FactWorkOrder.month).in_(periods))
+        )
+        if commit:
+            await self.db.commit()
+        return result.rowcount
@@ -0,0 +1,99 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.generation import data_generation
+from app.models import DimLocation, DimDate, DimProjectType, DimStatus
+from app.services.cache_service import CachedResponse
+from app.services.response_formats import DOCUMENT_FORMATS, FORMATS, TABLE_FORMATS, ChartData, ResponseFormat
+
+DIMENSION_NAMES = ("locations", "project_types", "statuses", "years", "months")
+
+# Formats each list is pre-serialized in; "dimensions" is all lists in one document
+SNAPSHOT_FORMATS = {
+    "locations": TABLE_FORMATS,
+    "project_types": TABLE_FORMATS,
+    "statuses": TABLE_FORMATS,
+    "years": DOCUMENT_FORMATS,
+    "months": DOCUMENT_FORMATS,
+    "dimensions": DOCUMENT_FORMATS,
+}
+
+
+@dataclass(frozen=True)
+class DimensionSnapshot:
+    """Immutable, pre-serialized view of all dimension lists for one data generation."""
+    generation: int
+    responses: Dict[Tuple[str, str], CachedResponse]
+
+    def response(self, name: str, fmt: ResponseFormat) -> CachedResponse:
+        """List ``name`` (or "dimensions" for all of them) serialized as ``fmt``."""
+        return self.responses[(name, fmt.name)]
+
+    def changed_since(self, previous: Optional["DimensionSnapshot"]) -> List[str]:
+        """Lists whose content differs from ``previous`` (all of them without one), by ETag."""
+        return [
+            name for name in DIMENSION_NAMES
+            if previous is None or previous.responses[(name, "json")].etag != self.responses[(name, "json")].etag
+        ]
+
+
+class DimensionSnapshotStore:
+    """
+    Holds the current ``DimensionSnapshot``. A new snapshot is built off to the side and
+    published with a single reference swap, so readers never see a partial one.
+    """
+
+    def __init__(self):
+        self.snapshot: Optional[DimensionSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    async def _query(db: AsyncSession) -> Dict:
+        locations = await db.execute(select(DimLocation.id, DimLocation.city_name).order_by(DimLocation.id))
+        project_types = await db.execute(select(DimProjectType.id, DimProjectType.name).order_by(DimProjectType.id))
+        statuses = await db.execute(select(DimStatus.id, DimStatus.name).order_by(DimStatus.id))
+        years = await db.execute(select(DimDate.year).distinct().order_by(DimDate.year))
+        months = await db.execute(select(DimDate.month).distinct().order_by(DimDate.month))
+        return {
+            "locations": ChartData(("id", "name"), [tuple(r) for r in locations.all()]),
+            "project_types": ChartData(("id", "name"), [tuple(r) for r in project_types.all()]),
+            "statuses": ChartData(("id", "name"), [tuple(r) for r in statuses.all()]),
+            "years": years.scalars().all(),
+            "months": months.scalars().all(),
+        }
+
+    async def load(self, db: AsyncSession) -> DimensionSnapshot:
+        """Rebuild the snapshot from the database and publish it."""
+        snapshot = await self.build(db, data_generation.current)
+        self.snapshot = snapshot
+        return snapshot
+
+    async def build(self, db: AsyncSession, generation: int) -> DimensionSnapshot:
+        """Snapshot of the database tagged with ``generation``, without publishing it."""
+        documents = await self._query(db)
+        documents["dimensions"] = dict(documents)
+        snapshot = DimensionSnapshot(
+            generation=generation,
+            responses={
+                (name, fmt): CachedResponse.from_body(FORMATS[fmt].encode(documents[name]), FORMATS[fmt].media_type)
+                for name, formats in SNAPSHOT_FORMATS.items()
+                for fmt in formats
+            },
+        )
+        return snapshot
+
+    async def get(self, db: AsyncSession) -> DimensionSnapshot:
+        """Current snapshot, reloaded first if it predates the current data generation."""
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.generation == data_generation.current:
+            return snapshot
+        async with self._lock:
+            snapshot = self.snapshot
+            if snapshot is None or snapshot.generation != data_generation.current:
+                snapshot = await self.load(db)
+            return snapshot
+
+
+dimension_snapshot = DimensionSnapshotStore()
@@ -0,0 +1,112 @@
+import os
+import time
+from typing import Dict, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather
+import pyarrow.parquet
+from app.core.metrics import ETL_ARTIFACT_WRITE_SECONDS
+from app.core.constants import (
+    LONG_ARROW_PATH,
+    LONG_CSV_GZ_PATH,
+    LONG_CSV_PATH,
+    LONG_EXCEL_PATH,
+    LONG_PARQUET_PATH,
+)
+
+
+def dictionary_encoded(df_long: pd.DataFrame) -> pd.DataFrame:
+    """
+    Copy of ``df_long`` with its text columns as categoricals, which Arrow stores as
+    dictionary arrays: each city, project type and status is kept once.
+    """
+    df = df_long.copy(deep=False)
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].astype("string").astype("category")
+    return df
+
+
+class ArtifactWriter:
+    """Writes the transformed long table to one file format (blocking)."""
+
+    format: str
+    path: str
+
+    def __init__(self, path: Optional[str] = None):
+        if path is not None:
+            self.path = path
+
+    def write(self, df_long: pd.DataFrame) -> Dict:
+        """Write the artifact and report its path, size and write time."""
+        start = time.perf_counter()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with ETL_ARTIFACT_WRITE_SECONDS.labels(format=self.format).time():
+            self._write(df_long)
+        return {
+            "format": self.format,
+            "path": self.path,
+            "bytes": os.path.getsize(self.path),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    def _write(self, df_long: pd.DataFrame):
+        raise NotImplementedError
+
+
+class ExcelWriter(ArtifactWriter):
+    format = "xlsx"
+    path = LONG_EXCEL_PATH
+
+    def _write(self, df_long: pd.DataFrame):
+        df_long.to_excel(self.path, index=False)
+
+
+class CsvWriter(ArtifactWriter):
+    format = "csv"
+    path = LONG_CSV_PATH
+
+    def _write(self, df_long: pd.DataFrame):
+        df_long.to_csv(self.path, index=False)
+
+
+class CompressedCsvWriter(ArtifactWriter):
+    format = "csv.gz"
+    path = LONG_CSV_GZ_PATH
+
+    def _write(self, df_long: pd.DataFrame):
+        # Level 6 is several times faster than pandas' default of 9 for a few % of size
+        df_long.to_csv(self.path, index=False, compression={"method": "gzip", "compresslevel": 6})
+
+
+class ParquetWriter(ArtifactWriter):
+    format = "parquet"
+    path = LONG_PARQUET_PATH
+
+    def _write(self, df_long: pd.DataFrame):
+        table = pa.Table.from_pandas(dictionary_encoded(df_long), preserve_index=False)
+        pa.parquet.write_table(table, self.path, use_dictionary=True, compression="zstd")
+
+
+class ArrowWriter(ArtifactWriter):
+    """Arrow IPC file (Feather v2), memory-mappable by readers."""
+
+    format = "arrow"
+    path = LONG_ARROW_PATH
+
+    def _write(self, df_long: pd.DataFrame):
+        table = pa.Table.from_pandas(dictionary_encoded(df_long), preserve_index=False)
+        pa.feather.write_feather(table, self.path, compression="lz4")
+
+
+WRITERS = {writer.format: writer for writer in (
+    ExcelWriter, CsvWriter, CompressedCsvWriter, ParquetWriter, ArrowWriter,
+)}
+
+
+def check_formats(formats: List[str]) -> List[str]:
+    """Validate artifact formats; raises ValueError on an unknown one."""
+    unknown = [f for f in formats if f not in WRITERS]
+    if unknown:
+        raise ValueError(f"Unknown artifact format(s) {unknown}; expected any of {sorted(WRITERS)}")
+    return list(dict.fromkeys(formats))
@@ -0,0 +1,59 @@
+from typing import List
+import numpy as np
+import pandas as pd
+
+
+def normalize_int(series: pd.Series) -> pd.Series:
+    """Convert a column to nullable integers; unparsable values become <NA>."""
+    numeric = pd.to_numeric(series, errors="coerce")
+    values = np.trunc(np.asarray(numeric, dtype=np.float64))
+    # Build the masked array directly; astype("Int64") re-validates every value
+    missing = ~np.isfinite(values)
+    ints = np.where(missing, 0, values).astype(np.int64)
+    return pd.Series(pd.arrays.IntegerArray(ints, missing), index=series.index, name=series.name)
+
+
+def downcast_int(series: pd.Series, dtype: str) -> pd.Series:
+    """``normalize_int`` narrowed to the nullable ``dtype`` when every value fits, else Int64."""
+    ints = normalize_int(series)
+    info = np.iinfo(pd.api.types.pandas_dtype(dtype).numpy_dtype)
+    low, high = ints.min(), ints.max()
+    if pd.notna(low) and (low < info.min or high > info.max):
+        return ints
+    return ints.astype(dtype)
+
+
+# Compact dtypes of the long table in low-memory mode. Codes and periods are stored as
+# the integers the loaders normalize them to anyway, names as categoricals, so each
+# distinct city, project type and status is held once instead of once per row.
+LONG_INT_DTYPES = {"department_code": "Int32", "year": "Int16", "month": "Int16", "count": "Int32"}
+LONG_CATEGORY_COLUMNS = ("city_name", "project_type", "status")
+
+
+def compact_long(df_long: pd.DataFrame) -> pd.DataFrame:
+    """Convert the columns of a long DataFrame to compact dtypes in place and return it."""
+    for column, dtype in LONG_INT_DTYPES.items():
+        if column in df_long and df_long[column].dtype != dtype:
+            df_long[column] = downcast_int(df_long[column], dtype)
+    for column in LONG_CATEGORY_COLUMNS:
+        if column in df_long and not isinstance(df_long[column].dtype, pd.CategoricalDtype):
+            df_long[column] = df_long[column].astype("category")
+    return df_long
+
+
+def concat_long(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate long DataFrames, keeping categorical columns categorical: pandas falls
+    back to object columns when the frames' categories differ, so they are unified first.
+    A single frame is returned as is rather than copied.
+    """
+    if len(frames) == 1 and frames[0].index.equals(pd.RangeIndex(len(frames[0]))):
+        return frames[0]
+    for column in frames[0].columns:
+        dtypes = [frame[column].dtype for frame in frames if column in frame]
+        if len(dtypes) == len(frames) and all(isinstance(d, pd.CategoricalDtype) for d in dtypes):
+            categories = pd.unique(np.concatenate([d.categories.to_numpy(dtype=object) for d in dtypes]))
+            dtype = pd.CategoricalDtype(categories)
+            for frame in frames:
+                frame[column] = frame[column].astype(dtype)
+    return pd.concat(frames, ignore_index=True)
@@ -1,22 +1,42 @@
+import numpy as np
 import pandas as pd
 import re
-from app.core.constants import RENAME_MAP
+from typing import Iterator, List, Tuple
+from openpyxl import load_workbook
+from app.core.constants import RENAME_MAP, STREAM_BATCH_SIZE
+from app.core.metrics import ETL_TRANSFORM_STEP_SECONDS, timed
+from app.services.etl_service.dtypes import compact_long, concat_long, downcast_int
+
+SUMMARY_PATTERN = re.compile("جمع|مجموع")
+TOTAL_ROW_PREFIXES = ("جمع", "مجموع")
+TOTAL_ROW_LABEL = "کل شرکت"
+LONG_COLUMNS = ["city_name", "department_code", "year", "month", "count", "project_type", "status"]
 
 class ExcelTransformer:
     """
     Class to handle cleaning and transforming wide-format Excel files into long-format DataFrame.
+
+    With ``low_memory`` the long DataFrame has compact dtypes (see ``compact_long``)
+    and is built without the full-size intermediates of melting.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, low_memory: bool = False):
         self.file_path = file_path
+        self.low_memory = low_memory
         self.df_wide = None
         self.df_long = None
+        # Set by ``stream``: value columns per sheet row, and the long columns that
+        # read_excel would parse as float64
+        self.value_width = 0
+        self.float_columns = set()
 
+    @timed(ETL_TRANSFORM_STEP_SECONDS, step="read_excel")
     def read_excel(self):
         """Read the Excel file with multi-level headers."""
         self.df_wide = pd.read_excel(self.file_path, header=[1, 2], engine="openpyxl")
         return self
 
+    @timed(ETL_TRANSFORM_STEP_SECONDS, step="remove_summary_columns")
     def remove_summary_columns(self):
         """Remove columns that are summaries (contain جمع/مجموع)."""
         mask = ~(
@@ -30,15 +50,17 @@ class ExcelTransformer:
             self.df_wide = self.df_wide.iloc[:, :-1]
         return self
 
+    @timed(ETL_TRANSFORM_STEP_SECONDS, step="remove_total_rows")
     def remove_total_rows(self):
         """Remove total/NaN rows like 'کل شرکت' or rows starting with جمع/مجموع."""
         self.df_wide = self.df_wide[
             ~self.df_wide.iloc[:, 0].isna()
-            & (~self.df_wide.iloc[:, 0].astype(str).str.startswith(("جمع", "مجموع")))
-            & (self.df_wide.iloc[:, 0] != "کل شرکت")
+            & (~self.df_wide.iloc[:, 0].astype(str).str.startswith(TOTAL_ROW_PREFIXES))
+            & (self.df_wide.iloc[:, 0] != TOTAL_ROW_LABEL)
         ]
         return self
 
+    @timed(ETL_TRANSFORM_STEP_SECONDS, step="normalize_headers")
     def normalize_headers(self):
         """Normalize and flatten multi-level headers."""
         new_lvl0 = []
@@ -62,8 +84,11 @@ class ExcelTransformer:
         self.df_wide.columns = [re.sub(r"\.\d+$", "", c) for c in self.df_wide.columns]
         return self
 
+    @timed(ETL_TRANSFORM_STEP_SECONDS, step="melt_to_long")
     def melt_to_long(self):
         """Melt wide DataFrame into long format and split columns."""
+        if self.low_memory:
+            return self._melt_compact()
         id_vars, value_vars = self.df_wide.columns[:4].tolist(), self.df_wide.columns[4:].tolist()
         df_long = self.df_wide.melt(
             id_vars=id_vars,
@@ -81,6 +106,40 @@ class ExcelTransformer:
         self.df_long = self.df_long.rename(columns=RENAME_MAP)
         return self
 
+    def _melt_compact(self):
+        """
+        Low-memory ``melt_to_long``, with the same rows in the same order.
+
+        Instead of melting into a frame holding every header string once per row and
+        splitting that, project type and status are split once per value column and
+        repeated as categorical codes. The id columns are compacted on the wide rows
+        before being tiled, and the counts are downcast one value column at a time.
+        The wide frame is released as soon as the counts are read.
+        """
+        wide, self.df_wide = self.df_wide, None
+        rows, value_columns = len(wide), wide.columns[4:]
+        ids = compact_long(wide.iloc[:, :4].copy().rename(columns=RENAME_MAP))
+
+        names = pd.Series(value_columns, dtype=object).str.split(" - ", n=1, expand=True)
+        names = names.reindex(columns=[0, 1])
+        project_types = pd.Categorical(names[0])
+        statuses = pd.Categorical(names[1].fillna("").str.replace(r"\.\d+$", "", regex=True).str.strip())
+
+        positions = np.tile(np.arange(rows, dtype=np.int32), len(value_columns))
+        columns = {column: ids[column].array.take(positions) for column in ids.columns}
+        del ids, positions
+        counts = [downcast_int(wide.iloc[:, i], "Int32") for i in range(4, wide.shape[1])]
+        del wide
+        columns["count"] = (
+            pd.concat(counts, ignore_index=True).array if counts else pd.array([], dtype="Int32")
+        )
+        del counts
+        for column, values in (("project_type", project_types), ("status", statuses)):
+            columns[column] = pd.Categorical.from_codes(np.repeat(values.codes, rows), dtype=values.dtype)
+        # copy=False: the arrays built above become the frame's columns as they are
+        self.df_long = pd.DataFrame(columns, copy=False)
+        return self
+
     def transform(self) -> pd.DataFrame:
         """Run full transformation pipeline."""
         return (
@@ -91,3 +150,120 @@ class ExcelTransformer:
                 .melt_to_long()
                 .df_long
         )
+
+    # ------------------------------------------------------------------
+    # Streaming mode
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _resolve_stream_columns(top: tuple, sub: tuple) -> Tuple[List[int], List[Tuple[int, str, str]]]:
+        """
+        Resolve the two header rows once, mirroring the pandas pipeline.
+
+        Returns the positions of the four id columns and, for every kept value column,
+        its position together with its project type and status.
+        """
+        headers = []
+        last_top = None
+        for idx in range(max(len(top), len(sub))):
+            lvl0 = top[idx] if idx < len(top) else None
+            lvl1 = sub[idx] if idx < len(sub) else None
+            # Merged top-level cells are forward-filled, as pandas does for MultiIndex headers
+            last_top = lvl0 if lvl0 is not None else last_top
+            lvl0 = last_top if last_top is not None else f"Unnamed: {idx}_level_0"
+            headers.append((idx, str(lvl0), "" if lvl1 is None else str(lvl1)))
+
+        # Drop summary columns, and the trailing column if it is a summary
+        headers = [h for h in headers if not (SUMMARY_PATTERN.search(h[1]) or SUMMARY_PATTERN.search(h[2]))]
+        if headers and (headers[-1][1].startswith("مجموع") or headers[-1][2].startswith("مجموع")):
+            headers = headers[:-1]
+
+        value_columns = []
+        for idx, lvl0, lvl1 in headers[4:]:
+            if "تست" in lvl0:
+                match = re.search(r"(تست\s*\d+)", lvl0)
+                lvl0 = match.group(1) if match else lvl0
+            name = re.sub(r"\.\d+$", "", f"{lvl0} - {lvl1}" if lvl1 else lvl0)
+            parts = name.split(" - ", 1)
+            status = re.sub(r"\.\d+$", "", parts[1]).strip() if len(parts) > 1 else ""
+            value_columns.append((idx, parts[0], status))
+        return [h[0] for h in headers[:4]], value_columns
+
+    @staticmethod
+    def _is_total_row(label) -> bool:
+        return label is None or str(label).startswith(TOTAL_ROW_PREFIXES) or label == TOTAL_ROW_LABEL
+
+    @staticmethod
+    def _is_float_cell(row: tuple, idx: int) -> bool:
+        value = row[idx] if idx < len(row) else None
+        # pandas turns integral floats into ints when reading with openpyxl
+        return value is None or (isinstance(value, float) and not value.is_integer())
+
+    def stream(self, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+        """
+        Stream the workbook row by row with openpyxl's read-only mode and yield
+        long-format DataFrames of at most ``batch_size`` rows.
+
+        Summary columns and total rows are dropped on the fly, so peak memory depends
+        on the batch size rather than the workbook size. Rows come out in sheet order
+        (row by row) instead of the column-by-column order of ``melt_to_long``.
+        """
+        workbook = load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            next(rows, None)  # title row
+            top, sub = next(rows, ()), next(rows, ())
+            id_columns, value_columns = self._resolve_stream_columns(top, sub)
+            self.value_width = len(value_columns)
+            self.float_columns = set()
+            # read_excel parses a column holding blanks or fractions (total rows
+            # included) as float64; watch each source column until it does
+            watched = dict(zip(id_columns, LONG_COLUMNS))
+            watched.update((idx, "count") for idx, _, _ in value_columns)
+
+            batch = []
+            for row in rows:
+                if not row:
+                    continue
+                for idx in [i for i in watched if self._is_float_cell(row, i)]:
+                    if idx in watched:
+                        name = watched[idx]
+                        self.float_columns.add(name)
+                        watched = {i: n for i, n in watched.items() if n != name}
+                if self._is_total_row(row[0]):
+                    continue
+                ids = tuple(row[i] if i < len(row) else None for i in id_columns)
+                for idx, project_type, status in value_columns:
+                    count = row[idx] if idx < len(row) else None
+                    batch.append((*ids, count, project_type, status))
+                if len(batch) >= batch_size:
+                    yield pd.DataFrame.from_records(batch, columns=LONG_COLUMNS)
+                    batch = []
+            if batch:
+                yield pd.DataFrame.from_records(batch, columns=LONG_COLUMNS)
+        finally:
+            workbook.close()
+
+    @timed(ETL_TRANSFORM_STEP_SECONDS, step="transform_streaming")
+    def transform_streaming(self, batch_size: int = STREAM_BATCH_SIZE) -> pd.DataFrame:
+        """
+        Run the streaming reader and collect all batches into one long DataFrame,
+        with the rows in the order of ``transform`` and, unless in low-memory mode,
+        its dtypes.
+        """
+        if self.low_memory:
+            batches = [compact_long(batch) for batch in self.stream(batch_size)]
+        else:
+            batches = list(self.stream(batch_size))
+        if not batches:
+            return pd.DataFrame(columns=LONG_COLUMNS)
+        df_long = concat_long(batches) if self.low_memory else pd.concat(batches, ignore_index=True)
+        del batches
+        # Every kept sheet row yields value_width long rows; melt_to_long goes column by column
+        order = np.arange(len(df_long)).reshape(-1, self.value_width).T.ravel()
+        df_long = df_long.take(order).reset_index(drop=True)
+        if not self.low_memory:
+            for column in self.float_columns:
+                if df_long[column].dtype.kind in "iu":
+                    df_long[column] = df_long[column].astype(np.float64)
+        self.df_long = df_long
+        return self.df_long
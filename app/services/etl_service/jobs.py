@@ -0,0 +1,155 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import AsyncSessionLocal
+from app.models import EtlJob
+from app.services.etl_service.runner import WorkOrderETLManager
+
+
+class EtlJobConflict(Exception):
+    """Another refresh with different parameters is already running."""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"ETL job {job_id} is already running")
+        self.job_id = job_id
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_dict(job: EtlJob) -> Dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "params": job.params,
+        "stages": job.stages,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class EtlJobRunner:
+    """
+    Runs ETL refreshes as background tasks, one at a time.
+
+    A refresh submitted while another is running joins it when the parameters are
+    the same and is rejected with ``EtlJobConflict`` otherwise. Jobs are written to
+    ``etl_job`` when they start and finish, so the history survives restarts; stage
+    progress of the running job is served from memory, which avoids writing to the
+    database while the ETL holds its own transaction (SQLite allows one writer).
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._current: Optional[Dict] = None
+
+    def running(self) -> Optional[Dict]:
+        if self._task is not None and not self._task.done():
+            return self._current
+        return None
+
+    async def submit(self, params: Dict) -> Tuple[str, bool]:
+        """Start a refresh job; returns its id and whether it joined a running one."""
+        async with self._lock:
+            current = self.running()
+            if current is not None:
+                if current["params"] == params:
+                    return current["id"], True
+                raise EtlJobConflict(current["id"])
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "status": "queued",
+                "params": params,
+                "stages": [],
+                "result": None,
+                "error": None,
+                "created_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            async with self.session_factory() as db:
+                db.add(EtlJob(**{k: job[k] for k in ("id", "status", "params", "stages", "created_at")}))
+                await db.commit()
+            self._current = job
+            self._task = asyncio.create_task(self._run(job))
+            # Failures are recorded on the job; nobody has to await the task
+            self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            return job["id"], False
+
+    async def wait(self, job_id: str) -> Dict:
+        """Result of the running job ``job_id``; re-raises its error."""
+        current = self.running()
+        if current is None or current["id"] != job_id:
+            job = await self.get(job_id)
+            if job is None or job["status"] != "succeeded":
+                raise RuntimeError(job["error"] if job else f"Unknown ETL job {job_id}")
+            return job["result"]
+        return await asyncio.shield(self._task)
+
+    async def _run(self, job: Dict) -> Dict:
+        async def on_stage(stages: List[Dict]):
+            job["stages"] = stages
+
+        job["status"] = "running"
+        job["started_at"] = _now()
+        await self._save(job, "status", "started_at")
+        try:
+            async with self.session_factory() as db:
+                manager = WorkOrderETLManager(db, **job["params"], on_stage=on_stage)
+                result = await manager.run()
+        except BaseException as exc:
+            job["status"] = "failed"
+            job["error"] = str(exc) or type(exc).__name__
+            raise
+        else:
+            job["status"] = "succeeded"
+            job["result"] = jsonable_encoder(result)
+            return result
+        finally:
+            job["finished_at"] = _now()
+            await asyncio.shield(self._save(job, "status", "stages", "result", "error", "finished_at"))
+
+    async def _save(self, job: Dict, *fields: str):
+        async with self.session_factory() as db:
+            await db.execute(
+                update(EtlJob).where(EtlJob.id == job["id"]).values(**{f: job[f] for f in fields})
+            )
+            await db.commit()
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        current = self.running()
+        if current is not None and current["id"] == job_id:
+            return current
+        async with self.session_factory() as db:
+            job = await db.get(EtlJob, job_id)
+            return _as_dict(job) if job is not None else None
+
+    async def history(self, limit: int = 20) -> List[Dict]:
+        async with self.session_factory() as db:
+            result = await db.execute(select(EtlJob).order_by(EtlJob.created_at.desc()).limit(limit))
+            jobs = [_as_dict(job) for job in result.scalars().all()]
+        current = self.running()
+        return [current if current is not None and job["id"] == current["id"] else job for job in jobs]
+
+    async def recover(self, db: AsyncSession):
+        """Mark jobs left queued or running by a previous process as failed."""
+        await db.execute(
+            update(EtlJob)
+            .where(EtlJob.status.in_(("queued", "running")))
+            .values(status="failed", error="Interrupted by a restart", finished_at=_now())
+        )
+        await db.commit()
+
+
+etl_jobs = EtlJobRunner()
@@ -1,11 +1,100 @@
-from typing import Dict
+import asyncio
+import time
+from typing import Callable, Dict, Optional, Set, Tuple
+import numpy as np
 import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.constants import FACT_INSERT_CHUNK_SIZE, FACT_INSERT_CHUNK_SIZE_LOW_MEMORY, FACT_PARTITION_BY_YEAR
+from app.core.metrics import ETL_LOADER_SECONDS, timed
 from app.models import DimLocation, DimDate, DimProjectType, DimStatus, FactWorkOrder
+from app.services.etl_service.dtypes import downcast_int, normalize_int
+from app.services.etl_service.partitions import ensure_year_partitions
+
+
+def normalize_str(series: pd.Series) -> pd.Series:
+    """Strip string values column-wise, keeping missing values as None."""
+    out = series.astype(str).str.strip().astype(object)
+    return out.where(series.notna(), None)
+
+
+def normalize_code(series: pd.Series) -> pd.Series:
+    """Render numeric codes like 6010.0 as '6010', keeping missing values as None."""
+    ints = normalize_int(series)
+    out = ints.astype(str).astype(object)
+    return out.where(ints.notna(), None)
+
+
+def strip_str(series: pd.Series) -> pd.Series:
+    """Plain ``str(value).strip()`` per value, as used for fact lookups of names."""
+    return series.astype(str).str.strip()
+
+
+def _to_python(series: pd.Series) -> list:
+    """Native Python values with None for missing entries."""
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+def lookup_ids(df: pd.DataFrame, normalizers: Dict[str, Callable], id_map: Dict,
+               match_missing: bool = True, dtype: Optional[str] = None):
+    """
+    Map every row of ``df`` to its surrogate id in ``id_map`` without per-row Python work.
+
+    Each key column is factorized once and only its distinct values are normalized.
+    The per-column codes are combined into a single integer code per key, so the
+    dictionary lookup runs once per distinct key and ids are gathered by code.
+    With ``match_missing=False`` keys containing None never resolve to an id.
+
+    Ids come back as an object array with None for keys without one, or with
+    ``dtype`` (e.g. "Int32") as a nullable integer array of that type.
+    """
+    combined = np.zeros(len(df), dtype=np.int64)
+    levels = []
+    for column, normalize in normalizers.items():
+        codes, uniques = pd.factorize(df[column])
+        # Position 0 holds the normalized missing value, so shift codes by one
+        level = _to_python(normalize(pd.Series([np.nan, *uniques], dtype=object)))
+        levels.append(level)
+        combined = combined * len(level) + (codes + 1)
+
+    key_codes, distinct = pd.factorize(combined)
+    ids = []
+    for code in distinct:
+        key = []
+        for level in reversed(levels):
+            code, pos = divmod(code, len(level))
+            key.append(level[pos])
+        key = tuple(reversed(key)) if len(key) > 1 else key[0]
+        missing = None in key if isinstance(key, tuple) else key is None
+        ids.append(None if missing and not match_missing else id_map.get(key))
+    if dtype is None:
+        return np.array(ids, dtype=object)[key_codes]
+    return pd.array(ids, dtype=dtype).take(key_codes)
+
+
+def _unique_records(df: pd.DataFrame) -> list:
+    """Turn a frame of unique keys into insert-ready dicts with native Python values."""
+    unique = df.drop_duplicates().astype(object)
+    return unique.where(unique.notna(), None).to_dict("records")
+
+
+def dialect_insert(db: AsyncSession) -> Callable:
+    """Dialect-specific ``insert`` construct, which supports ON CONFLICT clauses."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert
+    if dialect == "sqlite":
+        return sqlite.insert
+    raise NotImplementedError(f"Upserts are not supported on {dialect}")
 
 
 class DimensionLoader:
     """Abstract base class for dimension loaders."""
+    model = None
+    key_columns: tuple = ()
+
     def __init__(self, df: pd.DataFrame):
         self.df = df
         self.records = []
@@ -17,18 +106,60 @@ class DimensionLoader:
     async def insert(self, db: AsyncSession):
         raise NotImplementedError
 
+    def _key(self, values):
+        return tuple(values) if len(self.key_columns) > 1 else values[0]
+
+    def record_key(self, record: Dict):
+        """Key of a prepared record in ``map``."""
+        return self._key([record[c] for c in self.key_columns])
+
+    async def upsert(self, db: AsyncSession) -> Dict:
+        """
+        Insert the prepared records missing from the table, so existing rows keep
+        their surrogate ids, and fill ``map`` with the ids of all records.
+
+        Existing keys are matched here rather than by ON CONFLICT alone: NULLs are
+        distinct in unique constraints, so a key with a NULL part (a location without
+        a department code) would never conflict and be inserted again on every run.
+        ON CONFLICT still covers keys inserted concurrently.
+        """
+        if not self.records:
+            return {"inserted": 0, "existing": 0}
+        table = self.model.__table__
+        key_cols = [table.c[c] for c in self.key_columns]
+        existing = {self._key(row[1:]): row.id for row in (await db.execute(select(table.c.id, *key_cols))).all()}
+
+        new = []
+        for record in self.records:
+            key = self.record_key(record)
+            if key in existing:
+                self.map[key] = existing[key]
+            else:
+                new.append(record)
+        if new:
+            stmt = dialect_insert(db)(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(self.key_columns),
+                set_={c: stmt.excluded[c] for c in self.key_columns},
+            )
+            result = await db.execute(stmt.returning(table.c.id, *key_cols), new)
+            for row in result.fetchall():
+                self.map[self._key(row[1:])] = row.id
+        return {"inserted": len(new), "existing": len(self.records) - len(new)}
+
 
 class LocationLoader(DimensionLoader):
+    model = DimLocation
+    key_columns = ("city_name", "department_code")
+
     def prepare(self):
         loc_unique = self.df[['city_name', 'department_code']].drop_duplicates()
-        for _, row in loc_unique.iterrows():
-            city_name = str(row['city_name']).strip() if not pd.isna(row['city_name']) else None
-            try:
-                dept_code = str(int(row['department_code'])) if not pd.isna(row['department_code']) else None
-            except ValueError:
-                dept_code = None
-            self.map[(city_name, dept_code)] = None
-            self.records.append({"city_name": city_name, "department_code": dept_code})
+        keys = pd.DataFrame({
+            "city_name": normalize_str(loc_unique['city_name']),
+            "department_code": normalize_code(loc_unique['department_code']),
+        })
+        self.records = _unique_records(keys)
+        self.map = {(r["city_name"], r["department_code"]): None for r in self.records}
 
     async def insert(self, db: AsyncSession):
         if not self.records:
@@ -43,19 +174,17 @@ class LocationLoader(DimensionLoader):
 
 
 class DateLoader(DimensionLoader):
+    model = DimDate
+    key_columns = ("year", "month")
+
     def prepare(self):
         date_unique = self.df[['year', 'month']].drop_duplicates()
-        for _, row in date_unique.iterrows():
-            try:
-                year = int(row['year']) if not pd.isna(row['year']) else None
-            except ValueError:
-                year = None
-            try:
-                month = int(row['month']) if not pd.isna(row['month']) else None
-            except ValueError:
-                month = None
-            self.map[(year, month)] = None
-            self.records.append({"year": year, "month": month})
+        keys = pd.DataFrame({
+            "year": normalize_int(date_unique['year']),
+            "month": normalize_int(date_unique['month']),
+        })
+        self.records = _unique_records(keys)
+        self.map = {(r["year"], r["month"]): None for r in self.records}
 
     async def insert(self, db: AsyncSession):
         if not self.records:
@@ -71,18 +200,18 @@ class DateLoader(DimensionLoader):
 
 class SimpleLoader(DimensionLoader):
     """Loader for single-column dimensions like project_type or status."""
+    key_columns = ("name",)
+
     def __init__(self, df: pd.DataFrame, column_name: str, model):
         super().__init__(df)
         self.column_name = column_name
         self.model = model
 
     def prepare(self):
-        unique_values = self.df[self.column_name].dropna().drop_duplicates()
-        for val in unique_values:
-            val = str(val).strip()
-            if val:
-                self.map[val] = None
-                self.records.append({"name": val})
+        unique_values = normalize_str(self.df[self.column_name].dropna().drop_duplicates())
+        unique_values = unique_values[unique_values != ""].drop_duplicates()
+        self.records = [{"name": val} for val in unique_values]
+        self.map = {val: None for val in unique_values}
 
     async def insert(self, db: AsyncSession):
         if not self.records:
@@ -96,84 +225,242 @@ class SimpleLoader(DimensionLoader):
 
 
 class FactLoader:
-    def __init__(self, df_long: pd.DataFrame, dimension_maps: Dict[str, Dict]):
+    """
+    Builds the fact batch column-wise: key columns are normalized once and joined
+    against the dimension maps, so no Python work is done per long row.
+
+    With ``low_memory`` the columns are nullable int32/int16 arrays instead of object
+    arrays of Python ints, and the long DataFrame is released once they are built.
+    """
+
+    COLUMNS = ["location_id", "date_id", "project_type_id", "status_id", "year", "month", "count"]
+
+    def __init__(self, df_long: pd.DataFrame, dimension_maps: Dict[str, Dict], low_memory: bool = False):
         self.df_long = df_long
         self.dimension_maps = dimension_maps
-        self.fact_records = []
+        self.low_memory = low_memory
+        self.fact_columns: Dict[str, np.ndarray] = {}
+        self.skipped = 0
 
+    @timed(ETL_LOADER_SECONDS, loader="facts", phase="prepare")
     def prepare(self):
-        loc_map = self.dimension_maps['location']
-        date_map = self.dimension_maps['date']
-        proj_map = self.dimension_maps['project_type']
-        status_map = self.dimension_maps['status']
-
-        for _, row in self.df_long.iterrows():
-            city_name = str(row['city_name']).strip() if not pd.isna(row['city_name']) else None
-            try:
-                dept_code = str(int(row['department_code'])) if not pd.isna(row['department_code']) else None
-            except ValueError:
-                dept_code = None
-            loc_id = loc_map.get((city_name, dept_code))
-
-            try:
-                date_id = date_map.get((int(row['year']), int(row['month'])))
-            except ValueError:
-                date_id = None
-
-            proj_id = proj_map.get(str(row['project_type']).strip())
-            status_id = status_map.get(str(row['status']).strip())
-            try:
-                count = int(row['count']) if not pd.isna(row['count']) else 0
-            except ValueError:
-                count = 0
-
-            self.fact_records.append({
-                "location_id": loc_id,
-                "date_id": date_id,
-                "project_type_id": proj_id,
-                "status_id": status_id,
-                "count": count
-            })
+        df = self.df_long
+        maps = self.dimension_maps
+        id_dtype = "Int32" if self.low_memory else None
+        # Facts with an incomplete date never match a date id
+        date_ids = lookup_ids(
+            df, {"year": normalize_int, "month": normalize_int}, maps['date'], match_missing=False, dtype=id_dtype
+        )
+        # The denormalized period is only set where the date resolved, mirroring dim_date
+        has_date = pd.notna(date_ids)
+        if self.low_memory:
+            counts = downcast_int(df['count'], "Int32").fillna(0)
+            counts = counts.to_numpy(dtype=counts.dtype.numpy_dtype)
+            years = downcast_int(df['year'], "Int16").array
+            months = downcast_int(df['month'], "Int16").array
+            years[~has_date] = pd.NA
+            months[~has_date] = pd.NA
+        else:
+            counts = normalize_int(df['count']).fillna(0).to_numpy(dtype=np.int64)
+            years = normalize_int(df['year']).to_numpy(dtype=object, na_value=None)
+            months = normalize_int(df['month']).to_numpy(dtype=object, na_value=None)
+            years[~has_date] = None
+            months[~has_date] = None
 
-    async def insert(self, db: AsyncSession):
-        if not self.fact_records:
-            return
-        await db.execute(FactWorkOrder.__table__.insert(), self.fact_records)
-        await db.commit()
+        self.fact_columns = {
+            "location_id": lookup_ids(
+                df, {"city_name": normalize_str, "department_code": normalize_code}, maps['location'],
+                dtype=id_dtype,
+            ),
+            "date_id": date_ids,
+            "project_type_id": lookup_ids(df, {"project_type": strip_str}, maps['project_type'], dtype=id_dtype),
+            "status_id": lookup_ids(df, {"status": strip_str}, maps['status'], dtype=id_dtype),
+            "year": years,
+            "month": months,
+            "count": counts,
+        }
+        if FACT_PARTITION_BY_YEAR:
+            # year is part of the partitioned table's primary key and cannot be NULL
+            self.skipped = int((~has_date).sum())
+            self.fact_columns = {c: values[has_date] for c, values in self.fact_columns.items()}
+        if self.low_memory:
+            self.df_long = None
+
+    def __len__(self) -> int:
+        return len(self.fact_columns["count"]) if self.fact_columns else 0
+
+    def years(self) -> Set[int]:
+        """Distinct years of the prepared facts, whose partitions must exist before inserting."""
+        if not self.fact_columns:
+            return set()
+        return {int(y) for y in pd.Series(self.fact_columns["year"]).dropna().unique()}
+
+    @staticmethod
+    def _to_list(values) -> list:
+        """Native Python values of a column slice, with None for missing entries."""
+        if isinstance(values, pd.api.extensions.ExtensionArray):
+            return values.to_numpy(dtype=object, na_value=None).tolist()
+        return values.tolist()
+
+    def iter_chunks(self, chunk_size: int = FACT_INSERT_CHUNK_SIZE):
+        """Yield fact rows as lists of tuples, at most ``chunk_size`` rows at a time."""
+        for start in range(0, len(self), max(chunk_size, 1)):
+            columns = [self._to_list(self.fact_columns[c][start:start + chunk_size]) for c in self.COLUMNS]
+            yield list(zip(*columns))
+
+    def _as_dicts(self, chunk: list) -> list:
+        return [dict(zip(self.COLUMNS, row)) for row in chunk]
+
+    @staticmethod
+    def supports_copy(db: AsyncSession) -> bool:
+        """COPY is only available on PostgreSQL through the asyncpg driver."""
+        dialect = db.get_bind().dialect
+        return dialect.name == "postgresql" and dialect.driver == "asyncpg"
+
+    async def _copy(self, db: AsyncSession, chunk_size: int) -> int:
+        """Stream facts with asyncpg's binary COPY inside the session's transaction."""
+        conn = await db.connection()
+        raw = await conn.get_raw_connection()
+        # Honour schema_translate_map, e.g. when loading into staging tables
+        schema = conn.sync_connection.get_execution_options().get("schema_translate_map", {}).get(None)
+        rows = 0
+        for chunk in self.iter_chunks(chunk_size):
+            await raw.driver_connection.copy_records_to_table(
+                FactWorkOrder.__tablename__, records=chunk, columns=self.COLUMNS, schema_name=schema
+            )
+            rows += len(chunk)
+        return rows
+
+    async def _executemany(self, db: AsyncSession, chunk_size: int) -> int:
+        rows = 0
+        for chunk in self.iter_chunks(chunk_size):
+            await db.execute(FactWorkOrder.__table__.insert(), self._as_dicts(chunk))
+            rows += len(chunk)
+        return rows
+
+    @timed(ETL_LOADER_SECONDS, loader="facts", phase="insert")
+    async def write(self, db: AsyncSession, bulk_load: bool = True,
+                    chunk_size: int = FACT_INSERT_CHUNK_SIZE) -> Tuple[str, int]:
+        """
+        Insert the prepared facts in bounded chunks without committing; returns the
+        method used and the row count.
+
+        With ``bulk_load`` the rows go through PostgreSQL COPY; other engines (or
+        ``bulk_load=False``) fall back to chunked ``executemany`` INSERTs.
+        """
+        method = "copy" if bulk_load and self.supports_copy(db) else "insert"
+        if method == "copy":
+            return method, await self._copy(db, chunk_size)
+        return method, await self._executemany(db, chunk_size)
+
+    async def insert(self, db: AsyncSession, bulk_load: bool = True,
+                     chunk_size: int = FACT_INSERT_CHUNK_SIZE, commit: bool = True) -> Dict:
+        """Insert the prepared facts (see ``write``) and commit, unless ``commit=False``."""
+        start = time.perf_counter()
+        method, rows = await self.write(db, bulk_load, chunk_size)
+        if commit:
+            await db.commit()
+        elapsed = time.perf_counter() - start
+        return {
+            "method": method,
+            "rows": rows,
+            "skipped": self.skipped,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(rows / elapsed) if elapsed and rows else 0,
+        }
+
+
+def dimension_loaders(df_long: pd.DataFrame) -> Dict[str, DimensionLoader]:
+    """One loader per dimension, keyed by the name ``FactLoader`` looks its map up with."""
+    return {
+        'location': LocationLoader(df_long),
+        'date': DateLoader(df_long),
+        'project_type': SimpleLoader(df_long, 'project_type', DimProjectType),
+        'status': SimpleLoader(df_long, 'status', DimStatus),
+    }
+
+
+class DimensionIdCache:
+    """
+    Surrogate ids of the dimension members loaded so far, for loading facts batch by
+    batch: each batch only inserts the members the cache has not seen yet.
+    """
+
+    def __init__(self):
+        self.maps: Dict[str, Dict] = {name: {} for name in dimension_loaders(pd.DataFrame())}
+
+    def _unseen(self, df_long: pd.DataFrame) -> Dict[str, DimensionLoader]:
+        """Loaders prepared with only the members of ``df_long`` missing from the cache."""
+        loaders = dimension_loaders(df_long)
+        for name, loader in loaders.items():
+            with ETL_LOADER_SECONDS.labels(loader=name, phase="prepare").time():
+                loader.prepare()
+            known = self.maps[name]
+            loader.records = [r for r in loader.records if loader.record_key(r) not in known]
+            loader.map = {}
+        return loaders
+
+    async def resolve(self, db: AsyncSession, df_long: pd.DataFrame) -> Dict[str, Dict]:
+        """Insert the new members of ``df_long`` and return the maps for ``FactLoader``."""
+        loop = asyncio.get_running_loop()
+        loaders = await loop.run_in_executor(None, self._unseen, df_long)
+        for name, loader in loaders.items():
+            with ETL_LOADER_SECONDS.labels(loader=name, phase="insert").time():
+                await loader.insert(db)
+            self.maps[name].update(loader.map)
+        return self.maps
+
+    def __len__(self) -> int:
+        return sum(len(m) for m in self.maps.values())
 
 
 class WorkOrderLoader:
     """
     Main loader class to handle loading of all dimensions and fact table.
+
+    With ``low_memory`` the facts are built with compact dtypes (see ``FactLoader``)
+    and inserted in smaller chunks, and every loader drops its reference to the long
+    DataFrame once it is prepared.
     """
 
-    def __init__(self, df_long: pd.DataFrame):
+    def __init__(self, df_long: pd.DataFrame, bulk_load: bool = True, upsert: bool = False,
+                 low_memory: bool = False):
         self.df_long = df_long
-        self.loaders = [
-            LocationLoader(df_long),
-            DateLoader(df_long),
-            SimpleLoader(df_long, 'project_type', DimProjectType),
-            SimpleLoader(df_long, 'status', DimStatus)
-        ]
-
-    async def load(self, db: AsyncSession):
+        self.bulk_load = bulk_load
+        self.upsert = upsert
+        self.low_memory = low_memory
+        self.dimension_stats: Dict[str, Dict] = {}
+        self.dimensions = dimension_loaders(df_long)
+        self.loaders = list(self.dimensions.values())
+
+    async def load(self, db: AsyncSession, commit: bool = True) -> Dict:
+        """Load dimensions and facts and commit; ``commit=False`` leaves that to the caller."""
         # ----------------------
         # 1. Load Dimensions
         # ----------------------
-        for loader in self.loaders:
-            loader.prepare()
-            await loader.insert(db)
+        # The pandas work runs in the default executor so the event loop keeps serving requests
+        loop = asyncio.get_running_loop()
+        for name, loader in self.dimensions.items():
+            with ETL_LOADER_SECONDS.labels(loader=name, phase="prepare").time():
+                await loop.run_in_executor(None, loader.prepare)
+            if self.low_memory:
+                loader.df = None
+            with ETL_LOADER_SECONDS.labels(loader=name, phase="insert").time():
+                if self.upsert:
+                    self.dimension_stats[loader.model.__tablename__] = await loader.upsert(db)
+                else:
+                    await loader.insert(db)
 
         # ----------------------
         # 2. Load Facts
         # ----------------------
-        dimension_maps = {
-            'location': next(l.map for l in self.loaders if isinstance(l, LocationLoader)),
-            'date': next(l.map for l in self.loaders if isinstance(l, DateLoader)),
-            'project_type': next(l.map for l in self.loaders if isinstance(l, SimpleLoader) and l.column_name == 'project_type'),
-            'status': next(l.map for l in self.loaders if isinstance(l, SimpleLoader) and l.column_name == 'status'),
-        }
+        dimension_maps = {name: loader.map for name, loader in self.dimensions.items()}
 
-        fact_loader = FactLoader(self.df_long, dimension_maps)
-        fact_loader.prepare()
-        await fact_loader.insert(db)
+        fact_loader = FactLoader(self.df_long, dimension_maps, low_memory=self.low_memory)
+        if self.low_memory:
+            # The fact loader holds the only reference left here, and drops it once prepared
+            self.df_long = None
+        await loop.run_in_executor(None, fact_loader.prepare)
+        await ensure_year_partitions(db, fact_loader.years())
+        chunk_size = FACT_INSERT_CHUNK_SIZE_LOW_MEMORY if self.low_memory else FACT_INSERT_CHUNK_SIZE
+        return await fact_loader.insert(db, bulk_load=self.bulk_load, chunk_size=chunk_size, commit=commit)
@@ -0,0 +1,115 @@
+from typing import Dict, Iterator, List, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.feather
+import pyarrow.ipc
+import pyarrow.parquet
+from app.core.constants import RENAME_MAP, STREAM_BATCH_SIZE
+from app.core.metrics import ETL_TRANSFORM_STEP_SECONDS, timed
+from app.services.etl_service.excel_transformer import LONG_COLUMNS
+
+CSV_EXTENSIONS = (".csv", ".csv.gz")
+PARQUET_EXTENSIONS = (".parquet",)
+ARROW_EXTENSIONS = (".arrow", ".feather")
+LONG_EXTENSIONS = CSV_EXTENSIONS + PARQUET_EXTENSIONS + ARROW_EXTENSIONS
+
+# Text columns are read as strings so that codes keep their spelling; the loader
+# normalizes them like the values read from workbooks
+NUMERIC_COLUMNS = ("year", "month", "count")
+
+# Bytes per block of the multi-threaded CSV reader
+CSV_BLOCK_SIZE = 16 << 20
+
+
+def has_long_extension(path: str) -> bool:
+    return path.lower().endswith(LONG_EXTENSIONS)
+
+
+def _source_columns(path: str) -> List[str]:
+    """Column names as stored in ``path``, reading only its header or schema."""
+    lower = path.lower()
+    if lower.endswith(PARQUET_EXTENSIONS):
+        return pa.parquet.read_schema(path).names
+    if lower.endswith(ARROW_EXTENSIONS):
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).schema.names
+    reader = pa.csv.open_csv(path, read_options=pa.csv.ReadOptions(block_size=1 << 16))
+    try:
+        return reader.schema.names
+    finally:
+        reader.close()
+
+
+def long_columns(path: str) -> Optional[Dict[str, str]]:
+    """
+    Map from the long columns to their names in ``path``, or None when ``path`` is
+    not a long-format file. Names may be the loader's (as in ``data_long.csv``) or
+    the source names of ``RENAME_MAP``.
+    """
+    if not has_long_extension(path):
+        return None
+    found = {RENAME_MAP.get(name, name): name for name in _source_columns(path)}
+    if not set(LONG_COLUMNS) <= set(found):
+        return None
+    return {column: found[column] for column in LONG_COLUMNS}
+
+
+def _columns_of(path: str) -> Dict[str, str]:
+    columns = long_columns(path)
+    if columns is None:
+        raise ValueError(f"{path} is not a long-format file with columns {LONG_COLUMNS}")
+    return columns
+
+
+def _csv_options(columns: Dict[str, str], block_size: int):
+    types = {
+        source: pa.float64() if column in NUMERIC_COLUMNS else pa.string()
+        for column, source in columns.items()
+    }
+    return {
+        "read_options": pa.csv.ReadOptions(use_threads=True, block_size=block_size),
+        "convert_options": pa.csv.ConvertOptions(column_types=types, include_columns=list(columns.values())),
+    }
+
+
+def _to_frame(table, columns: Dict[str, str]) -> pd.DataFrame:
+    """
+    Arrow table to the loader's long DataFrame. Text becomes categoricals, so every
+    distinct city or status is one Python object, and Arrow buffers are released
+    while converting instead of being held next to a full pandas copy.
+    """
+    table = table.select(list(columns.values())).rename_columns(list(columns))
+    return table.to_pandas(strings_to_categorical=True, split_blocks=True, self_destruct=True)
+
+
+@timed(ETL_TRANSFORM_STEP_SECONDS, step="read_long")
+def read_long(path: str) -> pd.DataFrame:
+    """Read a long-format CSV, Parquet or Arrow file with pyarrow's multi-threaded readers."""
+    columns = _columns_of(path)
+    lower = path.lower()
+    if lower.endswith(PARQUET_EXTENSIONS):
+        table = pa.parquet.read_table(path, columns=list(columns.values()), use_threads=True)
+    elif lower.endswith(ARROW_EXTENSIONS):
+        table = pa.feather.read_table(path, columns=list(columns.values()), use_threads=True)
+    else:
+        table = pa.csv.read_csv(path, **_csv_options(columns, CSV_BLOCK_SIZE))
+    return _to_frame(table, columns)
+
+
+def stream_long(path: str, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """Yield a long-format file as DataFrames of about ``batch_size`` rows, like ``ExcelTransformer.stream``."""
+    columns = _columns_of(path)
+    lower = path.lower()
+    if lower.endswith(PARQUET_EXTENSIONS):
+        batches = pa.parquet.ParquetFile(path).iter_batches(batch_size=batch_size, columns=list(columns.values()))
+    elif lower.endswith(ARROW_EXTENSIONS):
+        table = pa.feather.read_table(path, columns=list(columns.values()), memory_map=True)
+        batches = table.to_batches(max_chunksize=batch_size)
+    else:
+        # ~50 bytes per long row in CSV; blocks are the unit the streaming reader yields
+        options = _csv_options(columns, max(batch_size * 50, 1 << 16))
+        batches = pa.csv.open_csv(path, read_options=options["read_options"], convert_options=options["convert_options"])
+    for batch in batches:
+        if batch.num_rows:
+            yield _to_frame(pa.Table.from_batches([batch]), columns)
@@ -0,0 +1,43 @@
+from typing import Iterable, List
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from app.core.constants import FACT_PARTITION_BY_YEAR
+from app.models import FactWorkOrder
+
+
+async def target_schema(conn: AsyncConnection) -> str:
+    """Schema that unqualified tables resolve to, honouring schema_translate_map."""
+    schema = conn.sync_connection.get_execution_options().get("schema_translate_map", {}).get(None)
+    return schema or (await conn.execute(text("SELECT current_schema()"))).scalar_one()
+
+
+async def partitions_of(conn: AsyncConnection, qualified_name: str) -> List[str]:
+    """Names of the partitions attached to a table (empty for plain tables)."""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:name)"
+        ),
+        {"name": qualified_name},
+    )
+    return list(result.scalars().all())
+
+
+async def ensure_year_partitions(db: AsyncSession, years: Iterable[int]):
+    """
+    Create the per-year partitions (plus a default one) of ``fact_work_order`` that
+    the facts about to be loaded need. No-op unless the target table is partitioned.
+    """
+    if not FACT_PARTITION_BY_YEAR or db.get_bind().dialect.name != "postgresql":
+        return
+    conn = await db.connection()
+    schema = await target_schema(conn)
+    parent = f"{schema}.{FactWorkOrder.__tablename__}"
+    kind = await conn.execute(text("SELECT CAST(relkind AS text) FROM pg_class WHERE oid = to_regclass(:name)"), {"name": parent})
+    if kind.scalar_one_or_none() != "p":
+        return
+    for year in sorted({int(y) for y in years}):
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {parent}_y{year} PARTITION OF {parent} FOR VALUES IN ({year})"
+        ))
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {parent}_default PARTITION OF {parent} DEFAULT"))
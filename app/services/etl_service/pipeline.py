@@ -0,0 +1,170 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.constants import ETL_QUEUE_SIZE, STREAM_BATCH_SIZE
+from app.core.metrics import ETL_TRANSFORM_STEP_SECONDS, timed
+from app.services.etl_service.excel_transformer import ExcelTransformer
+from app.services.etl_service.loader import DimensionIdCache, FactLoader
+from app.services.etl_service.long_reader import has_long_extension, stream_long
+from app.services.etl_service.partitions import ensure_year_partitions
+from app.services.etl_service.workbooks import long_periods
+
+
+class StageTimer:
+    """Busy and idle (waiting on the queue) time of one pipeline stage."""
+
+    def __init__(self):
+        self.busy = 0.0
+        self.idle = 0.0
+        self.batches = 0
+        self.rows = 0
+
+    @contextmanager
+    def measure(self, kind: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            setattr(self, kind, getattr(self, kind) + time.perf_counter() - start)
+
+    def report(self) -> Dict:
+        total = self.busy + self.idle
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "busy_seconds": round(self.busy, 3),
+            "idle_seconds": round(self.idle, 3),
+            "utilization": round(self.busy / total, 3) if total else 0.0,
+        }
+
+
+@timed(ETL_TRANSFORM_STEP_SECONDS, step="stream_batch")
+def _next_batch(batches: Iterator[pd.DataFrame]) -> Optional[Tuple[pd.DataFrame, Set[Tuple[int, int]]]]:
+    """Read the next batch and its periods (blocking); None once the workbook is done."""
+    batch = next(batches, None)
+    return None if batch is None else (batch, long_periods(batch))
+
+
+class EtlPipeline:
+    """
+    Loads workbooks as a producer/consumer pipeline instead of transform-then-load.
+
+    The producer streams each workbook with ``ExcelTransformer.stream`` (or a
+    long-format file with ``stream_long``) in the default executor and puts
+    long-format batches on a bounded queue; the loader takes them off, inserts the
+    dimension members it has not seen yet (through a ``DimensionIdCache``) and
+    inserts the batch's facts. Reading the next batch thus overlaps with loading
+    the previous one, and when the loader falls behind the full queue blocks the
+    producer, so at most ``queue_size + 2`` batches are in memory whatever the
+    workbook size.
+
+    There is a single loader because the load is one database transaction, which
+    is committed after the last batch. ``stats`` holds each stage's busy and idle
+    time: an idle loader means the reader is the bottleneck, an idle producer the
+    database.
+    """
+
+    def __init__(
+        self,
+        workbooks: List[str],
+        bulk_load: bool = True,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ):
+        self.workbooks = workbooks
+        self.bulk_load = bulk_load
+        self.batch_size = batch_size or STREAM_BATCH_SIZE
+        self.queue_size = queue_size or ETL_QUEUE_SIZE
+        self.files: List[Dict] = []
+        self.periods: Dict[str, Set[Tuple[int, int]]] = {}
+        self.stats = {"transform": StageTimer(), "load": StageTimer()}
+        self.queue_peak = 0
+
+    async def load(self, db: AsyncSession, commit: bool = True) -> Dict:
+        """Run the pipeline into ``db`` and commit (unless ``commit=False``); returns the load report."""
+        start = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        tasks = [asyncio.create_task(self._produce(queue)), asyncio.create_task(self._consume(queue, db))]
+        try:
+            _, load_stats = await asyncio.gather(*tasks)
+        finally:
+            # Whichever side failed, the other must not wait on the queue forever
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if commit:
+            await db.commit()
+
+        elapsed = time.perf_counter() - start
+        rows = load_stats["rows"]
+        return {
+            **load_stats,
+            "seconds": round(elapsed, 3),
+            "rows_per_sec": round(rows / elapsed) if elapsed and rows else 0,
+            "pipeline": {
+                "batch_size": self.batch_size,
+                "queue_size": self.queue_size,
+                "queue_peak": self.queue_peak,
+                **{name: timer.report() for name, timer in self.stats.items()},
+            },
+        }
+
+    async def _produce(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        timer = self.stats["transform"]
+        for path in self.workbooks:
+            start = time.perf_counter()
+            if has_long_extension(path):
+                batches = stream_long(path, self.batch_size)
+            else:
+                batches = ExcelTransformer(path).stream(self.batch_size)
+            rows, periods = 0, set()
+            while True:
+                with timer.measure("busy"):
+                    item = await loop.run_in_executor(None, _next_batch, batches)
+                if item is None:
+                    break
+                batch, batch_periods = item
+                rows += len(batch)
+                periods |= batch_periods
+                timer.batches += 1
+                timer.rows += len(batch)
+                with timer.measure("idle"):
+                    await queue.put(batch)
+                self.queue_peak = max(self.queue_peak, queue.qsize())
+            self.files.append({"file": path, "rows": rows, "seconds": round(time.perf_counter() - start, 3)})
+            self.periods[path] = periods
+        await queue.put(None)
+
+    async def _consume(self, queue: asyncio.Queue, db: AsyncSession) -> Dict:
+        loop = asyncio.get_running_loop()
+        timer = self.stats["load"]
+        dimensions = DimensionIdCache()
+        years: Set[int] = set()
+        method, rows, skipped = None, 0, 0
+        while True:
+            with timer.measure("idle"):
+                batch = await queue.get()
+            if batch is None:
+                break
+            with timer.measure("busy"):
+                facts = FactLoader(batch, await dimensions.resolve(db, batch))
+                await loop.run_in_executor(None, facts.prepare)
+                batch_years = facts.years() - years
+                if batch_years:
+                    await ensure_year_partitions(db, batch_years)
+                    years |= batch_years
+                method, inserted = await facts.write(db, bulk_load=self.bulk_load)
+            rows += inserted
+            skipped += facts.skipped
+            timer.batches += 1
+            timer.rows += len(batch)
+        return {
+            "method": method or ("copy" if self.bulk_load and FactLoader.supports_copy(db) else "insert"),
+            "rows": rows,
+            "skipped": skipped,
+            "dimension_members": len(dimensions),
+        }
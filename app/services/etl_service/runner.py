@@ -1,53 +1,422 @@
+import asyncio
 import os
-import pandas as pd
-from app.core.constants import WIDE_FILE_PATH, LONG_EXCEL_PATH, LONG_CSV_PATH
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from sqlalchemy import func, select, tuple_
+from app.core.constants import AGGREGATION_BACKEND, ETL_ARTIFACTS, ETL_LOW_MEMORY, WIDE_FILE_PATH
+from app.core.database import wait_for_replica
+from app.core.generation import data_generation
+from app.core.metrics import PeakRss, observe_stage
+from app.models import EtlSourceFile, FactWorkOrder
 from app.services.db_cleaner import WorkOrderCleaner
-from app.services.etl_service.excel_transformer import ExcelTransformer
-from app.services.etl_service.loader import WorkOrderLoader
+from app.services.columnar_engine import columnar_facts
+from app.services.dimension_snapshot import dimension_snapshot
+from app.services.invalidation_service import invalidations
+from app.services.rollup_service import RollupManager
+from app.services.etl_service.artifacts import WRITERS, check_formats
+from app.services.etl_service.loader import WorkOrderLoader, dialect_insert
+from app.services.etl_service.pipeline import EtlPipeline
+from app.services.etl_service.staging import StagingSwap
+from app.services.etl_service.workbooks import (
+    combine_results,
+    filter_periods,
+    hash_files,
+    long_periods,
+    resolve_workbooks,
+    transform_each,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+def fact_changes(before: Dict[Tuple, int], after: Dict[Tuple, int]) -> Dict[str, int]:
+    """Net changes between two ``{fact key: count}`` maps of the same periods."""
+    common = [key for key in after if key in before]
+    updated = sum(1 for key in common if before[key] != after[key])
+    return {
+        "inserted": len(after) - len(common),
+        "updated": updated,
+        "deleted": len(before) - len(common),
+        "unchanged": len(common) - updated,
+    }
+
+
 class WorkOrderETLManager:
     """
     Manages the full ETL workflow for work orders:
-    1. Clear DB tables
-    2. Transform Excel to long DataFrame
-    3. Save to Excel/CSV
-    4. Load into DB
+    1. Transform Excel to long DataFrame (one or many workbooks, in parallel)
+    2. Write the long table as file artifacts (``artifacts`` formats, see
+       ``artifacts.WRITERS``) in the background, while
+    3. Loading it into the DB: on PostgreSQL into staging tables swapped in
+       atomically (zero downtime), elsewhere by clearing and reloading the live tables
+
+    In pipelined mode steps 1 and 3 overlap instead: workbooks are streamed in
+    batches that are loaded while the next ones are read (see ``EtlPipeline``), and
+    no artifacts are written since the whole long table never exists in memory.
+
+    In incremental mode unchanged workbooks (by content hash) are skipped, dimensions
+    are upserted on their natural keys and only the facts of the (year, month)
+    periods touched by changed workbooks are replaced.
+
+    In low-memory mode the long table has categorical and int16/int32 columns, the
+    facts are built as compact arrays, and frames are released as soon as they are
+    consumed (see ``ExcelTransformer``, ``compact_long`` and ``FactLoader``).
+
+    Each step is recorded in ``stages`` with its status and duration, and reported to
+    ``on_stage`` as it starts and ends. Blocking pandas/openpyxl work runs in executors.
+
+    Once committed, a run publishes a data-generation event (see ``invalidations``)
+    listing the periods it replaced: those touched by changed workbooks in
+    incremental mode, every period served before or after a full reload.
     """
 
-    def __init__(self, db: AsyncSession, wide_file_path: str = WIDE_FILE_PATH):
+    def __init__(
+        self,
+        db: AsyncSession,
+        wide_file_path: str = WIDE_FILE_PATH,
+        bulk_load: bool = True,
+        streaming: bool = False,
+        max_workers: Optional[int] = None,
+        incremental: bool = False,
+        zero_downtime: bool = True,
+        artifacts: Optional[List[str]] = None,
+        pipelined: bool = False,
+        batch_size: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        low_memory: Optional[bool] = None,
+        on_stage: Optional[Callable[[List[Dict]], Awaitable[None]]] = None,
+    ):
+        """
+        ``wide_file_path`` may point at a single workbook, a directory of workbooks
+        or a glob pattern; ``max_workers`` bounds the transform process pool.
+        ``artifacts`` defaults to ``ETL_ARTIFACTS``; an empty list writes none.
+        ``batch_size`` and ``queue_size`` tune the pipelined mode, whose batches are
+        small already; ``low_memory`` (default ``ETL_LOW_MEMORY``) the other modes.
+        """
         self.db = db
         self.wide_file_path = wide_file_path
+        self.bulk_load = bulk_load
+        self.streaming = streaming
+        self.max_workers = max_workers
+        self.incremental = incremental
+        self.zero_downtime = zero_downtime
+        self.artifacts = check_formats(ETL_ARTIFACTS if artifacts is None else artifacts)
+        self.pipelined = pipelined
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.low_memory = ETL_LOW_MEMORY if low_memory is None else low_memory
         self.cleaner = WorkOrderCleaner(db)
+        self.on_stage = on_stage
+        self.stages: List[Dict] = []
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        """
+        Record one step of the run in ``stages`` and export it to /metrics. Steps
+        that set ``rows`` on the yielded entry also get their rows/sec; the peak RSS
+        is the whole process', so overlapping stages see each other's memory.
+        """
+        entry = {
+            "name": name,
+            "status": "running",
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "seconds": None,
+            "rows": None,
+            "rows_per_sec": None,
+            "peak_rss_bytes": None,
+        }
+        self.stages.append(entry)
+        await self._report()
+        start = time.perf_counter()
+        rss = PeakRss()
+        try:
+            with rss:
+                yield entry
+        except BaseException:
+            entry["status"] = "failed"
+            raise
+        else:
+            entry["status"] = "done"
+        finally:
+            elapsed = time.perf_counter() - start
+            entry["seconds"] = round(elapsed, 3)
+            entry["peak_rss_bytes"] = rss.peak
+            if entry["rows"] is not None and elapsed:
+                entry["rows_per_sec"] = round(entry["rows"] / elapsed)
+            observe_stage(entry)
+            await self._report()
+
+    async def _report(self):
+        if self.on_stage is not None:
+            await self.on_stage(self.stages)
 
     async def run(self):
+        workbooks = [os.path.abspath(p) for p in resolve_workbooks(self.wide_file_path)]
+        if self.incremental:
+            return await self.run_incremental(workbooks)
+        if self.pipelined:
+            return await self.run_pipelined(workbooks)
+
         # ----------------------
-        # 1. Clear tables
+        # 1. Transform Excel
         # ----------------------
-        await self.cleaner.clear_all()
+        async with self.stage("transform") as stage:
+            results = await transform_each(
+                workbooks, streaming=self.streaming, max_workers=self.max_workers, low_memory=self.low_memory
+            )
+            long_df, files_report = combine_results(workbooks, results)
+            # The per-workbook frames are only needed for their periods
+            periods = {path: long_periods(df) for path, (df, _) in zip(workbooks, results)}
+            del results
+            records = stage["rows"] = len(long_df)
 
         # ----------------------
-        # 2. Transform Excel
+        # 2. Write artifacts while 3. loading into DB
         # ----------------------
-        transformer = ExcelTransformer(self.wide_file_path)
-        long_df: pd.DataFrame = transformer.transform()
+        artifacts = asyncio.create_task(self._write_artifacts(long_df))
+        loader = WorkOrderLoader(long_df, bulk_load=self.bulk_load, low_memory=self.low_memory)
+        if self.low_memory:
+            # Left to the loader and the artifact writers, which release it when done
+            del long_df
+        try:
+            replaced = await self._served_periods()
+            load_stats = await self._load(loader.load)
+            async with self.stage("publish"):
+                hashes = await hash_files(workbooks)
+                sources = {path: (hashes[path], periods[path]) for path in workbooks}
+                await self._record_sources(sources)
+                await self._publish("full", replaced.union(*periods.values()))
+        except BaseException:
+            # Executor threads cannot be interrupted; let the writers finish first
+            await asyncio.gather(artifacts, return_exceptions=True)
+            raise
+
+        return {
+            "status": "success",
+            "message": "Work orders refreshed successfully.",
+            "records": records,
+            "files": files_report,
+            "load": load_stats,
+            "artifacts": await artifacts,
+            "stages": self.stages,
+        }
+
+    async def _write_artifacts(self, long_df) -> List[Dict]:
+        """
+        Write each artifact format in its own executor thread. The data is published
+        whether or not the files get written, so a failing format is reported in its
+        entry (``error``) instead of failing the run.
+        """
+        if not self.artifacts:
+            return []
+
+        def write(fmt: str) -> Dict:
+            writer = WRITERS[fmt]()
+            try:
+                return writer.write(long_df)
+            except Exception as e:
+                return {"format": fmt, "path": writer.path, "error": f"{type(e).__name__}: {e}"}
+
+        async with self.stage("artifacts") as stage:
+            stage["rows"] = len(long_df)
+            loop = asyncio.get_running_loop()
+            return list(await asyncio.gather(*(loop.run_in_executor(None, write, f) for f in self.artifacts)))
+
+    async def _load(self, load: Callable[..., Awaitable[Dict]], stage: str = "load") -> Dict:
+        """Run ``load`` into staging tables to swap in, or into the cleared live tables."""
+        if self.zero_downtime and StagingSwap.supported(self.db.bind):
+            # Load staging copies, index them, then swap them in atomically
+            staging = StagingSwap(self.db.bind)
+            async with self.stage(stage) as entry:
+                await staging.create()
+                async with staging.session() as staging_db:
+                    load_stats = await load(staging_db)
+                entry["rows"] = load_stats["rows"]
+            async with self.stage("rollups"):
+                async with staging.session() as staging_db:
+                    await RollupManager.rebuild(staging_db)
+            async with self.stage("swap"):
+                await staging.build_indexes()
+                staging.drop_retired_later(await staging.swap())
+            load_stats["swap"] = True
+        else:
+            # The clear, the load and the rollups are committed together, or rolled
+            # back together: a workbook failing to transform or load, or a rollup
+            # failing to build, leaves the old data in place
+            async with self.stage(stage) as entry:
+                await self.cleaner.clear_all(commit=False)
+                load_stats = await load(self.db, commit=False)
+                entry["rows"] = load_stats["rows"]
+            async with self.stage("rollups"):
+                await RollupManager.rebuild(self.db, commit=False)
+                await self.db.commit()
+        return load_stats
+
+    async def run_pipelined(self, workbooks: List[str]) -> Dict:
+        """Full reload with transform and load overlapped in a single ``pipeline`` stage."""
+        pipeline = EtlPipeline(
+            workbooks, bulk_load=self.bulk_load, batch_size=self.batch_size, queue_size=self.queue_size
+        )
+        replaced = await self._served_periods()
+        load_stats = await self._load(pipeline.load, stage="pipeline")
+        async with self.stage("publish"):
+            hashes = await hash_files(workbooks)
+            await self._record_sources({path: (hashes[path], pipeline.periods[path]) for path in workbooks})
+            await self._publish("full", replaced.union(*pipeline.periods.values()))
+
+        return {
+            "status": "success",
+            "message": "Work orders refreshed through the pipeline.",
+            "records": sum(item["rows"] for item in pipeline.files),
+            "files": pipeline.files,
+            "load": load_stats,
+            "artifacts": [],
+            "stages": self.stages,
+        }
+
+    async def run_incremental(self, workbooks: List[str]) -> Dict:
+        """
+        Reload only what changed. File artifacts are not rewritten,
+        since they would only contain the reloaded periods.
+
+        The touched periods are deleted and reloaded, and the rollups rebuilt, in one
+        transaction. ``facts`` reports the net change per fact key (location, date,
+        project type, status): inserted, updated (count changed), deleted and
+        unchanged, plus the rows physically deleted and inserted.
+        """
+        async with self.stage("hash"):
+            previous = await self._source_files()
+            hashes = await hash_files(workbooks)
+            changed = [p for p in workbooks if p not in previous or previous[p].content_hash != hashes[p]]
+        if not changed:
+            return {
+                "status": "success",
+                "message": "No source workbook changed.",
+                "records": 0,
+                "files": [{"file": p, "action": "skipped"} for p in workbooks],
+                "stages": self.stages,
+            }
 
         # ----------------------
-        # 3. Save transformed data
+        # 1. Transform changed workbooks and find the periods they touch
         # ----------------------
-        os.makedirs(os.path.dirname(LONG_EXCEL_PATH), exist_ok=True)
-        long_df.to_excel(LONG_EXCEL_PATH, index=False)
-        long_df.to_csv(LONG_CSV_PATH, index=False)
+        async with self.stage("transform") as stage:
+            transformed = await transform_each(changed, self.streaming, self.max_workers, self.low_memory)
+            results = dict(zip(changed, transformed))
+            periods: Set[Tuple[int, int]] = set()
+            for path in changed:
+                periods |= long_periods(results[path][0])
+                if path in previous:
+                    periods |= {tuple(p) for p in previous[path].periods}
+
+            # Unchanged workbooks sharing a replaced period are reloaded for that period,
+            # otherwise their facts would be lost by the period-scoped delete
+            reloaded = [
+                p for p in workbooks
+                if p not in results and {tuple(x) for x in previous[p].periods} & periods
+            ]
+            if reloaded:
+                transformed = await transform_each(reloaded, self.streaming, self.max_workers, self.low_memory)
+                results.update(zip(reloaded, transformed))
+
+            loaded = [p for p in workbooks if p in results]
+            long_df, files_report = combine_results(loaded, [results[p] for p in loaded])
+            long_df = filter_periods(long_df, periods)
+            stage["rows"] = len(long_df)
 
         # ----------------------
-        # 4. Load into DB
+        # 2. Replace the facts of the touched periods
         # ----------------------
-        loader = WorkOrderLoader(long_df)
-        await loader.load(self.db)
+        async with self.stage("load") as stage:
+            before = await self._period_facts(periods)
+            # The delete commits together with the reload and the rollups, or not at all
+            deleted = await self.cleaner.clear_periods(sorted(periods), commit=False)
+            loader = WorkOrderLoader(long_df, bulk_load=self.bulk_load, upsert=True, low_memory=self.low_memory)
+            load_stats = await loader.load(self.db, commit=False)
+            changes = fact_changes(before, await self._period_facts(periods))
+            stage["rows"] = load_stats["rows"]
+        async with self.stage("rollups"):
+            await RollupManager.rebuild(self.db, commit=False)
+            await self.db.commit()
+        async with self.stage("publish"):
+            await self._record_sources({path: (hashes[path], long_periods(results[path][0])) for path in loaded})
+            await self._publish("incremental", periods)
+
+        actions = {p: "changed" for p in changed} | {p: "reloaded" for p in reloaded}
+        for item in files_report:
+            item["action"] = actions[item["file"]]
+        skipped = [{"file": p, "action": "skipped"} for p in workbooks if p not in results]
 
         return {
             "status": "success",
-            "message": "Work orders refreshed successfully.",
-            "records": len(long_df)
+            "message": "Work orders refreshed incrementally.",
+            "records": len(long_df),
+            "files": files_report + skipped,
+            "periods": [list(p) for p in sorted(periods)],
+            "facts": {**changes, "rows": {"deleted": deleted, "inserted": load_stats["rows"]}},
+            "dimensions": loader.dimension_stats,
+            "load": load_stats,
+            "stages": self.stages,
         }
+
+    async def _period_facts(self, periods: Set[Tuple[int, int]]) -> Dict[Tuple, int]:
+        """Count per fact key (location, date, project type and status ids) in ``periods``."""
+        if not periods:
+            return {}
+        keys = [FactWorkOrder.location_id, FactWorkOrder.date_id, FactWorkOrder.project_type_id, FactWorkOrder.status_id]
+        result = await self.db.execute(
+            select(*keys, func.sum(FactWorkOrder.count))
+            .where(tuple_(FactWorkOrder.year, FactWorkOrder.month).in_(sorted(periods)))
+            .group_by(*keys)
+        )
+        return {tuple(row[:4]): int(row[4] or 0) for row in result.all()}
+
+    async def _source_files(self) -> Dict[str, EtlSourceFile]:
+        result = await self.db.execute(select(EtlSourceFile))
+        return {row.path: row for row in result.scalars().all()}
+
+    async def _record_sources(self, sources: Dict[str, Tuple[str, Set[Tuple[int, int]]]]):
+        """Store the content hash and periods of each loaded workbook."""
+        if not sources:
+            return
+        stmt = dialect_insert(self.db)(EtlSourceFile.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["path"],
+            set_={"content_hash": stmt.excluded.content_hash, "periods": stmt.excluded.periods, "loaded_at": func.now()},
+        )
+        await self.db.execute(stmt, [
+            {"path": path, "content_hash": digest, "periods": [list(p) for p in sorted(periods)]}
+            for path, (digest, periods) in sources.items()
+        ])
+        await self.db.commit()
+
+    async def _served_periods(self) -> Set[Tuple[int, int]]:
+        """(year, month) periods of the data currently served, from the smallest rollup covering them."""
+        table = RollupManager.pick(("year", "month"))
+        if table is None:
+            table = FactWorkOrder.__table__
+        query = select(table.c.year, table.c.month).distinct().where(table.c.year.isnot(None), table.c.month.isnot(None))
+        # Its own short transaction: a lock held by the run's session would block the staging swap
+        async with self.db.bind.connect() as conn:
+            rows = (await conn.execute(query)).all()
+        return {(int(year), int(month)) for year, month in rows}
+
+    async def _publish(self, reload: str, periods: Set[Tuple[int, int]]):
+        """
+        Rebuild the in-memory views of the data for the next data generation, then
+        start that generation and announce it with the ``periods`` replaced and the
+        dimension lists that differ from the previous snapshot. Nothing is bumped if
+        a view fails to build, so the generation never advances unannounced.
+        """
+        await wait_for_replica()
+        previous = dimension_snapshot.snapshot
+        generation = data_generation.current + 1
+        snapshot = await dimension_snapshot.build(self.db, generation)
+        facts = await columnar_facts.build(self.db, generation) if AGGREGATION_BACKEND == "numpy" else None
+        # No awaits from here on: readers see the new views and the event together
+        data_generation.bump()
+        dimension_snapshot.snapshot = snapshot
+        if facts is not None:
+            columnar_facts.facts = facts
+        invalidations.publish(generation, reload, periods, snapshot.changed_since(previous))
@@ -0,0 +1,136 @@
+import asyncio
+import random
+import time
+import uuid
+from typing import List, Set
+from sqlalchemy import ForeignKeyConstraint, Table, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.schema import AddConstraint, CreateIndex, CreateTable
+from app.models import DimLocation, DimDate, DimProjectType, DimStatus, FactWorkOrder, ROLLUP_TABLES
+from app.services.etl_service.partitions import partitions_of
+
+STAGING_SCHEMA = "etl_staging"
+RETIRED_SCHEMA_PREFIX = "etl_retired_"
+
+# The swap waits at most SWAP_LOCK_TIMEOUT_MS for the locks on the live tables, less
+# than PostgreSQL's default deadlock_timeout of 1 s: when a read transaction holding
+# one table waits for another the swap already locked, the swap gives up first and
+# retries, instead of the deadlock detector failing the read. Gives up after
+# SWAP_DEADLINE_SECONDS.
+SWAP_LOCK_TIMEOUT_MS = 500
+SWAP_DEADLINE_SECONDS = 60
+# lock_not_available and deadlock_detected
+SWAP_RETRY_SQLSTATES = {"55P03", "40P01"}
+
+# Keep references to background drops so they are not garbage collected mid-flight
+_background_tasks: Set[asyncio.Task] = set()
+
+
+class StagingSwap:
+    """
+    Blue/green load of the star schema on PostgreSQL.
+
+    The star tables and their rollups are created in a staging schema without any index or constraint,
+    loaded through ``session()``, indexed afterwards, and then moved into place with
+    ``ALTER TABLE ... SET SCHEMA`` in a single transaction. Readers see either the old
+    or the new generation, never a partial one. The old generation is parked in a
+    retired schema and dropped in the background.
+    """
+
+    TABLES: List[Table] = [
+        *(m.__table__ for m in (DimLocation, DimDate, DimProjectType, DimStatus, FactWorkOrder)),
+        *ROLLUP_TABLES.values(),
+    ]
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.staging_engine = engine.execution_options(schema_translate_map={None: STAGING_SCHEMA})
+
+    @staticmethod
+    def supported(engine: AsyncEngine) -> bool:
+        return engine.dialect.name == "postgresql"
+
+    def session(self) -> AsyncSession:
+        """Session whose ORM/Core statements target the staging tables."""
+        return AsyncSession(bind=self.staging_engine, expire_on_commit=False)
+
+    async def create(self):
+        """Recreate the staging schema with bare copies of the tables."""
+        async with self.staging_engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {STAGING_SCHEMA}"))
+            for table in self.TABLES:
+                await conn.execute(CreateTable(table, include_foreign_key_constraints=[]))
+                # Primary keys and unique constraints are rebuilt after the load
+                result = await conn.execute(
+                    text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:name AS regclass)"),
+                    {"name": f"{STAGING_SCHEMA}.{table.name}"},
+                )
+                for name in result.scalars().all():
+                    await conn.execute(text(f'ALTER TABLE {STAGING_SCHEMA}.{table.name} DROP CONSTRAINT "{name}"'))
+
+    async def build_indexes(self):
+        """Add keys, unique constraints, foreign keys and indexes to the loaded staging tables."""
+        async with self.staging_engine.begin() as conn:
+            for table in self.TABLES:
+                for constraint in table.constraints:
+                    # Tables without a primary key still carry an empty PrimaryKeyConstraint
+                    if constraint.columns and not isinstance(constraint, ForeignKeyConstraint):
+                        await conn.execute(AddConstraint(constraint))
+            for table in self.TABLES:
+                for constraint in table.foreign_key_constraints:
+                    await conn.execute(AddConstraint(constraint))
+                for index in table.indexes:
+                    await conn.execute(CreateIndex(index))
+            for table in self.TABLES:
+                await conn.execute(text(f"ANALYZE {STAGING_SCHEMA}.{table.name}"))
+
+    async def swap(self) -> str:
+        """
+        Move the live tables into a retired schema and the staging tables into place,
+        atomically. Queries running meanwhile hold locks on the live tables; when one
+        of them would deadlock with the swap, the swap is rolled back and tried again.
+        """
+        deadline = time.monotonic() + SWAP_DEADLINE_SECONDS
+        while True:
+            try:
+                return await self._swap()
+            except DBAPIError as exc:
+                if time.monotonic() >= deadline or getattr(exc.orig, "sqlstate", None) not in SWAP_RETRY_SQLSTATES:
+                    raise
+                await asyncio.sleep(random.uniform(0.05, 0.2))
+
+    async def _swap(self) -> str:
+        retired = f"{RETIRED_SCHEMA_PREFIX}{uuid.uuid4().hex[:8]}"
+        async with self.engine.begin() as conn:
+            live = (await conn.execute(text("SELECT current_schema()"))).scalar_one()
+            await conn.execute(text(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT_MS}ms'"))
+            # All live tables at once (with their partitions), before moving any of them
+            tables = [f"{live}.{table.name}" for table in self.TABLES]
+            existing = (await conn.execute(
+                text("SELECT name FROM unnest(CAST(:names AS text[])) AS name WHERE to_regclass(name) IS NOT NULL"),
+                {"names": tables},
+            )).scalars().all()
+            if existing:
+                await conn.execute(text(f"LOCK TABLE {', '.join(existing)} IN ACCESS EXCLUSIVE MODE"))
+            await conn.execute(text(f"CREATE SCHEMA {retired}"))
+            # Partitions do not follow their parent across schemas, so move them explicitly
+            for table in self.TABLES:
+                for name in [table.name, *await partitions_of(conn, f"{live}.{table.name}")]:
+                    await conn.execute(text(f"ALTER TABLE IF EXISTS {live}.{name} SET SCHEMA {retired}"))
+            for table in self.TABLES:
+                for name in [table.name, *await partitions_of(conn, f"{STAGING_SCHEMA}.{table.name}")]:
+                    await conn.execute(text(f"ALTER TABLE {STAGING_SCHEMA}.{name} SET SCHEMA {live}"))
+            await conn.execute(text(f"DROP SCHEMA {STAGING_SCHEMA}"))
+        return retired
+
+    async def drop_retired(self, schema: str):
+        async with self.engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+
+    def drop_retired_later(self, schema: str):
+        """Drop the previous generation without holding up the refresh response."""
+        task = asyncio.create_task(self.drop_retired(schema))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
@@ -0,0 +1,133 @@
+import asyncio
+import glob
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+import pandas as pd
+from app.core.constants import ETL_MAX_WORKERS
+from app.services.etl_service.excel_transformer import ExcelTransformer
+from app.services.etl_service.dtypes import compact_long, concat_long, normalize_int
+from app.services.etl_service.long_reader import has_long_extension, read_long
+
+WORKBOOK_EXTENSIONS = (".xlsx", ".xlsm")
+
+
+def resolve_workbooks(source: str) -> List[str]:
+    """
+    Expand ``source`` into a sorted list of source files: wide workbooks and
+    long-format CSV/Parquet/Arrow files, which skip the Excel transform.
+
+    ``source`` may be a single file, a directory (all sources inside it) or a glob pattern.
+    """
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source)]
+    elif os.path.isfile(source):
+        return [source]
+    else:
+        paths = glob.glob(source)
+    # Skip Excel lock files like "~$2016.xlsx"
+    workbooks = sorted(
+        p for p in paths
+        if (p.lower().endswith(WORKBOOK_EXTENSIONS) or has_long_extension(p))
+        and not os.path.basename(p).startswith("~$")
+    )
+    if not workbooks:
+        raise FileNotFoundError(f"No workbooks or long-format files found for: {source}")
+    return workbooks
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of the file contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def hash_files(paths: List[str]) -> Dict[str, str]:
+    """Content hashes of ``paths``, computed in the default executor."""
+    loop = asyncio.get_running_loop()
+    digests = await asyncio.gather(*(loop.run_in_executor(None, file_hash, path) for path in paths))
+    return dict(zip(paths, digests))
+
+
+def transform_workbook(path: str, streaming: bool = False, low_memory: bool = False) -> Tuple[pd.DataFrame, float]:
+    """
+    Transform one workbook into long format; runs inside a worker process.
+    Long-format files are read directly instead. With ``low_memory`` the frame has
+    compact dtypes (see ``compact_long``).
+    """
+    start = time.perf_counter()
+    if has_long_extension(path):
+        df_long = read_long(path)
+        return compact_long(df_long) if low_memory else df_long, time.perf_counter() - start
+    transformer = ExcelTransformer(path, low_memory=low_memory)
+    df_long = transformer.transform_streaming() if streaming else transformer.transform()
+    return df_long, time.perf_counter() - start
+
+
+async def transform_each(
+    paths: List[str],
+    streaming: bool = False,
+    max_workers: Optional[int] = None,
+    low_memory: bool = False,
+) -> List[Tuple[pd.DataFrame, float]]:
+    """
+    Transform every workbook, in a process pool when there is more than one and in
+    the default executor otherwise, never on the event loop.
+
+    Long-format files are read one after the other in the default executor: the
+    pyarrow readers are multi-threaded already, and a worker process would have to
+    pickle the whole frame back.
+    """
+    loop = asyncio.get_running_loop()
+    wide = [path for path in paths if not has_long_extension(path)]
+    results = {}
+    for path in paths:
+        if has_long_extension(path) or len(wide) <= 1:
+            results[path] = await loop.run_in_executor(None, transform_workbook, path, streaming, low_memory)
+    wide = [path for path in wide if path not in results]
+    if wide:
+        workers = min(max_workers or ETL_MAX_WORKERS, len(wide))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            transformed = await asyncio.gather(*(
+                loop.run_in_executor(pool, transform_workbook, path, streaming, low_memory) for path in wide
+            ))
+        results.update(zip(wide, transformed))
+    return [results[path] for path in paths]
+
+
+def combine_results(paths: List[str], results: List[Tuple[pd.DataFrame, float]]) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    Concatenate per-file long DataFrames (see ``concat_long``) and build the per-file
+    timing/row-count report.
+    """
+    report = [
+        {"file": path, "rows": len(df_long), "seconds": round(seconds, 3)}
+        for path, (df_long, seconds) in zip(paths, results)
+    ]
+    frames = [df_long for df_long, _ in results]
+    long_df = concat_long(frames) if frames else pd.DataFrame()
+    return long_df, report
+
+
+def long_periods(df_long: pd.DataFrame) -> Set[Tuple[int, int]]:
+    """Distinct (year, month) periods present in a long DataFrame."""
+    if df_long.empty:
+        return set()
+    dates = pd.DataFrame({
+        "year": normalize_int(df_long["year"]),
+        "month": normalize_int(df_long["month"]),
+    }).dropna().drop_duplicates()
+    return {(int(y), int(m)) for y, m in dates.itertuples(index=False)}
+
+
+def filter_periods(df_long: pd.DataFrame, periods: Set[Tuple[int, int]]) -> pd.DataFrame:
+    """Keep only the rows of ``df_long`` that fall in one of ``periods``."""
+    if df_long.empty:
+        return df_long
+    index = pd.MultiIndex.from_arrays([normalize_int(df_long["year"]), normalize_int(df_long["month"])])
+    return df_long[index.isin(list(periods))].reset_index(drop=True)
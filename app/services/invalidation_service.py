@@ -0,0 +1,73 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+import orjson
+from app.core.constants import EVENTS_HISTORY
+
+
+class InvalidationBroadcaster:
+    """
+    Publishes one event per data generation, listing the (year, month) periods and the
+    dimension lists a refresh changed, to every open /events stream.
+
+    Streams do not get a queue each: they all wait on one shared future that a
+    publish resolves, then read what they missed from a short history of encoded
+    events. Publishing is O(1) and an idle stream costs a suspended coroutine, so a
+    worker can hold thousands of them without touching the database. Like
+    ``DataGeneration`` this is per process; event ids are generation numbers.
+    """
+
+    def __init__(self, history: int = EVENTS_HISTORY):
+        self._events: Deque[Tuple[int, bytes]] = deque(maxlen=history)
+        self._published: Optional[asyncio.Future] = None
+
+    @property
+    def last_id(self) -> int:
+        return self._events[-1][0] if self._events else 0
+
+    def publish(
+        self, generation: int, reload: str, periods: Iterable[Tuple[int, int]], dimensions: List[str],
+    ) -> Dict:
+        """Record the event of ``generation`` and wake every waiting stream."""
+        event = {
+            "generation": generation,
+            "reload": reload,
+            "periods": [list(p) for p in sorted(periods)],
+            "dimensions": dimensions,
+            "published_at": datetime.now(timezone.utc).isoformat(),
+        }
+        # Encoded once here, not once per stream
+        self._events.append((generation, orjson.dumps(event)))
+        published, self._published = self._published, None
+        if published is not None and not published.done():
+            published.set_result(None)
+        return event
+
+    def since(self, last_id: int) -> Optional[List[Tuple[int, bytes]]]:
+        """
+        Events after ``last_id``, or None when some of them are no longer in the
+        history (or ``last_id`` is from before a restart) and the client must reload.
+        """
+        if last_id > self.last_id:
+            return None
+        missed = [(event_id, data) for event_id, data in self._events if event_id > last_id]
+        if missed and missed[0][0] != last_id + 1:
+            return None
+        return missed
+
+    async def wait(self, last_id: int, timeout: float):
+        """Return once an event after ``last_id`` is published, or after ``timeout`` seconds."""
+        if self.last_id != last_id:
+            # Published while the stream was busy sending
+            return
+        if self._published is None:
+            self._published = asyncio.get_running_loop().create_future()
+        try:
+            # shield: a stream timing out must not cancel the future the others wait on
+            await asyncio.wait_for(asyncio.shield(self._published), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+invalidations = InvalidationBroadcaster()
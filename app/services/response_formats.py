@@ -0,0 +1,183 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import msgpack
+import orjson
+import pyarrow as pa
+import pyarrow.ipc
+from fastapi import HTTPException, Request
+
+
+class ChartData:
+    """
+    Result rows as tuples plus their labels. The row-oriented JSON format turns them
+    into one dict per row; the compact formats read them column by column instead.
+    """
+    __slots__ = ("labels", "rows")
+
+    def __init__(self, labels: Sequence[str], rows: List[tuple]):
+        self.labels = tuple(labels)
+        self.rows = rows
+
+    @classmethod
+    def from_records(cls, labels: Sequence[str], records: Iterable[Dict]) -> "ChartData":
+        return cls(labels, [tuple(record[label] for label in labels) for record in records])
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def records(self) -> List[Dict]:
+        labels = self.labels
+        return [dict(zip(labels, row)) for row in self.rows]
+
+    def columns(self) -> Dict[str, list]:
+        # Several times faster than zip(*rows), which builds one huge tuple per column
+        return {label: list(map(itemgetter(i), self.rows)) for i, label in enumerate(self.labels)}
+
+
+def _number(value: Decimal):
+    # PostgreSQL returns SUM over BIGINT as NUMERIC
+    return int(value) if value == value.to_integral_value() else float(value)
+
+
+def _json_default(value):
+    if isinstance(value, ChartData):
+        return value.records()
+    if isinstance(value, Decimal):
+        return _number(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _columnar_default(value):
+    if isinstance(value, ChartData):
+        return value.columns()
+    if isinstance(value, Decimal):
+        return _number(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def encode_json(document) -> bytes:
+    # Same bytes as JSONResponse (compact, non-ASCII kept), so ETags do not change
+    return orjson.dumps(document, default=_json_default)
+
+
+def encode_columnar(document) -> bytes:
+    return orjson.dumps(document, default=_columnar_default)
+
+
+def encode_msgpack(document) -> bytes:
+    return msgpack.packb(document, default=_columnar_default, use_bin_type=True)
+
+
+def encode_arrow(document) -> bytes:
+    """
+    One Arrow IPC stream holding the document's table: the document itself when it is
+    a ChartData, otherwise its ``chart_data``, with the other top-level fields as
+    JSON values in the schema metadata.
+    """
+    if isinstance(document, ChartData):
+        table, fields = document, {}
+    else:
+        table = document["chart_data"]
+        fields = {key: value for key, value in document.items() if key != "chart_data"}
+
+    arrays = []
+    for values in table.columns().values():
+        first = next((value for value in values if value is not None), None)
+        if isinstance(first, str):
+            # Typed up front, as inferring it costs more than the conversion; each
+            # city, project type and status name is then sent once
+            array = pa.array(values, type=pa.string()).dictionary_encode()
+        elif isinstance(first, Decimal):
+            array = pa.array([None if value is None else _number(value) for value in values])
+        else:
+            array = pa.array(values)
+        arrays.append(array)
+    metadata = {key: orjson.dumps(value, default=_json_default) for key, value in fields.items()}
+    batch = pa.RecordBatch.from_arrays(arrays, names=list(table.labels), metadata=metadata)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+@dataclass(frozen=True)
+class ResponseFormat:
+    name: str
+    media_type: str
+    encode: Callable[[object], bytes]
+
+
+FORMATS: Dict[str, ResponseFormat] = {
+    "json": ResponseFormat("json", "application/json", encode_json),
+    "columnar": ResponseFormat("columnar", "application/vnd.openworkorders.columnar+json", encode_columnar),
+    "msgpack": ResponseFormat("msgpack", "application/msgpack", encode_msgpack),
+    "arrow": ResponseFormat("arrow", "application/vnd.apache.arrow.stream", encode_arrow),
+}
+# Other media types clients send for the same formats
+ALIASES = {"application/x-msgpack": "msgpack", "application/vnd.msgpack": "msgpack"}
+
+# Documents with a single table (``chart_data``, or a ChartData itself) can also be
+# sent as Arrow; nested ones only as JSON, columnar JSON or MessagePack
+TABLE_FORMATS = ("json", "columnar", "msgpack", "arrow")
+DOCUMENT_FORMATS = ("json", "columnar", "msgpack")
+
+
+def parse_accept(accept: Optional[str]) -> List[Tuple[str, float]]:
+    """Media ranges of an Accept header with their quality, in header order."""
+    ranges = []
+    for part in (accept or "*/*").split(","):
+        media_range, *params = (item.strip() for item in part.split(";"))
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges.append((media_range.lower(), quality))
+    return ranges
+
+
+def negotiate(accept: Optional[str], offered: Sequence[str]) -> Optional[ResponseFormat]:
+    """
+    The offered format the Accept header prefers: highest quality first, then the
+    order of ``offered``. JSON answers wildcards. None when nothing offered is acceptable.
+    """
+    best, best_quality = None, 0.0
+    for media_range, quality in parse_accept(accept):
+        if media_range in ("*/*", "application/*"):
+            name = offered[0]
+        else:
+            name = ALIASES.get(media_range) or next(
+                (n for n in offered if FORMATS[n].media_type == media_range), None
+            )
+        if name not in offered or quality <= 0:
+            continue
+        if quality > best_quality or (quality == best_quality and offered.index(name) < offered.index(best)):
+            best, best_quality = name, quality
+    return FORMATS[best] if best else None
+
+
+def accepts(offered: Sequence[str]) -> Callable[[Request], ResponseFormat]:
+    """Dependency picking the response format from the request's Accept header, or a 406."""
+
+    def response_format(request: Request) -> ResponseFormat:
+        chosen = negotiate(request.headers.get("accept"), offered)
+        if chosen is None:
+            raise HTTPException(
+                status_code=406,
+                detail=f"Not acceptable. Available: {[FORMATS[name].media_type for name in offered]}",
+            )
+        return chosen
+
+    return response_format
+
+
+table_format = accepts(TABLE_FORMATS)
+document_format = accepts(DOCUMENT_FORMATS)
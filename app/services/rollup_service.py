@@ -0,0 +1,52 @@
+from typing import Iterable, Optional, Set
+from sqlalchemy import Table, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import FactWorkOrder, ROLLUP_TABLES, rollup_columns
+
+
+class RollupManager:
+    """
+    Maintains the rollup tables configured in ``ROLLUP_GROUPINGS`` and picks the one
+    able to answer an aggregation.
+
+    A rollup keeps the fact foreign keys of its fields plus SUM(count), so any query
+    whose group-by and filter fields are a subset of the rollup's fields gives the
+    same result on the rollup as on ``fact_work_order``.
+    """
+
+    @staticmethod
+    def pick(fields: Iterable[str]) -> Optional[Table]:
+        """
+        Smallest rollup covering ``fields``, or None to fall back to the fact table.
+        Rollups with fewer key columns are smaller; ties keep the configured order.
+        """
+        fields = set(fields)
+        candidates = [
+            (len(rollup_columns(grouping)), table)
+            for grouping, table in ROLLUP_TABLES.items()
+            if fields <= set(grouping)
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: c[0])[1]
+
+    @staticmethod
+    def build_statement(fields: tuple, table: Table):
+        fact = FactWorkOrder.__table__
+        key_cols = [fact.c[c] for c in rollup_columns(fields)]
+        summary = select(*key_cols, func.sum(fact.c.count)).group_by(*key_cols)
+        return insert(table).from_select([*(c.name for c in key_cols), "count"], summary)
+
+    @classmethod
+    async def rebuild(cls, db: AsyncSession, groupings: Optional[Set[tuple]] = None, commit: bool = True):
+        """
+        Recompute every rollup (or only ``groupings``) from the fact table and commit.
+        With ``commit=False`` the rebuild is left to the caller's transaction.
+        """
+        for fields, table in ROLLUP_TABLES.items():
+            if groupings is not None and fields not in groupings:
+                continue
+            await db.execute(delete(table))
+            await db.execute(cls.build_statement(fields, table))
+        if commit:
+            await db.commit()
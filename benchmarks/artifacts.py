@@ -0,0 +1,74 @@
+"""
+Compare write time and file size of each ETL artifact format on the transformed
+long table, and check that every format reads back to the same rows.
+
+The table is transformed from the sample workbook and can be repeated to get a
+realistic size; files go to a temporary directory:
+    python -m benchmarks.artifacts --repeat 200 --formats xlsx csv csv.gz parquet arrow
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import pandas as pd
+from app.core.constants import WIDE_FILE_PATH
+from app.services.etl_service.artifacts import WRITERS
+from app.services.etl_service.workbooks import transform_workbook
+
+READERS = {
+    "xlsx": pd.read_excel,
+    "csv": pd.read_csv,
+    "csv.gz": pd.read_csv,
+    "parquet": pd.read_parquet,
+    "arrow": pd.read_feather,
+}
+
+
+def comparable(df: pd.DataFrame) -> pd.DataFrame:
+    """Text as str and numbers as float, so formats that keep dtypes compare equal to those that don't."""
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype) or df[column].dtype in (object, "string"):
+            df[column] = df[column].astype(object).where(df[column].notna(), None)
+        else:
+            df[column] = df[column].astype(float)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", default=WIDE_FILE_PATH)
+    parser.add_argument("--repeat", type=int, default=50, help="Stack the transformed table this many times")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--formats", nargs="+", default=list(WRITERS), choices=list(WRITERS))
+    args = parser.parse_args()
+
+    df_long, _ = transform_workbook(args.source)
+    df_long = pd.concat([df_long] * args.repeat, ignore_index=True)
+    expected = comparable(df_long)
+    print(f"{len(df_long)} rows")
+
+    failures = 0
+    print(f"{'format':<8} {'p50 s':>8} {'MB':>8} {'vs csv':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        reports = {}
+        for fmt in args.formats:
+            writer = WRITERS[fmt](os.path.join(tmp, f"data_long.{fmt}"))
+            runs = [writer.write(df_long) for _ in range(args.runs)]
+            reports[fmt] = {"seconds": statistics.median(r["seconds"] for r in runs), "bytes": runs[-1]["bytes"]}
+            if not comparable(READERS[fmt](writer.path)).equals(expected):
+                failures += 1
+                print(f"ROUND-TRIP MISMATCH {fmt}")
+
+        csv_bytes = reports.get("csv", {}).get("bytes")
+        for fmt, report in reports.items():
+            ratio = f"{report['bytes'] / csv_bytes:>6.2f}x" if csv_bytes else f"{'-':>7}"
+            print(f"{fmt:<8} {report['seconds']:>8.3f} {report['bytes'] / 1e6:>8.3f} {ratio}")
+
+    print("artifacts:", "OK" if not failures else f"{failures} mismatches")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare a dashboard's worth of /aggregations/sum specs run one by one against one
+BatchMetrics call: result parity, SQL statements (round trips) and database time.
+
+Runs against DATABASE_URL, which must already hold data loaded by /etl/refresh:
+    python -m benchmarks.batch --repeat 20 --no-rollups
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from sqlalchemy import event
+from app.core.database import AsyncSessionLocal, engine
+from app.services.aggregation_service import BatchMetrics, WorkOrderMetrics
+from benchmarks.rollups import canonical, sample_filters
+
+
+def dashboard(filters: dict, use_rollups: bool) -> list:
+    """(metrics, subtotals, grand_total) of a typical dashboard load."""
+    specs = [
+        (["status"], "count"),
+        (["project_type"], "count"),
+        (["location"], "count"),
+        (["year", "month"], "month"),
+        (["project_type", "status"], None),
+        (["location", "year", "month"], None),
+        (["status", "year", "month"], None),
+        ([], None),
+    ]
+    return [
+        (WorkOrderMetrics(**filters, group_by=group_by, order_by=order_by, use_rollups=use_rollups), False, False)
+        for group_by, order_by in specs
+    ]
+
+
+class StatementTimer:
+    """Counts statements and accumulates their execution time on the engine."""
+
+    def __init__(self, sync_engine):
+        self.statements = 0
+        self.seconds = 0.0
+        self._started = []
+        event.listen(sync_engine, "before_cursor_execute", self._before)
+        event.listen(sync_engine, "after_cursor_execute", self._after)
+
+    def _before(self, *args):
+        self._started.append(time.perf_counter())
+
+    def _after(self, *args):
+        self.seconds += time.perf_counter() - self._started.pop()
+        self.statements += 1
+
+    def reset(self):
+        self.statements, self.seconds = 0, 0.0
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--no-rollups", action="store_true", help="Read the fact table only")
+    args = parser.parse_args()
+    use_rollups = not args.no_rollups
+
+    timer = StatementTimer(engine.sync_engine)
+    mismatches = 0
+    runs = {"separate": [], "batch": []}
+    async with AsyncSessionLocal() as db:
+        for filters in (await sample_filters(db))[:3]:
+            specs = dashboard(filters, use_rollups)
+
+            separate = [await metrics.aggregate(db) for metrics, _, _ in specs]
+            batch = BatchMetrics()
+            for spec in specs:
+                batch.add(*spec)
+            batched = await batch.aggregate(db)
+            for (metrics, _, _), one, other in zip(specs, separate, batched):
+                if canonical(one) != canonical(other):
+                    mismatches += 1
+                    print(f"MISMATCH filters={filters} group_by={metrics.group_by}")
+
+            for _ in range(args.repeat):
+                timer.reset()
+                start = time.perf_counter()
+                for metrics, _, _ in specs:
+                    await metrics.aggregate(db)
+                runs["separate"].append((timer.statements, timer.seconds, time.perf_counter() - start))
+
+                timer.reset()
+                start = time.perf_counter()
+                batch = BatchMetrics()
+                for spec in specs:
+                    batch.add(*spec)
+                await batch.aggregate(db)
+                runs["batch"].append((timer.statements, timer.seconds, time.perf_counter() - start))
+    await engine.dispose()
+
+    print(f"dialect={engine.dialect.name} rollups={use_rollups} specs per load={len(specs)}")
+    print(f"{'mode':<10} {'statements':>11} {'db p50 ms':>10} {'wall p50 ms':>12}")
+    for mode, samples in runs.items():
+        statements = statistics.median(s[0] for s in samples)
+        db_ms = statistics.median(s[1] for s in samples) * 1000
+        wall_ms = statistics.median(s[2] for s in samples) * 1000
+        print(f"{mode:<10} {statements:>11.0f} {db_ms:>10.2f} {wall_ms:>12.2f}")
+    print("parity:", "OK" if not mismatches else f"{mismatches} mismatching specs")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""
+Check the numpy columnar backend of WorkOrderMetrics against SQL on random
+filter / group_by / order combinations, and time both backends.
+
+Runs against DATABASE_URL, which must already hold data loaded by /etl/refresh:
+    python -m benchmarks.columnar_parity --cases 500 --seed 1
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal, engine
+from app.models import FactWorkOrder
+from app.services.aggregation_service import WorkOrderMetrics
+from app.services.columnar_engine import columnar_facts
+from benchmarks.rollups import GROUP_FIELDS, canonical
+
+FILTERS = {
+    "location_id": FactWorkOrder.location_id,
+    "project_type_id": FactWorkOrder.project_type_id,
+    "status_id": FactWorkOrder.status_id,
+    "year": FactWorkOrder.year,
+    "month": FactWorkOrder.month,
+}
+
+
+async def filter_values(db) -> dict:
+    """Values present in the facts for each filter, plus one that matches nothing."""
+    values = {}
+    for name, column in FILTERS.items():
+        present = (await db.execute(select(column).distinct().where(column.isnot(None)))).scalars().all()
+        values[name] = [*present, -1]
+    return values
+
+
+def random_case(rng: random.Random, values: dict) -> dict:
+    case = {name: rng.choice(options) for name, options in values.items() if rng.random() < 0.3}
+    case["group_by"] = rng.sample(GROUP_FIELDS, rng.randint(0, len(GROUP_FIELDS)))
+    order_by = rng.choice([None, "count", *case["group_by"]])
+    if order_by:
+        case["order_by"] = order_by
+        case["order_dir"] = rng.choice(["asc", "desc"])
+    return case
+
+
+def sort_keys(result: dict, metrics: WorkOrderMetrics) -> list:
+    """The ordered column's values; ties may come back in any order on either backend."""
+    if not metrics.order_by:
+        return []
+    key = "count" if metrics.order_by == "count" else WorkOrderMetrics.OUTPUT_KEYS[metrics.order_by]
+    return [item[key] for item in result["chart_data"]]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    mismatches = 0
+    timings = {"sql": [], "numpy": []}
+    async with AsyncSessionLocal() as db:
+        start = time.perf_counter()
+        facts = await columnar_facts.load(db)
+        print(f"loaded {len(facts)} facts into arrays in {(time.perf_counter() - start) * 1000:.1f} ms")
+        values = await filter_values(db)
+        for _ in range(args.cases):
+            case = random_case(rng, values)
+            results = {}
+            for backend in timings:
+                metrics = WorkOrderMetrics(**case, use_rollups=False, backend=backend)
+                start = time.perf_counter()
+                results[backend] = await metrics.aggregate(db)
+                timings[backend].append(time.perf_counter() - start)
+            if canonical(results["sql"]) != canonical(results["numpy"]) or (
+                sort_keys(results["sql"], metrics) != sort_keys(results["numpy"], metrics)
+            ):
+                mismatches += 1
+                print(f"MISMATCH {case}")
+    await engine.dispose()
+
+    for backend, samples in timings.items():
+        print(f"{backend:<6} p50 {statistics.median(samples) * 1000:.3f} ms  "
+              f"p95 {statistics.quantiles(samples, n=20)[-1] * 1000:.3f} ms")
+    print(f"parity over {args.cases} cases:", "OK" if not mismatches else f"{mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
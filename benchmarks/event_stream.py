@@ -0,0 +1,124 @@
+"""
+Thousands of idle /events streams on one uvicorn worker: server memory per stream,
+server CPU while they sit idle (nothing polls the database), and how long each
+stream takes to receive the event of an ETL refresh after it is published.
+
+Starts the app in a uvicorn subprocess on a throwaway SQLite file and refreshes it
+from the default workbook:
+    python -m benchmarks.event_stream --clients 2000 --refreshes 3
+Each stream takes a file descriptor on both sides; raise `ulimit -n` for more clients.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import httpx
+import psutil
+
+
+async def open_stream(port: int) -> asyncio.StreamReader:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /open-work-orders/events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n")
+    await writer.drain()
+    await reader.readuntil(b"\r\n\r\n")
+    await reader.readuntil(b"event: hello")
+    return reader, writer
+
+
+async def next_generation(reader: asyncio.StreamReader) -> float:
+    """Seconds between the next generation event's publication and its arrival."""
+    while True:
+        line = await reader.readline()
+        if line.startswith(b"data: {\"generation\"") and b"published_at" in line:
+            received = time.time()
+            published = datetime.fromisoformat(json.loads(line.split(b":", 1)[1])["published_at"])
+            return received - published.timestamp()
+
+
+async def run(args, port: int, server: psutil.Process) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base, timeout=None) as client:
+        for _ in range(100):
+            try:
+                (await client.get("/")).raise_for_status()
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+        (await client.post("/open-work-orders/etl/refresh", params={"artifacts": "none"})).raise_for_status()
+
+        rss_before = server.memory_info().rss
+        start = time.perf_counter()
+        streams = []
+        for offset in range(0, args.clients, 200):
+            streams += await asyncio.gather(*(open_stream(port) for _ in range(offset, min(args.clients, offset + 200))))
+        connect_seconds = time.perf_counter() - start
+        rss_after = server.memory_info().rss
+
+        cpu_before = sum(server.cpu_times()[:2])
+        await asyncio.sleep(args.idle)
+        idle_cpu = (sum(server.cpu_times()[:2]) - cpu_before) / args.idle
+
+        latencies = []
+        for _ in range(args.refreshes):
+            waiting = [asyncio.create_task(next_generation(reader)) for reader, _ in streams]
+            (await client.post("/open-work-orders/etl/refresh", params={"artifacts": "none"})).raise_for_status()
+            latencies += await asyncio.gather(*waiting)
+
+        gauge = next(
+            line for line in (await client.get("/metrics")).text.splitlines() if line.startswith("event_stream_clients")
+        )
+        for _, writer in streams:
+            writer.close()
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "clients": args.clients,
+        "open_streams_gauge": float(gauge.split()[-1]),
+        "connect_seconds": round(connect_seconds, 2),
+        "rss_per_stream_bytes": round((rss_after - rss_before) / args.clients),
+        "idle_cpu_percent": round(idle_cpu * 100, 2),
+        "events_received": len(latencies),
+        "delivery_p50_ms": round(cuts[49] * 1000, 2),
+        "delivery_p99_ms": round(cuts[98] * 1000, 2),
+        "delivery_max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--refreshes", type=int, default=3)
+    parser.add_argument("--idle", type=float, default=5, help="Seconds to measure idle server CPU")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--output", help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{tmp}/bench.db", "SQL_LOG": "off"}
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            result = asyncio.run(run(args, args.port, psutil.Process(process.pid)))
+        finally:
+            process.terminate()
+            process.wait()
+
+    for key, value in result.items():
+        print(f"{key:<24} {value}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    ok = result["events_received"] == args.clients * args.refreshes and result["open_streams_gauge"] == args.clients
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
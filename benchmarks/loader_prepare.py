@@ -0,0 +1,103 @@
+"""
+Benchmark the columnar FactLoader.prepare against the previous per-row loop.
+
+Usage:
+    python -m benchmarks.loader_prepare --sizes 10000 1000000 10000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.services.etl_service.loader import FactLoader
+
+STATUSES = ["دردست اجرا", "تهیه صورت وضعیت", "صورت وضعیت نزد ستاد", "صورت وضعیت نزد مالی", "صورت وضعیت نزد مشاور"]
+
+
+def make_long_frame(rows: int, cities: int = 50, tests: int = 7, seed: int = 0) -> pd.DataFrame:
+    """Synthetic long-format frame with the same columns and dtypes as data_long.csv."""
+    rng = np.random.default_rng(seed)
+    city_idx = rng.integers(1, cities + 1, rows)
+    return pd.DataFrame({
+        "city_name": pd.Series([f"شهر {i}" for i in range(cities + 1)], dtype=object).to_numpy()[city_idx],
+        "department_code": (5000 + city_idx).astype(float),
+        "year": rng.integers(1398, 1404, rows).astype(float),
+        "month": rng.integers(1, 13, rows).astype(float),
+        "count": rng.integers(0, 100, rows).astype(float),
+        "project_type": np.array([f"تست {i}" for i in range(1, tests + 1)], dtype=object)[rng.integers(0, tests, rows)],
+        "status": np.array(STATUSES, dtype=object)[rng.integers(0, len(STATUSES), rows)],
+    })
+
+
+def make_dimension_maps(df: pd.DataFrame) -> dict:
+    locations = df[["city_name", "department_code"]].drop_duplicates()
+    dates = df[["year", "month"]].drop_duplicates()
+    return {
+        "location": {(c, str(int(d))): i for i, (c, d) in enumerate(locations.itertuples(index=False), 1)},
+        "date": {(int(y), int(m)): i for i, (y, m) in enumerate(dates.itertuples(index=False), 1)},
+        "project_type": {v: i for i, v in enumerate(df["project_type"].unique(), 1)},
+        "status": {v: i for i, v in enumerate(df["status"].unique(), 1)},
+    }
+
+
+def legacy_prepare(df_long: pd.DataFrame, dimension_maps: dict) -> list:
+    """The per-row FactLoader.prepare loop this benchmark compares against."""
+    loc_map = dimension_maps['location']
+    date_map = dimension_maps['date']
+    proj_map = dimension_maps['project_type']
+    status_map = dimension_maps['status']
+    fact_records = []
+    for _, row in df_long.iterrows():
+        city_name = str(row['city_name']).strip() if not pd.isna(row['city_name']) else None
+        try:
+            dept_code = str(int(row['department_code'])) if not pd.isna(row['department_code']) else None
+        except ValueError:
+            dept_code = None
+        loc_id = loc_map.get((city_name, dept_code))
+        try:
+            date_id = date_map.get((int(row['year']), int(row['month'])))
+        except ValueError:
+            date_id = None
+        proj_id = proj_map.get(str(row['project_type']).strip())
+        status_id = status_map.get(str(row['status']).strip())
+        try:
+            count = int(row['count']) if not pd.isna(row['count']) else 0
+        except ValueError:
+            count = 0
+        fact_records.append({
+            "location_id": loc_id,
+            "date_id": date_id,
+            "project_type_id": proj_id,
+            "status_id": status_id,
+            "count": count
+        })
+    return fact_records
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--legacy-max", type=int, default=10_000_000,
+                        help="Skip the per-row loop above this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'columnar rows/s':>18} {'loop rows/s':>14} {'speedup':>9}")
+    for rows in args.sizes:
+        df = make_long_frame(rows)
+        maps = make_dimension_maps(df)
+
+        columnar = timed(lambda: FactLoader(df, maps).prepare())
+        loop = timed(lambda: legacy_prepare(df, maps)) if rows <= args.legacy_max else None
+
+        loop_rate = f"{rows / loop:>14,.0f}" if loop else f"{'skipped':>14}"
+        speedup = f"{loop / columnar:>8.1f}x" if loop else f"{'-':>9}"
+        print(f"{rows:>12,} {rows / columnar:>18,.0f} {loop_rate} {speedup}")
+
+
+if __name__ == "__main__":
+    main()
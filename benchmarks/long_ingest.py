@@ -0,0 +1,93 @@
+"""
+Compare the throughput of the Excel route (wide workbook -> ExcelTransformer) with
+direct long-format ingestion (CSV / Parquet through pyarrow) up to the fact batch
+WorkOrderLoader inserts; the database insert itself is the same for both routes.
+
+A synthetic long file of --rows rows is generated in a temporary directory:
+    python -m benchmarks.long_ingest --rows 5000000 --target 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv
+import pyarrow.parquet
+from app.core.constants import WIDE_FILE_PATH
+from app.services.etl_service.loader import FactLoader, dimension_loaders
+from app.services.etl_service.workbooks import transform_workbook
+
+
+def synthetic_long(rows: int, seed: int = 0):
+    """A long-format Arrow table shaped like data_long.csv."""
+    rng = np.random.default_rng(seed)
+    location = rng.integers(0, 300, rows)
+    project_types = np.array([f"تست {i}" for i in range(1, 21)], dtype=object)
+    statuses = np.array(["دردست اجرا", "تهیه صورت وضعیت", "صورت وضعیت نزد ستاد",
+                         "صورت وضعیت نزد مالی", "صورت وضعیت نزد مشاور"], dtype=object)
+    return pa.table({
+        "city_name": pa.array(np.char.add("شهر ", location.astype(str)).astype(object)),
+        "department_code": (location * 7 + 1000).astype(np.float64),
+        "year": rng.integers(1395, 1405, rows).astype(np.float64),
+        "month": rng.integers(1, 13, rows).astype(np.float64),
+        "count": rng.integers(0, 50, rows).astype(np.float64),
+        "project_type": pa.array(project_types[rng.integers(0, len(project_types), rows)]),
+        "status": pa.array(statuses[rng.integers(0, len(statuses), rows)]),
+    })
+
+
+def prepare_facts(df_long) -> int:
+    """Run the loader's dimension and fact preparation with made-up ids (no database)."""
+    loaders = dimension_loaders(df_long)
+    for loader in loaders.values():
+        loader.prepare()
+        loader.map = {key: i for i, key in enumerate(loader.map, 1)}
+    facts = FactLoader(df_long, {name: loader.map for name, loader in loaders.items()})
+    facts.prepare()
+    return len(facts)
+
+
+def measure(path: str) -> dict:
+    start = time.perf_counter()
+    df_long, _ = transform_workbook(path)
+    read = time.perf_counter() - start
+    start = time.perf_counter()
+    facts = prepare_facts(df_long)
+    prepare = time.perf_counter() - start
+    return {"rows": len(df_long), "facts": facts, "read": read, "prepare": prepare,
+            "rows_per_sec": len(df_long) / (read + prepare)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--workbook", default=WIDE_FILE_PATH, help="Wide workbook timed for the Excel route")
+    parser.add_argument("--target", type=float, default=10.0, help="Required speed-up over the Excel route")
+    args = parser.parse_args()
+
+    results = {"xlsx": measure(args.workbook)}
+    with tempfile.TemporaryDirectory() as tmp:
+        table = synthetic_long(args.rows)
+        paths = {"csv": os.path.join(tmp, "long.csv"), "parquet": os.path.join(tmp, "long.parquet")}
+        pa.csv.write_csv(table, paths["csv"])
+        pa.parquet.write_table(table, paths["parquet"], compression="zstd")
+        del table
+        for fmt, path in paths.items():
+            results[fmt] = measure(path)
+
+    print(f"{'route':<8} {'rows':>10} {'read s':>8} {'prepare s':>10} {'rows/s':>12} {'speed-up':>9}")
+    baseline = results["xlsx"]["rows_per_sec"]
+    failures = 0
+    for fmt, r in results.items():
+        speedup = r["rows_per_sec"] / baseline
+        print(f"{fmt:<8} {r['rows']:>10} {r['read']:>8.2f} {r['prepare']:>10.2f} {r['rows_per_sec']:>12,.0f} {speedup:>8.1f}x")
+        if fmt != "xlsx" and (speedup < args.target or r["facts"] != r["rows"]):
+            failures += 1
+    print("long ingestion:", "OK" if not failures else f"{failures} routes below {args.target}x")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
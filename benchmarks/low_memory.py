@@ -0,0 +1,120 @@
+"""
+Peak memory of a full ETL run with and without low-memory mode, on a synthetic wide
+workbook and a throwaway SQLite file. Each mode runs in a fresh process, so every
+stage's peak RSS is measured from the same baseline (the process after imports),
+and the long DataFrame and fact columns are sized with and without compact dtypes:
+    python -m benchmarks.low_memory --cities 800 --months 60 --target 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+MODES = ("default", "low_memory")
+
+
+async def measure(workbook: str, database_url: str, low_memory: bool) -> dict:
+    """Runs in the child process: one ETL run, then the size of its structures."""
+    # The app reads DATABASE_URL when it is imported
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["SQL_LOG"] = "off"
+    import pandas as pd
+    import psutil
+    from app.core.database import AsyncSessionLocal
+    from app.main import app, lifespan
+    from app.services.etl_service.loader import FactLoader, dimension_loaders
+    from app.services.etl_service.runner import WorkOrderETLManager
+    from app.services.etl_service.workbooks import transform_workbook
+
+    async with lifespan(app):
+        baseline = psutil.Process().memory_info().rss
+        async with AsyncSessionLocal() as db:
+            report = await WorkOrderETLManager(db, workbook, artifacts=[], low_memory=low_memory).run()
+    stages = {s["name"]: s["peak_rss_bytes"] - baseline for s in report["stages"]}
+
+    # Sized after the run, so it does not count towards the stage peaks above
+    df_long, _ = transform_workbook(workbook, low_memory=low_memory)
+    frame_bytes = int(df_long.memory_usage(deep=True).sum())
+    maps = {}
+    for name, loader in dimension_loaders(df_long).items():
+        loader.prepare()
+        maps[name] = {key: i for i, key in enumerate(loader.map, 1)}
+    facts = FactLoader(df_long, maps, low_memory=low_memory)
+    facts.prepare()
+    # deep: object columns also count the Python ints they point to
+    fact_bytes = sum(
+        int(pd.Series(values).memory_usage(deep=True, index=False)) for values in facts.fact_columns.values()
+    )
+    return {
+        "records": report["records"],
+        "baseline_rss_bytes": baseline,
+        "stage_peak_growth_bytes": stages,
+        "peak_growth_bytes": max(stages.values()),
+        "long_frame_bytes": frame_bytes,
+        "fact_columns_bytes": fact_bytes,
+    }
+
+
+def run_child(mode: str, workbook: str, tmp: str) -> dict:
+    database_url = f"sqlite+aiosqlite:///{tmp}/{mode}.db"
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.low_memory", "--child", mode, "--workbook", workbook,
+         "--database-url", database_url],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def mib(value: int) -> str:
+    return f"{value / 2**20:8.1f} MiB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", type=int, default=800)
+    parser.add_argument("--months", type=int, default=60)
+    parser.add_argument("--workbook", help="Use this workbook instead of generating one")
+    parser.add_argument("--target", type=float, default=4.0, help="Required reduction of the peak RSS growth")
+    parser.add_argument("--output", help="Also write the results as JSON")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--database-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = asyncio.run(measure(args.workbook, args.database_url, args.child == "low_memory"))
+        print(json.dumps(result))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook = args.workbook
+        if workbook is None:
+            from benchmarks.workbook_generator import generate_workbook
+            workbook = os.path.join(tmp, "wide.xlsx")
+            generate_workbook(workbook, cities=args.cities, months=args.months)
+        results = {mode: run_child(mode, workbook, tmp) for mode in MODES}
+
+    default, low = results["default"], results["low_memory"]
+    print(f"{'records':<24}{default['records']:>13}")
+    print(f"{'':<24}{'default':>13}{'low_memory':>13}{'reduction':>11}")
+    rows = [(f"{name} peak", name) for name in default["stage_peak_growth_bytes"]]
+    for label, key in rows:
+        before, after = default["stage_peak_growth_bytes"][key], low["stage_peak_growth_bytes"][key]
+        print(f"{label:<24}{mib(before):>13}{mib(after):>13}{before / max(after, 1):>10.1f}x")
+    ratios = {}
+    for key in ("peak_growth_bytes", "long_frame_bytes", "fact_columns_bytes"):
+        ratios[key] = default[key] / max(low[key], 1)
+        print(f"{key:<24}{mib(default[key]):>13}{mib(low[key]):>13}{ratios[key]:>10.1f}x")
+    print("RSS growth is over each process' baseline after imports "
+          f"({mib(default['baseline_rss_bytes']).strip()}).")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "reductions": ratios}, f, indent=2)
+    sys.exit(0 if default["records"] == low["records"] and ratios["peak_growth_bytes"] >= args.target else 1)
+
+
+if __name__ == "__main__":
+    main()
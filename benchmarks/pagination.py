@@ -0,0 +1,89 @@
+"""
+Check keyset pagination and top-N against the full aggregation, and compare the
+latency and JSON size of a full response, one page and a top-N response.
+
+Runs against DATABASE_URL, which must already hold data loaded by /etl/refresh:
+    python -m benchmarks.pagination --limit 50 --top-n 10
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from fastapi.encoders import jsonable_encoder
+from app.core.database import AsyncSessionLocal, engine
+from app.services.aggregation_service import WorkOrderMetrics
+from benchmarks.rollups import canonical
+
+SHAPES = [
+    {"group_by": ["location", "year", "month"]},
+    {"group_by": ["location", "year", "month"], "order_by": "location", "order_dir": "asc"},
+    {"group_by": ["project_type", "status"], "order_by": "count", "order_dir": "asc"},
+    {"group_by": ["status"]},
+]
+
+
+def size(result: dict) -> int:
+    return len(json.dumps(jsonable_encoder(result), ensure_ascii=False).encode("utf-8"))
+
+
+async def timed(db, metrics: WorkOrderMetrics, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await metrics.aggregate(db)
+        samples.append(time.perf_counter() - start)
+    return result, statistics.median(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'shape':<70} {'mode':<6} {'p50 ms':>8} {'bytes':>8}")
+    async with AsyncSessionLocal() as db:
+        for shape in SHAPES:
+            full, full_ms = await timed(db, WorkOrderMetrics(**shape, use_rollups=False), args.repeat)
+
+            # Walking every page must give back exactly the full result
+            pages, cursor = [], None
+            while True:
+                page = await WorkOrderMetrics(**shape, use_rollups=False, limit=args.limit, cursor=cursor).aggregate(db)
+                pages += page["chart_data"]
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            walked = {"total_count": page["total_count"], "chart_data": pages}
+            if canonical(walked) != canonical(full) or len(pages) != page["groups"]:
+                failures += 1
+                print(f"PAGES MISMATCH {shape}")
+
+            top = await WorkOrderMetrics(**shape, use_rollups=False, top_n=args.top_n).aggregate(db)
+            largest = sorted((item["count"] for item in full["chart_data"]), reverse=True)
+            if (
+                sorted((item["count"] for item in top["chart_data"]), reverse=True) != largest[: args.top_n]
+                or top["others"]["count"] != sum(largest[args.top_n:])
+                or top["total_count"] != full["total_count"]
+            ):
+                failures += 1
+                print(f"TOP-N MISMATCH {shape}")
+
+            first, page_ms = await timed(db, WorkOrderMetrics(**shape, use_rollups=False, limit=args.limit), args.repeat)
+            top, top_ms = await timed(db, WorkOrderMetrics(**shape, use_rollups=False, top_n=args.top_n), args.repeat)
+            label = json.dumps(shape)
+            print(f"{label:<70} {'full':<6} {full_ms:>8.2f} {size(full):>8}")
+            print(f"{'':<70} {'page':<6} {page_ms:>8.2f} {size(first):>8}")
+            print(f"{'':<70} {'top-n':<6} {top_ms:>8.2f} {size(top):>8}")
+    await engine.dispose()
+
+    print("pagination/top-n:", "OK" if not failures else f"{failures} mismatches")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
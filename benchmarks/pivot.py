@@ -0,0 +1,112 @@
+"""
+Check /aggregations/pivot matrices against the /sum groups they are built from, and
+compare time (query plus JSON serialization) and response size of the long /sum
+list with the dense and sparse pivot layouts.
+
+Runs against DATABASE_URL, which must already hold data loaded by /etl/refresh:
+    python -m benchmarks.pivot --repeat 10
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.core.database import AsyncSessionLocal, engine
+from app.services.aggregation_service import PivotMetrics, WorkOrderMetrics
+
+PIVOTS = [
+    (["location"], ["month"]),
+    (["status"], ["project_type"]),
+    (["location"], ["year", "month"]),
+    (["location", "project_type"], ["status"]),
+]
+
+
+def as_label(label):
+    return tuple(label) if isinstance(label, list) else label
+
+
+def cells_of(pivot: dict) -> dict:
+    """(row label, col label) -> value of a dense or sparse pivot response."""
+    rows, cols = pivot["row_labels"], pivot["col_labels"]
+    if pivot["layout"] == "sparse":
+        return {(rows[i], cols[j]): value for i, j, value in pivot["cells"]}
+    return {
+        (rows[i], cols[j]): value
+        for i, row in enumerate(pivot["values"])
+        for j, value in enumerate(row)
+        if value is not None
+    }
+
+
+def expected_cells(rows: list, cols: list, chart_data: list) -> dict:
+    def label(item, fields):
+        values = tuple(item[WorkOrderMetrics.OUTPUT_KEYS[f]] for f in fields)
+        return values[0] if len(values) == 1 else values
+    return {(label(item, rows), label(item, cols)): int(item["count"]) for item in chart_data}
+
+
+async def response_body(result, encode: bool = False) -> bytes:
+    """Response body as the router builds it."""
+    result = await result
+    return JSONResponse(jsonable_encoder(result) if encode else result).body
+
+
+async def timed(compute, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = await compute()
+        samples.append(time.perf_counter() - start)
+    return body, statistics.median(samples) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'rows x cols':<40} {'response':<14} {'p50 ms':>8} {'bytes':>9}")
+    async with AsyncSessionLocal() as db:
+        for rows, cols in PIVOTS:
+            metrics = WorkOrderMetrics(group_by=rows + cols)
+            dense = PivotMetrics(rows, cols)
+            sparse = PivotMetrics(rows, cols, layout="sparse")
+
+            long = await metrics.aggregate(db)
+            results = {"dense": await dense.aggregate(db), "sparse": await sparse.aggregate(db)}
+            expected = expected_cells(rows, cols, long["chart_data"])
+            for layout, pivot in results.items():
+                # Compare what clients get: JSON turns tuple labels into lists
+                pivot = json.loads(JSONResponse(pivot).body)
+                pivot["row_labels"] = [as_label(label) for label in pivot["row_labels"]]
+                pivot["col_labels"] = [as_label(label) for label in pivot["col_labels"]]
+                margins_ok = (
+                    sum(pivot["row_totals"]) == sum(pivot["col_totals"]) == pivot["total_count"] == long["total_count"]
+                )
+                if cells_of(pivot) != expected or not margins_ok:
+                    failures += 1
+                    print(f"MISMATCH {rows} x {cols} ({layout})")
+
+            name = f"{','.join(rows)} x {','.join(cols)}"
+            responses = {
+                "sum": lambda: response_body(metrics.aggregate(db), encode=True),
+                "pivot dense": lambda: response_body(dense.aggregate(db)),
+                "pivot sparse": lambda: response_body(sparse.aggregate(db)),
+            }
+            for label, compute in responses.items():
+                body, ms = await timed(compute, args.repeat)
+                print(f"{name:<40} {label:<14} {ms:>8.2f} {len(body):>9}")
+                name = ""
+    await engine.dispose()
+
+    print("pivot parity:", "OK" if not failures else f"{failures} mismatches")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
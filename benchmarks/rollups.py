@@ -0,0 +1,78 @@
+"""
+Check every rollup against the raw fact aggregation and time each query route.
+
+Runs against DATABASE_URL, which must already hold data loaded by /etl/refresh:
+    python -m benchmarks.rollups --repeat 20
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import sys
+import time
+from collections import defaultdict
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal, engine
+from app.models import DimDate, FactWorkOrder
+from app.services.aggregation_service import WorkOrderMetrics
+
+GROUP_FIELDS = ["location", "project_type", "status", "year", "month"]
+
+
+async def sample_filters(db) -> list:
+    """No filter plus one filter per dimension, using values present in the data."""
+    fact = (await db.execute(select(FactWorkOrder).limit(1))).scalar_one_or_none()
+    date = (await db.execute(select(DimDate).limit(1))).scalar_one_or_none()
+    if fact is None or date is None:
+        sys.exit("No facts loaded; run /etl/refresh first")
+    return [
+        {},
+        {"location_id": fact.location_id},
+        {"project_type_id": fact.project_type_id},
+        {"status_id": fact.status_id},
+        {"year": date.year},
+        {"year": date.year, "month": date.month},
+    ]
+
+
+def canonical(result: dict) -> tuple:
+    rows = sorted(tuple(sorted(item.items())) for item in result["chart_data"])
+    return result["total_count"], rows
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    mismatches = 0
+    timings = defaultdict(lambda: {"rollup": [], "fact": []})
+    async with AsyncSessionLocal() as db:
+        for filters in await sample_filters(db):
+            for size in range(len(GROUP_FIELDS) + 1):
+                for group_by in itertools.combinations(GROUP_FIELDS, size):
+                    routed = WorkOrderMetrics(**filters, group_by=list(group_by))
+                    raw = WorkOrderMetrics(**filters, group_by=list(group_by), use_rollups=False)
+                    route = routed.source().name
+                    if canonical(await routed.aggregate(db)) != canonical(await raw.aggregate(db)):
+                        mismatches += 1
+                        print(f"MISMATCH {route}: filters={filters} group_by={group_by}")
+                    if route == raw.source().name:
+                        continue
+                    for metrics, key in ((routed, "rollup"), (raw, "fact")):
+                        for _ in range(args.repeat):
+                            start = time.perf_counter()
+                            await metrics.aggregate(db)
+                            timings[route][key].append(time.perf_counter() - start)
+    await engine.dispose()
+
+    print(f"{'route':<40} {'queries':>8} {'rollup p50 ms':>14} {'fact p50 ms':>12} {'speedup':>8}")
+    for route, t in sorted(timings.items()):
+        rollup, fact = statistics.median(t["rollup"]) * 1000, statistics.median(t["fact"]) * 1000
+        print(f"{route:<40} {len(t['rollup']):>8} {rollup:>14.2f} {fact:>12.2f} {fact / rollup:>7.1f}x")
+    print("consistency:", "OK" if not mismatches else f"{mismatches} mismatching shapes")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
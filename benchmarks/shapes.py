@@ -0,0 +1,17 @@
+"""/aggregations/sum query shapes timed by the benchmarks, from a plain total to top-N."""
+
+SUM_SHAPES = [
+    {},
+    {"group_by": ["status"]},
+    {"group_by": ["project_type", "status"]},
+    {"group_by": ["location"], "order_by": "count"},
+    {"group_by": ["year", "month"]},
+    {"group_by": ["location", "year", "month"]},
+    {"group_by": ["location", "project_type", "status", "year", "month"]},
+    {"group_by": ["location", "year", "month"], "limit": 100},
+    {"group_by": ["location", "project_type"], "top_n": 10},
+]
+
+
+def shape_name(params: dict) -> str:
+    return ";".join(f"{k}={','.join(v) if isinstance(v, list) else v}" for k, v in params.items()) or "total"
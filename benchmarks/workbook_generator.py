@@ -0,0 +1,140 @@
+"""
+Generate synthetic wide workbooks laid out like app/static/2016.xlsx: a title row,
+two header rows (تست N groups with one sub-column per status plus a مجموع summary
+column, then a جمع group and the overall total), and per month one row per city
+followed by a جمع subtotal row and a کل شرکت total row.
+
+    python -m benchmarks.workbook_generator /tmp/wide.xlsx --cities 160 --months 30
+"""
+import argparse
+import os
+from typing import Dict, List, Tuple
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+STATUSES = [
+    "دردست اجرا",
+    "تهیه صورت وضعیت",
+    "صورت وضعیت نزد مشاور",
+    "صورت وضعیت نزد ستاد",
+    "صورت وضعیت نزد مالی",
+]
+TITLE = "وضعیت دستور کارهاي زخمی انتقالی از سال های گذشته"
+ID_HEADERS = ["مدیریت برق شهرستان", "کد امور", "سال", "ماه"]
+SUBTOTAL_LABEL = "جمع به تفکیک هر واحد"
+TOTAL_LABEL = "کل شرکت"
+
+
+def status_names(count: int) -> List[str]:
+    return STATUSES[:count] + [f"وضعیت {i}" for i in range(len(STATUSES) + 1, count + 1)]
+
+
+def periods(months: int, start: Tuple[int, int] = (1401, 7)) -> List[Tuple[int, int]]:
+    year, month = start
+    out = []
+    for _ in range(months):
+        out.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return out
+
+
+def generate_workbook(
+    path: str,
+    cities: int = 16,
+    months: int = 3,
+    tests: int = 7,
+    statuses: int = 5,
+    seed: int = 0,
+    start: Tuple[int, int] = (1401, 7),
+) -> Dict:
+    """
+    Write a wide workbook to ``path`` and return what the ETL should find in it:
+    long rows, the total count and the number of distinct dimension members.
+    """
+    rng = np.random.default_rng(seed)
+    names = status_names(statuses)
+    width = len(ID_HEADERS) + tests * (statuses + 1) + statuses + 1
+    codes = rng.choice(np.arange(1000, 10000), size=cities, replace=False)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    merges = [f"A1:{get_column_letter(width)}1"] + [f"{c}2:{c}3" for c in "ABCD"]
+
+    top, sub = list(ID_HEADERS), [None] * len(ID_HEADERS)
+    for test in range(1, tests + 1):
+        first = len(top) + 1
+        top += [f"تعداد دستورکارهای باز مربوط به تست {test}"] + [None] * statuses
+        sub += names + [f"مجموع دستورکارهای باز تست {test}"]
+        merges.append(f"{get_column_letter(first)}2:{get_column_letter(first + statuses)}2")
+    first = len(top) + 1
+    top += [" جمع تعداد دستورکارهای باز مربوط به امور"] + [None] * statuses
+    sub += names + ["کل\nدستورکارهای باز"]
+    merges.append(f"{get_column_letter(first)}2:{get_column_letter(width)}2")
+
+    ws.append([TITLE] + [None] * (width - 1))
+    ws.append(top)
+    ws.append(sub)
+
+    row_number = 3
+    total_count = 0
+    for year, month in periods(months, start):
+        block_start = row_number + 1
+        counts = rng.poisson(4, size=(cities, tests, statuses)) * (rng.random((cities, tests, statuses)) < 0.6)
+        total_count += int(counts.sum())
+        for city in range(cities):
+            row_number += 1
+            row = [f"شهر {city + 1}", int(codes[city]), year, month]
+            for test in range(tests):
+                col = len(row) + 1
+                row += counts[city, test].tolist()
+                row.append(f"=SUM({get_column_letter(col)}{row_number}:{get_column_letter(col + statuses - 1)}{row_number})")
+            for status in range(statuses):
+                cells = [
+                    f"{get_column_letter(len(ID_HEADERS) + 1 + test * (statuses + 1) + status)}{row_number}"
+                    for test in range(tests)
+                ]
+                row.append("=" + "+".join(cells))
+            row.append(f"=SUM({get_column_letter(width - statuses)}{row_number}:{get_column_letter(width - 1)}{row_number})")
+            ws.append(row)
+
+        row_number += 1
+        ws.append([SUBTOTAL_LABEL, None, None, None] + [
+            f"=SUM({get_column_letter(c)}{block_start}:{get_column_letter(c)}{row_number - 1})"
+            for c in range(len(ID_HEADERS) + 1, width + 1)
+        ])
+        row_number += 1
+        ws.append([TOTAL_LABEL, 9999, year, month, f"=SUM({get_column_letter(width)}{block_start}:{get_column_letter(width)}{row_number - 2})"])
+
+    for merge in merges:
+        ws.merged_cells.add(merge)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    wb.save(path)
+    return {
+        "cities": cities,
+        "months": months,
+        "tests": tests,
+        "statuses": statuses,
+        "wide_rows": cities * months,
+        "long_rows": cities * months * tests * statuses,
+        "total_count": total_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--cities", type=int, default=16)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--tests", type=int, default=7)
+    parser.add_argument("--statuses", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    stats = generate_workbook(
+        args.path, cities=args.cities, months=args.months, tests=args.tests, statuses=args.statuses, seed=args.seed,
+    )
+    print(", ".join(f"{k}={v}" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
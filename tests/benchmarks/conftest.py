@@ -0,0 +1,63 @@
+"""
+Benchmarks of the ETL and /aggregations/sum on a synthetic wide workbook, run with
+pytest-benchmark. They are left out of the default test run; select them explicitly
+and save or compare results across commits:
+    pytest tests/benchmarks --benchmark-json=head.json
+    pytest tests/benchmarks --benchmark-autosave
+    pytest tests/benchmarks --benchmark-compare --benchmark-compare-fail=median:20%
+The workbook size and the rounds of the slow benchmarks come from BENCH_CITIES,
+BENCH_MONTHS and BENCH_ROUNDS. Like the tests, they reload every work order table
+of the test database (see TEST_DATABASE_URL).
+"""
+import asyncio
+import os
+import pytest
+from benchmarks.workbook_generator import generate_workbook
+
+CITIES = int(os.getenv("BENCH_CITIES", 160))
+MONTHS = int(os.getenv("BENCH_MONTHS", 30))
+# Rounds of the benchmarks too slow for pytest-benchmark's calibration
+ROUNDS = int(os.getenv("BENCH_ROUNDS", 3))
+
+
+@pytest.fixture(scope="session")
+def rounds() -> int:
+    return ROUNDS
+
+
+@pytest.fixture(scope="session")
+def workbook(tmp_path_factory) -> dict:
+    """Path of the generated workbook, with the generator's expected row counts."""
+    path = str(tmp_path_factory.mktemp("bench") / "wide.xlsx")
+    return {"path": path, **generate_workbook(path, cities=CITIES, months=MONTHS)}
+
+
+@pytest.fixture(scope="session")
+async def loop(app_lifespan):
+    """The loop the app's engines run on; not running while a (sync) benchmark runs."""
+    return asyncio.get_running_loop()
+
+
+@pytest.fixture(scope="session")
+def run(loop):
+    """Run a coroutine to completion on the app's loop, for timing in a benchmark."""
+    return loop.run_until_complete
+
+
+@pytest.fixture(scope="session")
+def etl_run(run):
+    """One WorkOrderETLManager.run over a workbook in its own session, as a job runs it."""
+    from app.core.database import AsyncSessionLocal
+    from app.services.etl_service.runner import WorkOrderETLManager
+
+    async def etl(path: str, **params) -> dict:
+        async with AsyncSessionLocal() as db:
+            return await WorkOrderETLManager(db, path, artifacts=[], **params).run()
+
+    return lambda path, **params: run(etl(path, **params))
+
+
+@pytest.fixture(scope="module")
+def loaded(workbook, etl_run) -> dict:
+    """The workbook loaded by a full refresh, as the aggregation benchmarks query it."""
+    return etl_run(workbook["path"])
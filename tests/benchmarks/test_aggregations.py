@@ -0,0 +1,33 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from app.services.cache_service import aggregation_cache
+from benchmarks.shapes import SUM_SHAPES, shape_name
+
+URL = "/open-work-orders/aggregations/sum"
+
+
+@pytest.fixture
+def client(app_lifespan, run):
+    client = AsyncClient(transport=ASGITransport(app=app_lifespan), base_url="http://bench")
+    yield client
+    run(client.aclose())
+
+
+def get(run, client, params: dict) -> dict:
+    response = run(client.get(URL, params=params))
+    response.raise_for_status()
+    return response.json()
+
+
+@pytest.mark.parametrize("params", SUM_SHAPES, ids=shape_name)
+def test_sum(benchmark, run, client, loaded, workbook, params):
+    """Every request misses the result cache and runs its query."""
+    result = benchmark.pedantic(get, args=(run, client, params), setup=aggregation_cache.clear, rounds=20)
+    if not params:
+        assert result["total_count"] == workbook["total_count"]
+
+
+def test_sum_cached(benchmark, run, client, loaded):
+    params = {"group_by": ["location", "year", "month"]}
+    get(run, client, params)
+    benchmark(get, run, client, params)
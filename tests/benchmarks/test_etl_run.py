@@ -0,0 +1,10 @@
+import pytest
+
+MODES = {"full": {}, "pipelined": {"pipelined": True}, "low_memory": {"low_memory": True}}
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_etl_run(benchmark, etl_run, workbook, rounds, mode):
+    benchmark.extra_info["rows"] = workbook["long_rows"]
+    report = benchmark.pedantic(etl_run, args=(workbook["path"],), kwargs=MODES[mode], rounds=rounds)
+    assert report["status"] == "success"
@@ -0,0 +1,53 @@
+import pytest
+from app.core.database import AsyncSessionLocal
+from app.services.db_cleaner import WorkOrderCleaner
+from app.services.etl_service.excel_transformer import ExcelTransformer
+from app.services.etl_service.loader import FactLoader, dimension_loaders
+
+DIMENSIONS = list(dimension_loaders(None))
+
+
+@pytest.fixture(scope="module")
+def long_df(workbook):
+    return ExcelTransformer(workbook["path"]).transform()
+
+
+@pytest.fixture
+def db(run):
+    session = AsyncSessionLocal()
+    yield session
+    run(session.close())
+
+
+@pytest.mark.parametrize("name", DIMENSIONS)
+def test_dimension_loader(benchmark, run, db, long_df, rounds, name):
+    def setup():
+        run(WorkOrderCleaner(db).clear_all())
+        return (dimension_loaders(long_df)[name],), {}
+
+    def load(loader):
+        loader.prepare()
+        run(loader.insert(db))
+        run(db.commit())
+        return loader
+
+    loader = benchmark.pedantic(load, setup=setup, rounds=rounds)
+    assert loader.map
+
+
+def test_fact_loader(benchmark, run, db, long_df, workbook, rounds):
+    def setup():
+        run(WorkOrderCleaner(db).clear_all())
+        loaders = dimension_loaders(long_df)
+        for loader in loaders.values():
+            loader.prepare()
+            run(loader.insert(db))
+        return (FactLoader(long_df, {name: loader.map for name, loader in loaders.items()}),), {}
+
+    def load(facts):
+        facts.prepare()
+        return run(facts.insert(db))
+
+    benchmark.extra_info["rows"] = len(long_df)
+    stats = benchmark.pedantic(load, setup=setup, rounds=rounds)
+    assert stats["rows"] + stats["skipped"] == workbook["long_rows"]
@@ -0,0 +1,15 @@
+import pytest
+from app.services.etl_service.excel_transformer import ExcelTransformer
+
+METHODS = {
+    "pandas": lambda path: ExcelTransformer(path).transform(),
+    "streaming": lambda path: ExcelTransformer(path).transform_streaming(),
+    "low_memory": lambda path: ExcelTransformer(path, low_memory=True).transform(),
+}
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_transform(benchmark, workbook, rounds, method):
+    benchmark.extra_info["rows"] = workbook["long_rows"]
+    df_long = benchmark.pedantic(METHODS[method], args=(workbook["path"],), rounds=rounds)
+    assert len(df_long) == workbook["long_rows"]
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import func, select
+
+# The app reads DATABASE_URL when it is imported, and tests reload every work order
+# table: never use the configured database. TEST_DATABASE_URL points the suite at a
+# throwaway PostgreSQL database (PostgreSQL-only tests skip without it); otherwise
+# a throwaway SQLite file is used
+os.environ["DATABASE_URL"] = (
+    os.environ.get("TEST_DATABASE_URL")
+    or f"sqlite+aiosqlite:///{tempfile.mkdtemp(prefix='owo-tests-')}/test.db"
+)
+os.environ["SQL_LOG"] = "off"
+
+
+@pytest.fixture(scope="session")
+async def app_lifespan():
+    """The app started as in production: schema created, snapshots loaded."""
+    from app.main import app, lifespan
+    async with lifespan(app):
+        yield app
+
+
+@pytest.fixture
+async def db(app_lifespan):
+    from app.core.database import AsyncSessionLocal
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+async def client(app_lifespan):
+    """HTTP client calling the app in process, on the loop its engines run on."""
+    from httpx import ASGITransport, AsyncClient
+    async with AsyncClient(transport=ASGITransport(app=app_lifespan), base_url="http://test") as client:
+        yield client
+
+
+async def refresh(source: str, **params) -> dict:
+    """One ETL run over ``source`` in its own session, as a job would run it."""
+    from app.core.database import AsyncSessionLocal
+    from app.services.etl_service.runner import WorkOrderETLManager
+    params.setdefault("artifacts", [])
+    async with AsyncSessionLocal() as session:
+        return await WorkOrderETLManager(session, source, **params).run()
+
+
+async def count_rows(db, model) -> int:
+    count = (await db.execute(select(func.count()).select_from(model))).scalar_one()
+    # An open read transaction would hold its lock against the next refresh's TRUNCATE
+    await db.rollback()
+    return count
@@ -0,0 +1,195 @@
+import asyncio
+from collections import Counter
+import msgpack
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pytest
+from app.services.cache_service import ResultCache, aggregation_cache
+from app.services.etl_service.excel_transformer import LONG_COLUMNS
+from conftest import refresh
+
+URL = "/open-work-orders/aggregations"
+CITIES = [f"city {i:02d}" for i in range(40)]
+
+
+@pytest.fixture(scope="module")
+async def loaded(app_lifespan, tmp_path_factory):
+    """Enough cities for a grouped response to be sent compressed."""
+    rows = [
+        (city, str(2000 + i), 1401, month, (i * 3 + month) % 7 + 1, "p1" if i % 2 else "p2", status)
+        for i, city in enumerate(CITIES)
+        for month in (1, 2, 3)
+        for status in ("s1", "s2")
+    ]
+    source = tmp_path_factory.mktemp("router") / "long.csv"
+    pd.DataFrame(rows, columns=LONG_COLUMNS).to_csv(source, index=False)
+    await refresh(str(source))
+    aggregation_cache.clear()
+    return rows
+
+
+async def test_etag_and_if_none_match(client, loaded):
+    params = {"group_by": ["location", "month"]}
+    identity = {"Accept-Encoding": "identity"}
+    response = await client.get(f"{URL}/sum", params=params, headers=identity)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+    assert "content-encoding" not in response.headers
+    assert response.json()["total_count"] == sum(row[4] for row in loaded)
+    etag = response.headers["etag"]
+
+    # Same representation: 304 with the ETag and no body, also as a weak validator or in a list
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        cached = await client.get(f"{URL}/sum", params=params, headers={**identity, "If-None-Match": if_none_match})
+        assert cached.status_code == 304, if_none_match
+        assert cached.headers["etag"] == etag
+        assert cached.content == b""
+
+    stale = await client.get(f"{URL}/sum", params=params, headers={**identity, "If-None-Match": '"other"'})
+    assert stale.status_code == 200
+    assert stale.content == response.content
+
+    # The gzip variant has its own strong ETag, yet the identity one still validates it
+    gzipped = await client.get(f"{URL}/sum", params=params, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.status_code == 200
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["etag"] == f'{etag[:-1]}-gzip"'
+    assert gzipped.json() == response.json()
+    cached = await client.get(f"{URL}/sum", params=params, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    # Another query is another ETag
+    other = await client.get(f"{URL}/sum", params={"group_by": ["status"]}, headers=identity)
+    assert other.headers["etag"] != etag
+
+
+@pytest.mark.parametrize("layout", ["dense", "sparse"])
+async def test_pivot_totals_add_up(client, loaded, layout):
+    params = {"rows": "location", "cols": ["month", "status"], "layout": layout}
+    response = await client.get(f"{URL}/pivot", params=params)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["etag"]
+    pivot = response.json()
+
+    by_city, by_column = Counter(), Counter()
+    for city, _, _, month, count, _, status in loaded:
+        by_city[city] += count
+        by_column[(month, status)] += count
+    assert pivot["row_labels"] == sorted(by_city)
+    assert [tuple(label) for label in pivot["col_labels"]] == sorted(by_column)
+    assert pivot["row_totals"] == [by_city[city] for city in pivot["row_labels"]]
+    assert pivot["col_totals"] == [by_column[tuple(label)] for label in pivot["col_labels"]]
+    assert pivot["total_count"] == sum(pivot["row_totals"]) == sum(pivot["col_totals"]) == sum(by_city.values())
+
+    if layout == "dense":
+        cells = [value for row in pivot["values"] for value in row]
+        assert [sum(v or 0 for v in row) for row in pivot["values"]] == pivot["row_totals"]
+    else:
+        cells = [value for _, _, value in pivot["cells"]]
+    assert sum(v or 0 for v in cells) == pivot["total_count"]
+
+    without = (await client.get(f"{URL}/pivot", params={**params, "margins": False})).json()
+    assert "row_totals" not in without and "col_totals" not in without
+    assert without["total_count"] == pivot["total_count"]
+
+
+async def test_pivot_rejects_a_dimension_on_both_axes(client, loaded):
+    response = await client.get(f"{URL}/pivot", params={"rows": ["location", "month"], "cols": "month"})
+    assert response.status_code == 422
+    assert "month" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("accept,media_type", [
+    (None, "application/json"),
+    ("*/*", "application/json"),
+    ("application/msgpack", "application/msgpack"),
+    ("application/x-msgpack", "application/msgpack"),
+    ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.stream"),
+    ("application/vnd.openworkorders.columnar+json", "application/vnd.openworkorders.columnar+json"),
+    ("application/json;q=0.5, application/msgpack;q=0.9", "application/msgpack"),
+    ("application/msgpack;q=0, */*;q=0.1", "application/json"),
+])
+async def test_sum_negotiates_the_response_format(client, loaded, accept, media_type):
+    params = {"group_by": ["location"], "order_by": "location", "order_dir": "asc"}
+    expected = (await client.get(f"{URL}/sum", params=params)).json()
+    headers = {"Accept": accept} if accept else {}
+    response = await client.get(f"{URL}/sum", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == media_type
+
+    columns = {key: [item[key] for item in expected["chart_data"]] for key in ("city_name", "count")}
+    if media_type == "application/json":
+        assert response.json() == expected
+    elif media_type == "application/vnd.apache.arrow.stream":
+        table = pa.ipc.open_stream(response.content).read_all()
+        assert table.column_names == ["city_name", "count"]
+        assert {key: table.column(key).to_pylist() for key in columns} == columns
+        assert orjson.loads(table.schema.metadata[b"total_count"]) == expected["total_count"]
+    else:
+        document = msgpack.unpackb(response.content) if "msgpack" in media_type else response.json()
+        assert document["chart_data"] == columns
+        assert document["total_count"] == expected["total_count"]
+
+
+async def test_unacceptable_formats_get_a_406(client, loaded):
+    for path, params, accept in [
+        ("sum", {}, "text/csv"),
+        ("sum", {}, "application/json;q=0"),
+        ("pivot", {"rows": "location", "cols": "month"}, "application/vnd.apache.arrow.stream"),
+    ]:
+        response = await client.get(f"{URL}/{path}", params=params, headers={"Accept": accept})
+        assert response.status_code == 406, (path, accept)
+        assert "Not acceptable" in response.json()["detail"]
+
+    response = await client.get(f"{URL}/pivot", params={"rows": "location", "cols": "month"},
+                                headers={"Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["total_count"] == sum(row[4] for row in loaded)
+
+
+async def test_concurrent_misses_share_one_computation():
+    cache = ResultCache(1 << 20)
+    release = asyncio.Event()
+    calls = 0
+
+    async def compute() -> bytes:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return b'{"total_count": 1}'
+
+    waiters = [asyncio.create_task(cache.get_or_compute(("sum", "json"), compute)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 4, 0)
+    assert await cache.get_or_compute(("sum", "json"), compute) is results[0]
+    assert (calls, cache.hits) == (1, 1)
+
+
+async def test_failed_computation_reaches_every_waiter_and_is_not_cached():
+    cache = ResultCache(1 << 20)
+    release = asyncio.Event()
+
+    async def failing() -> bytes:
+        await release.wait()
+        raise ValueError("query failed")
+
+    waiters = [asyncio.create_task(cache.get_or_compute(("sum", "json"), failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def compute() -> bytes:
+        return b"{}"
+
+    assert (await cache.get_or_compute(("sum", "json"), compute)).body == b"{}"
+    assert cache.misses == 2
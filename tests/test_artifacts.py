@@ -0,0 +1,24 @@
+import pandas as pd
+from app.models import FactWorkOrder
+from app.services.etl_service.artifacts import CsvWriter, ParquetWriter
+from app.services.etl_service.excel_transformer import LONG_COLUMNS
+from conftest import count_rows, refresh
+
+
+async def test_failed_artifact_is_reported_after_publish(db, tmp_path, monkeypatch):
+    source = tmp_path / "long.csv"
+    pd.DataFrame([("X", "6010", 1401, 7, 3, "تست 1", "دردست اجرا")], columns=LONG_COLUMNS).to_csv(source, index=False)
+    monkeypatch.setattr(CsvWriter, "path", str(tmp_path / "out" / "long.csv"))
+    monkeypatch.setattr(ParquetWriter, "path", str(tmp_path / "out" / "long.parquet"))
+
+    def fail(self, df_long):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(CsvWriter, "_write", fail)
+    report = await refresh(str(source), artifacts=["csv", "parquet"])
+
+    assert report["status"] == "success"
+    assert await count_rows(db, FactWorkOrder) == 1
+    csv, parquet = report["artifacts"]
+    assert csv == {"format": "csv", "path": CsvWriter.path, "error": "OSError: disk full"}
+    assert "error" not in parquet and parquet["bytes"] > 0
@@ -0,0 +1,60 @@
+import itertools
+import pytest
+from sqlalchemy import insert
+from app.core.database import AsyncSessionLocal, engine
+from app.models import DimStatus, FactWorkOrder
+from app.services.aggregation_service import BatchMetrics, WorkOrderMetrics
+from app.services.rollup_service import RollupManager
+from benchmarks.workbook_generator import generate_workbook
+from conftest import refresh
+
+pytestmark = pytest.mark.skipif(engine.dialect.name != "postgresql", reason="GROUPING SETS need PostgreSQL")
+
+FIELDS = list(WorkOrderMetrics.OUTPUT_KEYS)
+# Every group-by, subtotal and the grand total in one statement
+SETS = [combo for n in range(len(FIELDS), -1, -1) for combo in itertools.combinations(FIELDS, n)]
+
+
+@pytest.fixture(scope="module")
+async def sample_fact(app_lifespan, tmp_path_factory):
+    """
+    A generated workbook, plus facts the inner joins of WorkOrderMetrics drop: no
+    location, no period, and a status without a name.
+    """
+    path = tmp_path_factory.mktemp("batch") / "work_orders.xlsx"
+    generate_workbook(str(path), cities=8, months=3, statuses=4, seed=5)
+    await refresh(str(path))
+
+    async with AsyncSessionLocal() as db:
+        fact = dict((await db.execute(FactWorkOrder.__table__.select().limit(1))).mappings().one())
+        status_id = (await db.execute(insert(DimStatus).values(name=None).returning(DimStatus.id))).scalar_one()
+        base = {k: v for k, v in fact.items() if k != "id"}
+        await db.execute(insert(FactWorkOrder), [
+            {**base, "location_id": None, "count": 3},
+            {**base, "date_id": None, "year": None, "month": None, "count": 4},
+            {**base, "status_id": status_id, "count": 5},
+        ])
+        await RollupManager.rebuild(db)
+    return fact
+
+
+def canonical(rows) -> list:
+    return sorted((tuple((k, v if k != "count" or v is None else int(v)) for k, v in sorted(r.items())) for r in rows),
+                  key=repr)
+
+
+@pytest.mark.parametrize("use_rollups", [True, False])
+@pytest.mark.parametrize("filters", [(), ("location_id",), ("status_id",), ("year",), ("year", "month"), ("no_match",)])
+async def test_grouping_sets_match_separate_queries(db, sample_fact, filters, use_rollups):
+    values = {f: sample_fact[f] for f in filters if f != "no_match"}
+    if "no_match" in filters:
+        values["location_id"] = -1
+    template = WorkOrderMetrics(**values, group_by=FIELDS, use_rollups=use_rollups)
+
+    batch = BatchMetrics()
+    grouped = await batch._grouped(db, template, SETS)
+    assert batch.statements == 1
+    separately = await batch._separately(db, template, SETS)
+
+    for grouping in SETS:
+        assert canonical(grouped.get(grouping, [])) == canonical(separately[grouping]), grouping
@@ -0,0 +1,17 @@
+import pandas as pd
+from app.services.etl_service.dtypes import compact_long, concat_long, downcast_int
+
+
+def test_downcast_int_keeps_int64_when_values_do_not_fit():
+    assert downcast_int(pd.Series([1.0, None, "7"]), "Int16").tolist() == [1, pd.NA, 7]
+    assert downcast_int(pd.Series([1.0, None]), "Int16").dtype == "Int16"
+    assert downcast_int(pd.Series([40_000]), "Int16").dtype == "Int64"
+
+
+def test_concat_long_keeps_categories_of_differing_frames():
+    first = compact_long(pd.DataFrame({"city_name": ["a", "b"], "year": [1401, 1401]}))
+    second = compact_long(pd.DataFrame({"city_name": ["c"], "year": [1402]}))
+    df = concat_long([first, second])
+    assert isinstance(df["city_name"].dtype, pd.CategoricalDtype)
+    assert df["city_name"].tolist() == ["a", "b", "c"]
+    assert df["year"].dtype == "Int16"
@@ -0,0 +1,118 @@
+import asyncio
+import orjson
+import pandas as pd
+import pytest
+from app.core.generation import data_generation
+from app.services.dimension_snapshot import DimensionSnapshotStore, dimension_snapshot
+from app.services.etl_service.excel_transformer import LONG_COLUMNS
+from app.services.invalidation_service import invalidations
+from conftest import refresh
+
+URL = "/open-work-orders/events"
+
+
+def write_long(path, count: int):
+    rows = [("X", "7001", 1401, 7, count, "تست 1", "دردست اجرا")]
+    pd.DataFrame(rows, columns=LONG_COLUMNS).to_csv(path, index=False)
+
+
+async def test_failed_view_rebuild_publishes_no_generation(app_lifespan, tmp_path, monkeypatch):
+    source = tmp_path / "long.csv"
+    write_long(source, 1)
+    await refresh(str(source))
+    generation, last_id, snapshot = data_generation.current, invalidations.last_id, dimension_snapshot.snapshot
+    assert last_id == generation
+
+    async def failing_query(db):
+        raise RuntimeError("dimension query failed")
+
+    monkeypatch.setattr(DimensionSnapshotStore, "_query", staticmethod(failing_query))
+    write_long(source, 2)
+    with pytest.raises(RuntimeError):
+        await refresh(str(source))
+
+    # Readers keep the previous generation's views, and no generation went unannounced
+    assert data_generation.current == generation
+    assert invalidations.last_id == last_id
+    assert dimension_snapshot.snapshot is snapshot
+
+
+async def read_events(app, count: int, headers: dict = None):
+    """
+    Status, headers and the first ``count`` events of a GET /events, then disconnect.
+    Driven over ASGI directly: the test client would wait for the endless stream to end.
+    """
+    done, start, chunks = asyncio.Event(), {}, []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": URL, "raw_path": URL.encode(), "query_string": b"", "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "server": ("test", 80), "client": ("127.0.0.1", 123),
+    }
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message.get("body"):
+            chunks.append(message["body"])
+            if sum(chunk.startswith(b"id:") for chunk in chunks) >= count:
+                done.set()
+
+    await asyncio.wait_for(app(scope, receive, send), timeout=10)
+    events = []
+    for chunk in chunks:
+        fields = dict(line.split(": ", 1) for line in chunk.decode().splitlines() if line and not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], int(fields["id"]), orjson.loads(fields["data"])))
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, events[:count]
+
+
+async def test_event_stream_resumes_from_last_event_id(app_lifespan, tmp_path):
+    source = tmp_path / "long.csv"
+    write_long(source, 1)
+    await refresh(str(source))
+    first = invalidations.last_id
+    write_long(source, 2)
+    await refresh(str(source))
+    second = invalidations.last_id
+    assert second == first + 1 == data_generation.current
+
+    status, headers, events = await read_events(app_lifespan, 1)
+    assert status == 200
+    assert headers["content-type"].startswith("text/event-stream")
+    assert headers["cache-control"] == "no-cache"
+    assert headers["x-accel-buffering"] == "no"
+    assert events == [("hello", second, {"generation": second})]
+
+    # Resuming replays what was missed, with the generation as event id
+    _, _, events = await read_events(app_lifespan, 1, {"Last-Event-ID": str(first)})
+    [(event, event_id, data)] = events
+    assert (event, event_id) == ("generation", second)
+    assert data["generation"] == second and data["reload"] == "full"
+    assert data["periods"] == [[1401, 7]]
+
+    # Nothing missed, or an unreadable id: a plain hello
+    for last_event_id in (str(second), "not a number"):
+        _, _, events = await read_events(app_lifespan, 1, {"Last-Event-ID": last_event_id})
+        assert events == [("hello", second, {"generation": second})]
+
+    # An id the server never issued (e.g. before a restart): start over
+    _, _, events = await read_events(app_lifespan, 1, {"Last-Event-ID": str(second + 5)})
+    assert events == [("reset", second, {"generation": second})]
+
+    # A connected stream gets the next refresh as it is published
+    reader = asyncio.create_task(read_events(app_lifespan, 2, {"Last-Event-ID": str(second)}))
+    await asyncio.sleep(0.1)
+    write_long(source, 3)
+    await refresh(str(source))
+    _, _, events = await reader
+    assert [(event, event_id) for event, event_id, _ in events] == [("hello", second), ("generation", second + 1)]
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+from app.core.constants import WIDE_FILE_PATH
+from app.services.etl_service.excel_transformer import ExcelTransformer, LONG_COLUMNS
+from benchmarks.workbook_generator import generate_workbook
+
+
+@pytest.fixture(scope="module")
+def generated_workbook(tmp_path_factory) -> str:
+    path = str(tmp_path_factory.mktemp("workbooks") / "wide.xlsx")
+    generate_workbook(path, cities=12, months=3, statuses=6, seed=7)
+    return path
+
+
+@pytest.mark.parametrize("batch_size", [50, 100_000])
+def test_streaming_matches_transform(batch_size):
+    expected = ExcelTransformer(WIDE_FILE_PATH).transform()
+    streamed = ExcelTransformer(WIDE_FILE_PATH).transform_streaming(batch_size=batch_size)
+    # Same rows in the same order with the same dtypes, so artifacts are byte-identical
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+def test_streaming_matches_transform_on_generated_workbook(generated_workbook):
+    expected = ExcelTransformer(generated_workbook).transform()
+    streamed = ExcelTransformer(generated_workbook).transform_streaming(batch_size=1000)
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+def test_stream_batches_are_bounded():
+    transformer = ExcelTransformer(WIDE_FILE_PATH)
+    batches = list(transformer.stream(batch_size=100))
+    assert all(list(batch.columns) == LONG_COLUMNS for batch in batches)
+    # A sheet row's values are never split across batches, so one may overshoot by a row
+    assert all(len(batch) < 100 + transformer.value_width for batch in batches)
+    assert sum(map(len, batches)) == len(ExcelTransformer(WIDE_FILE_PATH).transform())
+
+
+def test_low_memory_streaming_matches_low_memory_transform():
+    expected = ExcelTransformer(WIDE_FILE_PATH, low_memory=True).transform()
+    streamed = ExcelTransformer(WIDE_FILE_PATH, low_memory=True).transform_streaming(batch_size=100)
+    # Categories are listed in the order the batches met them
+    pd.testing.assert_frame_equal(streamed, expected, check_categorical=False)
@@ -0,0 +1,83 @@
+"""
+Every filter shape WorkOrderMetrics builds on fact_work_order must be answered from
+the covering index made for it. PostgreSQL only (set TEST_DATABASE_URL): the plans
+come from the default planner settings over freshly VACUUM ANALYZE'd data, as in
+production after a refresh.
+"""
+import json
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from app.core.constants import FACT_PARTITION_BY_YEAR
+from app.core.database import engine
+from app.models import FactWorkOrder
+from app.services.aggregation_service import WorkOrderMetrics
+from benchmarks.workbook_generator import generate_workbook
+from conftest import refresh
+
+pytestmark = [
+    pytest.mark.skipif(engine.dialect.name != "postgresql", reason="EXPLAIN checks need PostgreSQL"),
+    # Partitions carry their own, generated index names
+    pytest.mark.skipif(FACT_PARTITION_BY_YEAR, reason="expects the unpartitioned fact table"),
+]
+
+GROUP_BYS = [[], ["location"], ["status"], ["year", "month"], ["project_type", "status"]]
+
+# Filter columns of a shape -> index expected to answer it; None means reading every
+# fact, where a sequential scan is the right plan
+SHAPES = [
+    ((), None),
+    (("location_id",), "ix_fact_work_order_location"),
+    (("location_id", "year", "month"), "ix_fact_work_order_location"),
+    (("project_type_id",), "ix_fact_work_order_project_type"),
+    (("project_type_id", "status_id"), "ix_fact_work_order_project_type"),
+    (("status_id",), "ix_fact_work_order_status"),
+    (("status_id", "year"), "ix_fact_work_order_status"),
+    (("year",), "ix_fact_work_order_period"),
+    (("year", "month"), "ix_fact_work_order_period"),
+]
+
+
+@pytest.fixture(scope="module")
+async def sample_fact(app_lifespan, tmp_path_factory):
+    """Loads a realistically sized workbook and returns one of its facts' filter values."""
+    path = tmp_path_factory.mktemp("explain") / "work_orders.xlsx"
+    generate_workbook(str(path), cities=150, months=24, seed=11)
+    await refresh(str(path))
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE"))
+        fact = (await conn.execute(select(FactWorkOrder.__table__).limit(1))).mappings().one()
+    return dict(fact)
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def fact_scans(plan: dict) -> list:
+    """(node type, index name) of every scan of fact_work_order or its indexes."""
+    table = FactWorkOrder.__tablename__
+    return [
+        (node["Node Type"], node.get("Index Name"))
+        for node in plan_nodes(plan)
+        if node.get("Relation Name") == table or node.get("Index Name", "").startswith(f"ix_{table}")
+    ]
+
+
+@pytest.mark.parametrize("group_by", GROUP_BYS, ids=lambda g: "+".join(g) or "total")
+@pytest.mark.parametrize("columns,index", SHAPES, ids=lambda s: "+".join(s) if isinstance(s, tuple) else None)
+async def test_filter_shape_uses_its_index(db, sample_fact, columns, index, group_by):
+    metrics = WorkOrderMetrics(**{c: sample_fact[c] for c in columns}, group_by=group_by, use_rollups=False)
+    query, _ = metrics.build_query()
+    sql = query.params(**metrics.params()).compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+    plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar_one()
+    plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+    scans = fact_scans(plan)
+    if index is None:
+        assert scans == [("Seq Scan", None)]
+    else:
+        assert scans and all(name == index for _, name in scans), scans
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+from sqlalchemy import select
+from app.models import DimLocation, FactWorkOrder
+from app.services.etl_service.excel_transformer import LONG_COLUMNS
+from app.services.etl_service.loader import FactLoader
+from conftest import count_rows, refresh
+
+
+def write_long(path, counts):
+    rows = [
+        ("X", None, 1401, 7, counts[0], "تست 1", "دردست اجرا"),
+        ("Y", "6010", 1401, 7, counts[1], "تست 1", "دردست اجرا"),
+        ("Y", "6010", 1401, 8, counts[2], "تست 1", "دردست اجرا"),
+    ]
+    pd.DataFrame(rows, columns=LONG_COLUMNS).to_csv(path, index=False)
+
+
+async def test_location_without_department_code_is_not_duplicated(db, tmp_path):
+    source = tmp_path / "long.csv"
+    write_long(source, [1, 2, 3])
+    await refresh(str(source))
+
+    for counts in ([4, 2, 3], [5, 2, 3]):
+        write_long(source, counts)
+        report = await refresh(str(source), incremental=True)
+        assert report["dimensions"]["dim_location"] == {"inserted": 0, "existing": 2}
+
+    locations = (await db.execute(select(DimLocation.city_name, DimLocation.department_code))).all()
+    assert sorted(locations, key=str) == [("X", None), ("Y", "6010")]
+
+
+async def test_incremental_report_counts_net_fact_changes(db, tmp_path):
+    source = tmp_path / "long.csv"
+    write_long(source, [1, 2, 3])
+    await refresh(str(source))
+
+    # Period 1401/7 changes one count, 1401/8 is untouched
+    write_long(source, [1, 9, 3])
+    report = await refresh(str(source), incremental=True)
+    assert report["periods"] == [[1401, 7], [1401, 8]]
+    assert report["facts"] == {
+        "inserted": 0, "updated": 1, "deleted": 0, "unchanged": 2, "rows": {"deleted": 3, "inserted": 3},
+    }
+
+
+async def test_failed_incremental_load_keeps_the_periods(db, tmp_path, monkeypatch):
+    source = tmp_path / "long.csv"
+    write_long(source, [1, 2, 3])
+    await refresh(str(source))
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(FactLoader, "write", fail)
+    write_long(source, [7, 8, 9])
+    with pytest.raises(RuntimeError):
+        await refresh(str(source), incremental=True)
+    # The period-scoped delete was rolled back with the failed load
+    assert await count_rows(db, FactWorkOrder) == 3
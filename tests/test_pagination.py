@@ -0,0 +1,141 @@
+import base64
+import json
+import pandas as pd
+import pytest
+from sqlalchemy import insert
+from app.core.database import AsyncSessionLocal
+from app.models import DimLocation, DimStatus, FactWorkOrder
+from app.services.cache_service import aggregation_cache
+from app.services.etl_service.excel_transformer import LONG_COLUMNS
+from app.services.rollup_service import RollupManager
+from conftest import refresh
+
+URL = "/open-work-orders/aggregations/sum"
+CITIES = ["a", "b", "c", "d"]
+STATUSES = ["s1", "s2", "s3"]
+
+
+@pytest.fixture(scope="module")
+async def groups(app_lifespan, tmp_path_factory):
+    """Loaded facts with tied counts, plus a location and a status whose name is NULL."""
+    rows = [
+        (city, str(1000 + i), 1401, month, (i + j + month) % 3 + 1, "p1" if j % 2 else "p2", status)
+        for i, city in enumerate(CITIES)
+        for j, status in enumerate(STATUSES)
+        for month in (1, 2)
+    ]
+    source = tmp_path_factory.mktemp("pagination") / "long.csv"
+    pd.DataFrame(rows, columns=LONG_COLUMNS).to_csv(source, index=False)
+    await refresh(str(source))
+
+    async with AsyncSessionLocal() as db:
+        location_id = (await db.execute(insert(DimLocation).values(city_name=None).returning(DimLocation.id))).scalar_one()
+        status_id = (await db.execute(insert(DimStatus).values(name=None).returning(DimStatus.id))).scalar_one()
+        template = (await db.execute(FactWorkOrder.__table__.select().limit(1))).mappings().one()
+        base = {k: v for k, v in template.items() if k != "id"}
+        await db.execute(insert(FactWorkOrder), [
+            {**base, "location_id": location_id, "count": 2},
+            {**base, "status_id": status_id, "count": 5},
+        ])
+        await RollupManager.rebuild(db)
+    aggregation_cache.clear()
+
+
+async def get(client, **params) -> dict:
+    response = await client.get(URL, params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def sort_key(value):
+    return (value is None, value if value is not None else "")
+
+
+SHAPES = [
+    (["location", "status"], None, "desc"),
+    (["location", "status"], "count", "asc"),
+    (["location", "status"], "location", "asc"),
+    (["location", "status"], "status", "desc"),
+    (["project_type", "month"], "month", "asc"),
+]
+
+
+@pytest.mark.parametrize("group_by,order_by,order_dir", SHAPES)
+async def test_pages_return_every_group_once(client, groups, group_by, order_by, order_dir):
+    params = {"group_by": group_by, "order_dir": order_dir, **({"order_by": order_by} if order_by else {})}
+    full = await get(client, **params)
+
+    items, cursor = [], None
+    while True:
+        page = await get(client, **params, limit=2, **({"cursor": cursor} if cursor else {}))
+        assert page["total_count"] == full["total_count"]
+        assert page["groups"] == len(full["chart_data"])
+        assert len(page["chart_data"]) <= 2
+        items += page["chart_data"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    as_keys = [tuple(sorted(item.items())) for item in items]
+    assert len(as_keys) == len(set(as_keys))
+    assert sorted(as_keys, key=repr) == sorted((tuple(sorted(item.items())) for item in full["chart_data"]), key=repr)
+
+    # Keyset order: NULLs last ascending, first descending
+    column = {"location": "city_name", "status": "status_name", "month": "month"}.get(order_by, "count")
+    values = [sort_key(item[column]) for item in items]
+    descending = order_by is None or order_dir == "desc"
+    assert values == sorted(values, reverse=descending)
+    if column in ("city_name", "status_name"):
+        assert any(v[0] for v in values), "shape should include a NULL label"
+
+
+def tampered(cursor: str, **changes) -> str:
+    payload = json.loads(base64.urlsafe_b64decode(cursor))
+    return base64.urlsafe_b64encode(json.dumps({**payload, **changes}).encode()).decode()
+
+
+async def test_foreign_or_malformed_cursor_is_rejected(client, groups):
+    page = await get(client, group_by=["location", "status"], limit=2)
+    cursor = page["next_cursor"]
+    values = json.loads(base64.urlsafe_b64decode(cursor))["v"]
+
+    foreign = [
+        {"group_by": ["location"], "limit": 2},
+        {"group_by": ["location", "status"], "order_by": "location", "limit": 2},
+        {"group_by": ["location", "status"], "limit": 2, "year": 1401},
+    ]
+    for params in foreign:
+        response = await client.get(URL, params={**params, "cursor": cursor})
+        assert response.status_code == 422, params
+
+    params = {"group_by": ["location", "status"], "limit": 2}
+    for bad in [
+        "not a cursor",
+        base64.urlsafe_b64encode(b"[1, 2]").decode(),
+        tampered(cursor, v="oops"),
+        tampered(cursor, v=values[:-2]),
+        tampered(cursor, v=[not v if isinstance(v, bool) else "x" for v in values]),
+    ]:
+        response = await client.get(URL, params={**params, "cursor": bad})
+        assert response.status_code == 422, bad
+        assert "cursor" in response.json()["detail"].lower()
+
+    response = await client.get(URL, params={"group_by": ["location"], "cursor": cursor})
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("top_n", [1, 3, 100])
+@pytest.mark.parametrize("order_by", [None, "location"])
+async def test_top_n_and_others_add_up_to_the_total(client, groups, top_n, order_by):
+    params = {"group_by": ["location", "project_type"], **({"order_by": order_by} if order_by else {})}
+    full = await get(client, **params)
+    top = await get(client, **params, top_n=top_n)
+
+    assert top["total_count"] == full["total_count"]
+    assert top["groups"] == len(full["chart_data"])
+    assert len(top["chart_data"]) == min(top_n, top["groups"])
+    assert top["others"]["groups"] == top["groups"] - len(top["chart_data"])
+    assert sum(item["count"] for item in top["chart_data"]) + top["others"]["count"] == full["total_count"]
+    # The kept groups are the largest ones
+    counts = sorted((item["count"] for item in full["chart_data"]), reverse=True)
+    assert sorted((item["count"] for item in top["chart_data"]), reverse=True) == counts[:top_n]
@@ -0,0 +1,21 @@
+import pytest
+from app.models import FactWorkOrder
+from benchmarks.workbook_generator import generate_workbook
+from conftest import count_rows, refresh
+
+
+# Without zero-downtime (or on SQLite) the live tables are cleared and reloaded in place
+@pytest.mark.parametrize("zero_downtime", [True, False])
+async def test_failing_workbook_keeps_the_served_data(db, tmp_path, zero_downtime):
+    source = tmp_path / "workbooks"
+    source.mkdir()
+    generate_workbook(str(source / "a.xlsx"), cities=5, months=2, statuses=3, seed=1)
+    await refresh(str(source), pipelined=True, zero_downtime=zero_downtime)
+    facts = await count_rows(db, FactWorkOrder)
+    assert facts
+
+    # a.xlsx is read and loaded before the pipeline reaches the broken workbook
+    (source / "b.xlsx").write_bytes(b"not a workbook")
+    with pytest.raises(Exception):
+        await refresh(str(source), pipelined=True, zero_downtime=zero_downtime)
+    assert await count_rows(db, FactWorkOrder) == facts
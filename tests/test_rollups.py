@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import func, select
+from app.models import FactWorkOrder, ROLLUP_TABLES, rollup_columns
+from app.services.rollup_service import RollupManager
+from benchmarks.workbook_generator import generate_workbook
+from conftest import refresh
+
+
+@pytest.fixture(scope="module")
+def workbook(tmp_path_factory):
+    path = tmp_path_factory.mktemp("rollups") / "work_orders.xlsx"
+    generate_workbook(str(path), cities=10, months=4, statuses=5, seed=3)
+    return str(path)
+
+
+@pytest.fixture
+def changed_workbook(tmp_path):
+    """Same periods as ``workbook``, other department codes and counts."""
+    path = tmp_path / "work_orders.xlsx"
+    generate_workbook(str(path), cities=10, months=4, statuses=5, seed=4)
+    return str(path)
+
+
+async def grouped_facts(db, fields: tuple) -> set:
+    key_cols = [FactWorkOrder.__table__.c[c] for c in rollup_columns(fields)]
+    rows = await db.execute(select(*key_cols, func.sum(FactWorkOrder.count)).group_by(*key_cols))
+    return set(rows.all())
+
+
+async def rollup_rows(db, fields: tuple) -> set:
+    rows = (await db.execute(select(ROLLUP_TABLES[fields]))).all()
+    # No duplicate keys either
+    assert len(rows) == len(set(rows))
+    return set(rows)
+
+
+async def test_rebuilt_rollups_match_the_fact_table(db, workbook):
+    await refresh(workbook)
+    await RollupManager.rebuild(db)
+
+    assert await grouped_facts(db, ()) != {(None,)}
+    for fields in ROLLUP_TABLES:
+        assert await rollup_rows(db, fields) == await grouped_facts(db, fields), fields
+
+
+async def test_rollups_follow_an_incremental_run(db, workbook, changed_workbook):
+    await refresh(workbook)
+    report = await refresh(changed_workbook, incremental=True)
+    assert report["periods"]
+
+    for fields in ROLLUP_TABLES:
+        assert await rollup_rows(db, fields) == await grouped_facts(db, fields), fields
+
+
+@pytest.mark.parametrize("params", [
+    {"zero_downtime": False}, {"zero_downtime": False, "pipelined": True}, {"incremental": True},
+], ids=["full", "pipelined", "incremental"])
+async def test_failed_rollup_rebuild_keeps_the_old_data(db, workbook, changed_workbook, monkeypatch, params):
+    await refresh(workbook)
+    facts = await grouped_facts(db, ("location", "year", "month"))
+    await db.rollback()
+
+    def failing(fields, table):
+        raise RuntimeError("rollup failed")
+
+    monkeypatch.setattr(RollupManager, "build_statement", staticmethod(failing))
+    with pytest.raises(RuntimeError):
+        await refresh(changed_workbook, **params)
+    monkeypatch.undo()
+
+    # Facts, dimensions and rollups roll back together
+    assert await grouped_facts(db, ("location", "year", "month")) == facts
+    for fields in ROLLUP_TABLES:
+        assert await rollup_rows(db, fields) == await grouped_facts(db, fields), fields
+    await db.rollback()